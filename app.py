@@ -4,233 +4,1220 @@ Integrates HunyuanWorld-1.0 and WorldGen models
 """
 
 import gradio as gr
-import torch
 import os
 import sys
 from pathlib import Path
 from PIL import Image
-import tempfile
 import traceback
+import time
+import functools
+import inspect
+import shutil
+
+import artifact_store
+import fake_models
+import mapped_io
+import mesh_lod
+import metrics
+import model_snapshot
+import postprocess
+import preload
+import request_profiler
+import rest_api
+import splat_io
+from job_queue import JobScheduler, QueueFullError
+from model_registry import GB, ModelRegistry, budget_from_env, device_memory_total, format_bytes
+from pipeline import StagedPipeline
+from result_cache import ResultCache, cache_key, model_version
+from worker_pool import WorkerPool
 
 # Add model directories to path
 HUNYUAN_PATH = Path("HunyuanWorld-1.0")
 WORLDGEN_PATH = Path("WorldGen")
 
-# Global model instances
-hunyuan_panogen = None
-worldgen_model = None
+def _device():
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+def _portable_arg(value):
+    """Image objects become files in the artifact store, so workers only get a path"""
+    if isinstance(value, Image.Image):
+        path = artifacts.new_dir("upload_") / "input.png"
+        value.save(path)
+        return str(path)
+    return value
+
+# WORLD3D_DEVICES (e.g. "cuda:0,cuda:1" or "auto") runs the models in one worker
+# process per device, each pinned to its device with its own replicas; the
+# generate functions below are then dispatched to the least loaded worker.
+# WORLD3D_HUNYUAN_PYTHON / WORLD3D_WORLDGEN_PYTHON run a backend's workers with
+# the interpreter of its own conda env instead. Unset, everything runs here.
+worker_pool = WorkerPool.from_env("app", encode=_portable_arg)
+
+def on_workers(backend):
+    """Run the decorated function on a worker of backend when the worker pool serves it"""
+    def decorate(fn):
+        return worker_pool.remote(fn, backend) if worker_pool is not None else fn
+    return decorate
+
+def _uses_workers(backend):
+    return worker_pool is not None and worker_pool.serves(backend)
+
+# Models are loaded once and shared across requests. They stay on the device
+# while they fit in the budget (default: 90% of GPU memory); the least recently
+# used idle model is offloaded to host memory when another one needs room.
+# The device and its memory are filled in by the "torch" warm-up step below.
+registry = ModelRegistry(
+    device=None,
+    device_budget_bytes=budget_from_env("WORLD3D_DEVICE_MEMORY_GB"),
+    host_budget_bytes=budget_from_env("WORLD3D_HOST_MEMORY_GB")
+)
+
+def _setup_device():
+    """Import torch, probe the device and size the model budget from its memory"""
+    registry.device = _device()
+    total = device_memory_total()
+    if total and "WORLD3D_DEVICE_MEMORY_GB" not in os.environ:
+        registry.device_budget_bytes = int(total * 0.9)
+        if "WORLD3D_PIPELINE_MEMORY_GB" not in os.environ:
+            hunyuan_pipeline.memory_ceiling_bytes = registry.device_budget_bytes
+    return registry.device
+
+def _load_hunyuan_panogen():
+    preloader.wait("torch")
+    if fake_models.enabled():
+        return fake_models.FakePanoGen(device=_device())
+    
+    sys.path.insert(0, str(HUNYUAN_PATH))
+    from hy3dworld.panogen import PanoGen
+    
+    return PanoGen(
+        device=_device(),
+        fp8_gemm=True,  # Use quantization for lower memory
+        fp8_attention=True
+    )
+
+def _load_hunyuan_scenegen():
+    preloader.wait("torch")
+    if fake_models.enabled():
+        return fake_models.FakeSceneGen(device=_device())
+    
+    sys.path.insert(0, str(HUNYUAN_PATH))
+    from hy3dworld.scenegen import SceneGen
+    
+    return SceneGen(
+        device=_device(),
+        fp8_gemm=True,
+        fp8_attention=True
+    )
+
+def _load_worldgen(mode):
+    preloader.wait("torch")
+    if fake_models.enabled():
+        return fake_models.FakeWorldGen(mode=mode, device=_device())
+    
+    sys.path.insert(0, str(WORLDGEN_PATH))
+    import torch
+    from worldgen import WorldGen
+    
+    return WorldGen(
+        mode=mode,
+        device=torch.device(_device()),
+        low_vram=True  # Enable for consumer GPUs
+    )
+
+# WORLD3D_SNAPSHOT_DIR keeps the quantized HunyuanWorld models on disk after
+# their first load, so later loads memory-map them instead of re-quantizing
+snapshots = model_snapshot.from_env()
+
+# Hugging Face repos each model builds from. SceneGen also reads the ZIM
+# weights that setup.sh downloads next to the HunyuanWorld code.
+PANOGEN_SOURCES = ["black-forest-labs/FLUX.1-dev", "black-forest-labs/FLUX.1-Fill-dev", "tencent/HunyuanWorld-1"]
+SCENEGEN_SOURCES = [
+    "black-forest-labs/FLUX.1-Fill-dev", "tencent/HunyuanWorld-1", "Ruicheng/moge-vitl",
+    "IDEA-Research/grounding-dino-tiny",
+]
+SCENEGEN_LOCAL_SOURCES = [HUNYUAN_PATH / "ZIM" / "zim_vit_l_2092"]
+
+def _snapshotted(name, build, sources, local_sources=()):
+    """build, loaded from (and saved to) a snapshot when snapshots are enabled
+    
+    The snapshot is checked against the cache directories of the Hugging Face
+    repos sources, the local_sources paths and the installed hy3dworld.
+    """
+    if snapshots is None:
+        return build
+    
+    def fingerprint():
+        preloader.wait("torch")
+        import torch
+        options = {
+            "version": MODEL_VERSIONS["hunyuan"],
+            "fp8_gemm": True,
+            "fp8_attention": True,
+            "torch": torch.__version__,
+            "device": _device(),
+            "hy3dworld": model_snapshot.package_version("hy3dworld"),
+        }
+        paths = model_snapshot.hf_repo_dirs(sources) + [Path(p) for p in local_sources]
+        return model_snapshot.source_fingerprint(paths, options)
+    
+    return snapshots.loader(name, build, fingerprint, _device)
+
+registry.register("hunyuan_panogen", _snapshotted("hunyuan_panogen", _load_hunyuan_panogen, PANOGEN_SOURCES))
+registry.register(
+    "hunyuan_scenegen",
+    _snapshotted("hunyuan_scenegen", _load_hunyuan_scenegen, SCENEGEN_SOURCES, SCENEGEN_LOCAL_SOURCES)
+)
+registry.register("worldgen_t2s", lambda: _load_worldgen("t2s"))
+registry.register("worldgen_i2s", lambda: _load_worldgen("i2s"))
 
 def initialize_hunyuan():
-    """Initialize HunyuanWorld-1.0 model"""
-    global hunyuan_panogen
+    """Initialize HunyuanWorld-1.0 models (PanoGen and SceneGen)"""
+    if _uses_workers("hunyuan"):
+        return worker_pool.broadcast("initialize_hunyuan", "hunyuan")
     try:
-        sys.path.insert(0, str(HUNYUAN_PATH))
-        from hy3dworld.panogen import PanoGen
-        
-        hunyuan_panogen = PanoGen(
-            device="cuda" if torch.cuda.is_available() else "cpu",
-            fp8_gemm=True,  # Use quantization for lower memory
-            fp8_attention=True
-        )
-        return "HunyuanWorld-1.0 initialized successfully!"
+        registry.load("hunyuan_panogen")
+        registry.load("hunyuan_scenegen")
+        summary = _warmup_summary(["hunyuan_panogen", "hunyuan_scenegen"])
+        return f"HunyuanWorld-1.0 initialized successfully!\n{summary}"
     except Exception as e:
         return f"Error initializing HunyuanWorld: {str(e)}\n{traceback.format_exc()}"
 
 def initialize_worldgen():
     """Initialize WorldGen model"""
-    global worldgen_model
+    if _uses_workers("worldgen"):
+        return worker_pool.broadcast("initialize_worldgen", "worldgen")
     try:
-        sys.path.insert(0, str(WORLDGEN_PATH))
-        from worldgen import WorldGen
-        
-        worldgen_model = WorldGen(
-            mode="t2s",
-            device=torch.device("cuda" if torch.cuda.is_available() else "cpu"),
-            low_vram=True  # Enable for consumer GPUs
-        )
-        return "WorldGen initialized successfully!"
+        registry.load("worldgen_t2s")
+        summary = _warmup_summary(["worldgen_t2s"])
+        return f"WorldGen initialized successfully!\n{summary}"
     except Exception as e:
         return f"Error initializing WorldGen: {str(e)}\n{traceback.format_exc()}"
 
-def generate_hunyuan_text2world(prompt, labels_fg1, labels_fg2, scene_class):
-    """Generate 3D world using HunyuanWorld from text"""
-    global hunyuan_panogen
+# wait=True first waits for the start-up load of the backend (if any), so early
+# requests do not need Initialize
+def _hunyuan_ready(wait=False):
+    if wait:
+        preloader.settle("HunyuanWorld-1.0")
+    return registry.is_initialized("hunyuan_panogen") and registry.is_initialized("hunyuan_scenegen")
+
+def _worldgen_ready(wait=False):
+    if wait:
+        preloader.settle("WorldGen")
+    return registry.is_initialized("worldgen_t2s") or registry.is_initialized("worldgen_i2s")
+
+# Seconds each model took for its throwaway warm-up generation (in this process)
+warmup_seconds = {}
+
+def _warm_up(name, run):
+    start = time.perf_counter()
+    with registry.use(name) as model:
+        run(model)
+    warmup_seconds[name] = time.perf_counter() - start
+
+def _warmup_summary(names):
+    summary = registry.summary(names)
+    warmed = [f"{name} {warmup_seconds[name]:.1f}s" for name in names if name in warmup_seconds]
+    if warmed:
+        summary += "\nWarm-up generation: " + ", ".join(warmed)
+    return summary
+
+def warm_up_hunyuan():
+    """Load the HunyuanWorld models and run one throwaway generation through them (start-up step)"""
+    if _uses_workers("hunyuan"):
+        return worker_pool.broadcast("warm_up_hunyuan", "hunyuan", strict=True)
+    registry.load("hunyuan_panogen")
+    registry.load("hunyuan_scenegen")
+    if preload.WARMUP_INFERENCE:
+        # Straight to the models: the result cache would answer a repeated prompt
+        output_dir = artifacts.new_dir("warmup_")
+        try:
+            _warm_up("hunyuan_panogen", lambda model: model.generate(
+                prompt=preload.WARMUP_PROMPT,
+                output_path=str(output_dir)
+            ))
+            _warm_up("hunyuan_scenegen", lambda model: model.generate(
+                image_path=str(output_dir / "panorama.png"),
+                labels_fg1=[],
+                labels_fg2=[],
+                classes="outdoor",
+                output_path=str(output_dir)
+            ))
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+    return _warmup_summary(["hunyuan_panogen", "hunyuan_scenegen"])
+
+def warm_up_worldgen():
+    """Load the WorldGen text-to-scene model and run one throwaway generation (start-up step)"""
+    if _uses_workers("worldgen"):
+        return worker_pool.broadcast("warm_up_worldgen", "worldgen", strict=True)
+    registry.load("worldgen_t2s")
+    if preload.WARMUP_INFERENCE:
+        _warm_up("worldgen_t2s", lambda model: model.generate_world(
+            prompt=preload.WARMUP_PROMPT,
+            use_sharp=False,
+            return_mesh=False
+        ))
+    return _warmup_summary(["worldgen_t2s"])
+
+# Optional clean-up of every generated mesh / splat before it is cached (off by default)
+POSTPROCESS = postprocess.from_env()
+
+def _postprocess(output_file, mode):
+    """Run the enabled post-processing steps on a generated file in place"""
+    if not POSTPROCESS["steps"]:
+        return
+    try:
+        with metrics.stage(mode, "postprocess"):
+            stats = postprocess.process_file(output_file, POSTPROCESS)
+    except Exception as e:
+        # Clean-up is best effort; the file stays as generated
+        print(f"Post-processing skipped for {output_file}: {e}")
+        return
+    print(f"Post-processed {output_file}: {postprocess.describe(stats)}")
+
+def _save_worldgen_result(result, output_dir, return_mesh, mode):
+    """Save a WorldGen splat or mesh and return the file path"""
+    with metrics.stage(mode, "save"):
+        if return_mesh:
+            output_file = output_dir / "scene_mesh.ply"
+            if hasattr(result, "save"):
+                result.save(str(output_file))
+            else:
+                import open3d as o3d
+                o3d.io.write_triangle_mesh(str(output_file), result)
+        else:
+            output_file = output_dir / "scene_splat.ply"
+            result.save(str(output_file))
+    _postprocess(output_file, mode)
+    return output_file
+
+# WorldGen splats can also be delivered in the chunked, quantized splat format
+SPLAT_FORMATS = [
+    ("PLY (float32)", "ply"),
+    ("Compressed PLY (quantized; for PlayCanvas / SuperSplat viewers)", "compressed"),
+]
+SPLAT_PRUNE_OPACITY = float(os.environ.get("WORLD3D_SPLAT_PRUNE_OPACITY", "0.005"))
+
+def _splat_format(mode, args):
+    """The optional splat_format argument that follows the WorldGen parameters"""
+    base = 3 if mode == "worldgen_text2scene" else 4
+    return args[base] if len(args) > base else "ply"
+
+def _compressed_splat(splat_file, output_dir):
+    """Write the compressed version of a float splat PLY into output_dir"""
+    target = Path(output_dir) / "scene_splat.compressed.ply"
+    splat_io.compress_file(splat_file, target, prune_opacity=SPLAT_PRUNE_OPACITY)
+    return target
+
+def _store_worldgen_result(mode, args, result, return_mesh, splat_format="ply"):
+    """Save a WorldGen result plus its previews or compressed splat and cache them
+    
+    Returns the file to show: the mesh, the float splat or the compressed one.
+    """
+    output_dir = artifacts.new_dir("worldgen_")
+    output_file = _save_worldgen_result(result, output_dir, return_mesh, mode)
+    files = {output_file.name: output_file}
+    if return_mesh:
+        files.update(_add_mesh_lods(output_file, mode))
+    elif splat_format == "compressed":
+        with metrics.stage(mode, "compress"):
+            output_file = _compressed_splat(output_file, output_dir)
+        files[output_file.name] = output_file
+    result_cache.put(request_key(mode, *args), files)
+    return output_file
+
+# Outputs of every request live under one root and are evicted by age and size
+artifacts = artifact_store.from_env(sweep_on_start=False)
+
+# Identical requests are answered from a content-addressed cache of earlier outputs
+result_cache = ResultCache(
+    root=os.environ.get("WORLD3D_CACHE_DIR", "outputs/cache"),
+    max_bytes=budget_from_env("WORLD3D_CACHE_MAX_GB", 20 * GB),
+    scan=False
+)
+
+# Requests asked for (?profile=1 on the JSON API), sampled or slower than a
+# threshold are profiled; their traces land next to their outputs
+profiler = request_profiler.from_env(artifacts.new_dir)
+
+def _import_hunyuan():
+    sys.path.insert(0, str(HUNYUAN_PATH))
+    import hy3dworld.panogen
+    import hy3dworld.scenegen
+
+def _import_worldgen():
+    sys.path.insert(0, str(WORLDGEN_PATH))
+    import worldgen
+
+def _import_open3d():
+    import open3d
+
+# Start-up work that is not needed to serve the UI runs in the background once
+# the port is bound (see __main__); anything that needs a step first waits for it.
+# The model packages are only imported by backends that run in this process.
+_warmup = [("torch", _setup_device)]
+if not fake_models.enabled():
+    if not _uses_workers("hunyuan"):
+        _warmup.append(("hy3dworld", _import_hunyuan))
+    if not _uses_workers("worldgen"):
+        _warmup.append(("worldgen", _import_worldgen))
+_warmup += [("open3d", _import_open3d, True), ("cache", result_cache.scan), ("artifacts", artifacts.sweep)]
+
+# Then the models are loaded and warmed up (WORLD3D_AUTOLOAD, default all), so
+# the first request does not pay for it. Pool workers are warmed up by the app
+# process's broadcast, which also repeats it after a restart.
+AUTOLOAD = preload.autoload_from_env(["hunyuan", "worldgen"]) if "WORLD3D_WORKER" not in os.environ else []
+if "hunyuan" in AUTOLOAD:
+    _warmup.append(("HunyuanWorld-1.0", warm_up_hunyuan))
+if "worldgen" in AUTOLOAD:
+    _warmup.append(("WorldGen", warm_up_worldgen))
+preloader = preload.Preloader(_warmup)
+
+def readiness():
+    """(ready, details) for /readyz: warm-up finished and every pool worker up"""
+    ready = preloader.ready()
+    details = {"steps": preloader.stats(), "warmup_seconds": warmup_seconds}
+    if worker_pool is not None:
+        workers = worker_pool.stats()["workers"]
+        ready = ready and all(w["ready"] for w in workers)
+        details["workers"] = [{"device": w["device"], "group": w["group"], "ready": w["ready"]} for w in workers]
+    return ready, details
+
+# Every generated mesh also gets decimated, quantized GLB previews that the UI
+# shows (smallest first) before the full mesh
+MESH_LODS = mesh_lod.parse_resolutions(os.environ.get("WORLD3D_MESH_LODS", "64,256"))
+# Optional pause after each preview (the full mesh is already on disk, so none by default)
+LOD_STEP_SECONDS = float(os.environ.get("WORLD3D_LOD_STEP_S", "0"))
+
+def _add_mesh_lods(mesh_file, mode):
+    """Write LOD previews next to a mesh; returns {file name: path} of the previews"""
+    if not MESH_LODS:
+        return {}
+    try:
+        with metrics.stage(mode, "lods"):
+            levels = mesh_lod.build_lods(mesh_file, resolutions=MESH_LODS)
+    except Exception as e:
+        # Previews are best effort; the full mesh is still returned
+        print(f"Mesh LODs skipped for {mesh_file}: {e}")
+        return {}
+    return {level["path"].name: level["path"] for level in levels[:-1]}
+
+def _mesh_previews(mesh_file):
+    """LOD previews stored next to mesh_file, smallest first
     
-    if hunyuan_panogen is None:
-        return None, None, "Please initialize HunyuanWorld-1.0 first!"
+    Previews that are not at least half the size of the mesh are skipped:
+    they would not show up noticeably sooner.
+    """
+    mesh_file = Path(mesh_file)
+    limit = mesh_file.stat().st_size / 2
+    previews = [p for p in mesh_file.parent.glob(f"{mesh_file.stem}_*.glb") if p.stat().st_size <= limit]
+    return sorted(previews, key=lambda path: path.stat().st_size)
+
+def progressive(result, mesh_output):
+    """Yield result with its mesh swapped for each LOD preview, then result itself"""
+    mesh = result[mesh_output] if mesh_output is not None else None
+    if isinstance(mesh, str):
+        previews = _mesh_previews(mesh)
+        full_size = format_bytes(Path(mesh).stat().st_size)
+        for i, preview in enumerate(previews, 1):
+            update = list(result)
+            update[mesh_output] = str(preview)
+            update[-1] = (
+                f"{result[-1]}\n⏳ Showing preview {i}/{len(previews)} "
+                f"({format_bytes(preview.stat().st_size)}), loading full mesh ({full_size})..."
+            )
+            yield tuple(update)
+            if LOD_STEP_SECONDS:
+                time.sleep(LOD_STEP_SECONDS)
+    yield result
+
+def _model_versions():
+    suffix = "+fake" if fake_models.enabled() else "+fp8"
+    return {
+        "hunyuan": model_version(HUNYUAN_PATH, suffix),
+        "worldgen": model_version(WORLDGEN_PATH, "+fake" if fake_models.enabled() else ""),
+    }
+
+MODEL_VERSIONS = _model_versions()
+
+def _labels(labels):
+    return " ".join(labels.split()) if labels else ""
+
+def request_key(mode, *args):
+    """Cache key of a generate_* call from its normalized parameters"""
+    if mode == "hunyuan_text2world":
+        prompt, labels_fg1, labels_fg2, scene_class = args
+        params, image = {"prompt": (prompt or "").strip()}, None
+    elif mode in ("hunyuan_image2world", "hunyuan_pano2world"):
+        image, labels_fg1, labels_fg2, scene_class = args
+        params = {}
+    elif mode == "worldgen_text2scene":
+        # A trailing splat_format only changes the delivered file, not the scene
+        prompt, use_sharp, return_mesh = args[:3]
+        params, image = {"prompt": (prompt or "").strip()}, None
+    else:
+        image, prompt, use_sharp, return_mesh = args[:4]
+        params = {"prompt": (prompt or "").strip()}
     
+    if mode.startswith("hunyuan"):
+        params.update(labels_fg1=_labels(labels_fg1), labels_fg2=_labels(labels_fg2), classes=scene_class)
+        version = MODEL_VERSIONS["hunyuan"]
+    else:
+        params.update(use_sharp=bool(use_sharp), return_mesh=bool(return_mesh))
+        version = MODEL_VERSIONS["worldgen"]
+    if POSTPROCESS["steps"]:
+        params["postprocess"] = postprocess.signature(POSTPROCESS)
+    return cache_key(mode, version, params, image_path=image)
+
+def cached_result(mode, *args, record_miss=True):
+    """Outputs of an earlier identical request, or None"""
+    entry = result_cache.get(request_key(mode, *args), record_miss=record_miss)
+    if entry is None:
+        return None
+    if mode.startswith("hunyuan"):
+        return str(entry["panorama.png"]), str(entry["scene_mesh.glb"]), "Generation successful! (cached)"
+    if "scene_mesh.ply" in entry:
+        output_file = entry["scene_mesh.ply"]
+    elif _splat_format(mode, args) == "compressed":
+        output_file = entry.get("scene_splat.compressed.ply")
+        if output_file is None:
+            output_file = _compressed_splat(entry["scene_splat.ply"], artifacts.new_dir("worldgen_"))
+    else:
+        output_file = entry["scene_splat.ply"]
+    return str(output_file), "Generation successful! (cached)"
+
+def inflight_key(mode, args):
+    """Key under which identical requests share one job while it is queued or running
+    
+    Unlike the cache key it includes the splat format, which changes the file
+    a WorldGen request returns. None if the request cannot be keyed (e.g. its
+    input image is gone).
+    """
     try:
-        # Create output directory
-        output_dir = Path(tempfile.mkdtemp(prefix="hunyuan_"))
-        
-        # Step 1: Generate panorama
-        pano_result = hunyuan_panogen.generate(
-            prompt=prompt,
-            output_path=str(output_dir)
-        )
-        
-        pano_path = output_dir / "panorama.png"
-        
-        # Step 2: Generate 3D scene
-        sys.path.insert(0, str(HUNYUAN_PATH))
-        from hy3dworld.scenegen import SceneGen
-        
-        scenegen = SceneGen(
-            device="cuda" if torch.cuda.is_available() else "cpu",
-            fp8_gemm=True,
-            fp8_attention=True
-        )
-        
-        labels_fg1_list = labels_fg1.split() if labels_fg1 else []
-        labels_fg2_list = labels_fg2.split() if labels_fg2 else []
+        key = request_key(mode, *args)
+    except OSError:
+        return None
+    if mode.startswith("worldgen"):
+        key += ":" + str(_splat_format(mode, args))
+    return key
+
+def cost_key(mode, args):
+    """Scheduler cost key: the mode plus the parameters that change how long a request runs"""
+    if not mode.startswith("worldgen"):
+        return (mode,)
+    use_sharp, return_mesh = args[1:3] if mode == "worldgen_text2scene" else args[2:4]
+    output = "mesh" if return_mesh else f"splat-{_splat_format(mode, args)}"
+    return (mode, "sharp" if use_sharp else "fast", output)
+
+def current_user():
+    """Who the running Gradio event is for (login or client address), for fair share; None outside one"""
+    try:
+        from gradio.context import LocalContext
+        request = LocalContext.request.get(None)
+    except (ImportError, AttributeError):
+        return None
+    if request is None:
+        return None
+    client = getattr(request, "client", None)
+    return getattr(request, "username", None) or getattr(client, "host", None)
+
+def _panorama_key(prompt="", image=None):
+    return cache_key(
+        "hunyuan_panorama",
+        MODEL_VERSIONS["hunyuan"],
+        {"prompt": (prompt or "").strip()},
+        image_path=image
+    )
+
+def _generate_panorama(output_dir, prompt="", image=None):
+    """Stage 1: PanoGen, reusing the cached panorama of an identical prompt/image"""
+    pano_path = output_dir / "panorama.png"
+    key = _panorama_key(prompt, image)
+    
+    entry = result_cache.get(key)
+    if entry is not None:
+        shutil.copy2(entry["panorama.png"], pano_path)
+        return pano_path, True
+    
+    with registry.use("hunyuan_panogen") as hunyuan_panogen:
+        if image is None:
+            hunyuan_panogen.generate(
+                prompt=prompt,
+                output_path=str(output_dir)
+            )
+        else:
+            hunyuan_panogen.generate(
+                prompt="",
+                image_path=image,
+                output_path=str(output_dir)
+            )
+    
+    result_cache.put(key, {"panorama.png": pano_path})
+    return pano_path, False
+
+def _generate_panoramas(prompts, output_dirs):
+    """Stage 1 for several prompts, in a single PanoGen call where supported"""
+    pano_paths = [Path(output_dir) / "panorama.png" for output_dir in output_dirs]
+    missing = []
+    for i, prompt in enumerate(prompts):
+        entry = result_cache.get(_panorama_key(prompt))
+        if entry is not None:
+            shutil.copy2(entry["panorama.png"], pano_paths[i])
+        else:
+            missing.append(i)
+    
+    if missing:
+        with registry.use("hunyuan_panogen") as hunyuan_panogen:
+            if hasattr(hunyuan_panogen, "generate_batch"):
+                hunyuan_panogen.generate_batch(
+                    prompts=[prompts[i] for i in missing],
+                    output_paths=[str(output_dirs[i]) for i in missing]
+                )
+            else:
+                for i in missing:
+                    hunyuan_panogen.generate(prompt=prompts[i], output_path=str(output_dirs[i]))
         
-        scene_result = scenegen.generate(
+        for i in missing:
+            result_cache.put(_panorama_key(prompts[i]), {"panorama.png": pano_paths[i]})
+    
+    return pano_paths
+
+def _generate_scene(output_dir, pano_path, labels_fg1, labels_fg2, scene_class):
+    """Stage 2: SceneGen on a panorama; returns the mesh path or None"""
+    labels_fg1_list = labels_fg1.split() if labels_fg1 else []
+    labels_fg2_list = labels_fg2.split() if labels_fg2 else []
+    
+    with registry.use("hunyuan_scenegen") as hunyuan_scenegen:
+        hunyuan_scenegen.generate(
             image_path=str(pano_path),
             labels_fg1=labels_fg1_list,
             labels_fg2=labels_fg2_list,
             classes=scene_class,
             output_path=str(output_dir)
         )
-        
-        # Find output files
-        mesh_file = output_dir / "scene_mesh.glb"
-        
-        if mesh_file.exists():
-            return str(pano_path), str(mesh_file), "Generation successful!"
-        else:
-            return str(pano_path), None, f"Generation completed but mesh not found. Check: {output_dir}"
-            
-    except Exception as e:
-        return None, None, f"Error: {str(e)}\n{traceback.format_exc()}"
+    
+    mesh_file = output_dir / "scene_mesh.glb"
+    return mesh_file if mesh_file.exists() else None
 
-def generate_hunyuan_image2world(image, labels_fg1, labels_fg2, scene_class):
-    """Generate 3D world using HunyuanWorld from image"""
-    global hunyuan_panogen
+def _postprocess_stage(requests):
+    """Pipeline stage 3: clean up the meshes on the CPU while SceneGen runs the next request"""
+    for r in requests:
+        if r["mesh_file"] is not None:
+            _postprocess(r["mesh_file"], r["mode"])
+    return requests
+
+def _panorama_stage(requests):
+    """Pipeline stage 1: PanoGen for every request without a panorama yet"""
+    pending = [r for r in requests if r["pano_path"] is None]
+    if len(pending) > 1 and all(r["image"] is None for r in pending):
+        # One observation for the shared pass
+        with metrics.stage(pending[0]["mode"], "panogen"):
+            pano_paths = _generate_panoramas([r["prompt"] for r in pending], [r["output_dir"] for r in pending])
+        for r, pano_path in zip(pending, pano_paths):
+            r["pano_path"] = pano_path
+    else:
+        for r in pending:
+            with metrics.stage(r["mode"], "panogen"):
+                r["pano_path"], r["pano_cached"] = _generate_panorama(r["output_dir"], prompt=r["prompt"], image=r["image"])
+    return requests
+
+def _scene_stage(requests):
+    """Pipeline stage 2: SceneGen for every request"""
+    for r in requests:
+        # Includes writing the GLB, which SceneGen does itself
+        with metrics.stage(r["mode"], "scenegen"):
+            r["mesh_file"] = _generate_scene(r["output_dir"], r["pano_path"], r["labels_fg1"], r["labels_fg2"], r["scene_class"])
+    return requests
+
+def _hunyuan_request(labels_fg1, labels_fg2, scene_class, prompt="", image=None, panorama=None,
+                     mode="hunyuan_text2world"):
+    """Pipeline state for one request; a given panorama skips PanoGen"""
+    output_dir = artifacts.new_dir("hunyuan_")
+    pano_path = None
+    if panorama is not None:
+        pano_path = output_dir / "panorama.png"
+        shutil.copy2(panorama, pano_path)
+    return {
+        "mode": mode,
+        "output_dir": output_dir,
+        "prompt": prompt,
+        "image": image,
+        "pano_path": pano_path,
+        "pano_cached": False,
+        "labels_fg1": labels_fg1,
+        "labels_fg2": labels_fg2,
+        "scene_class": scene_class,
+        "mesh_file": None,
+    }
+
+def _hunyuan_result(mode, request_args, request, timings=""):
+    """Cache a finished request and build its (panorama, mesh, status) tuple"""
+    pano_path, mesh_file = request["pano_path"], request["mesh_file"]
+    if mesh_file is None:
+        return str(pano_path), None, f"Generation completed but mesh not found. Check: {request['output_dir']}"
     
-    if hunyuan_panogen is None:
-        return None, None, "Please initialize HunyuanWorld-1.0 first!"
+    result_cache.put(
+        request_key(mode, *request_args),
+        {"panorama.png": pano_path, "scene_mesh.glb": mesh_file, **_add_mesh_lods(mesh_file, mode)}
+    )
+    return str(pano_path), str(mesh_file), f"Generation successful!\n{timings}".strip()
+
+# PanoGen and SceneGen run as separate pipeline workers, so the panorama of the
+# next request is generated while SceneGen builds the current mesh. Each stage
+# only starts when its model fits next to the other one in the memory ceiling.
+# Post-processing, when enabled, is a third stage that needs no device memory.
+hunyuan_pipeline = StagedPipeline(
+    [
+        ("panogen", _panorama_stage, lambda: registry.footprint("hunyuan_panogen")),
+        ("scenegen", _scene_stage, lambda: registry.footprint("hunyuan_scenegen")),
+    ] + ([("postprocess", _postprocess_stage, 0)] if POSTPROCESS["steps"] else []),
+    queue_size=int(os.environ.get("WORLD3D_PIPELINE_QUEUE", "1")),
+    memory_ceiling_bytes=budget_from_env("WORLD3D_PIPELINE_MEMORY_GB", registry.device_budget_bytes)
+)
+
+def _run_hunyuan(mode, request_args, labels_fg1, labels_fg2, scene_class, prompt="", image=None, panorama=None):
+    """Run the Hunyuan stages for one request, skipping whatever is cached
+    
+    Yields (panorama, mesh, status) after each stage, so the panorama shows up
+    as soon as PanoGen finishes; the last value is the final result.
+    """
+    if not _hunyuan_ready(wait=True):
+        yield None, None, "Please initialize HunyuanWorld-1.0 first!"
+        return
     
     try:
-        # Create output directory
-        output_dir = Path(tempfile.mkdtemp(prefix="hunyuan_"))
-        
-        # Step 1: Generate panorama from image
-        pano_result = hunyuan_panogen.generate(
-            prompt="",
-            image_path=image,
-            output_path=str(output_dir)
-        )
-        
-        pano_path = output_dir / "panorama.png"
-        
-        # Step 2: Generate 3D scene
-        sys.path.insert(0, str(HUNYUAN_PATH))
-        from hy3dworld.scenegen import SceneGen
-        
-        scenegen = SceneGen(
-            device="cuda" if torch.cuda.is_available() else "cpu",
-            fp8_gemm=True,
-            fp8_attention=True
-        )
+        cached = cached_result(mode, *request_args)
+        if cached:
+            yield cached
+            return
         
-        labels_fg1_list = labels_fg1.split() if labels_fg1 else []
-        labels_fg2_list = labels_fg2.split() if labels_fg2 else []
-        
-        scene_result = scenegen.generate(
-            image_path=str(pano_path),
-            labels_fg1=labels_fg1_list,
-            labels_fg2=labels_fg2_list,
-            classes=scene_class,
-            output_path=str(output_dir)
+        start = time.perf_counter()
+        request = _hunyuan_request(
+            labels_fg1, labels_fg2, scene_class, prompt=prompt, image=image, panorama=panorama, mode=mode
         )
         
-        # Find output files
-        mesh_file = output_dir / "scene_mesh.glb"
-        
-        if mesh_file.exists():
-            return str(pano_path), str(mesh_file), "Generation successful!"
-        else:
-            return str(pano_path), None, f"Generation completed but mesh not found. Check: {output_dir}"
+        # Held until the UI has taken the last update, so the files being
+        # streamed are never evicted
+        with artifacts.hold(request["output_dir"]):
+            item = hunyuan_pipeline.submit([request])
+            
+            # Step 1: Generate panorama (or reuse the given / cached one)
+            if panorama is not None:
+                pano_note = "Panorama: provided"
+            else:
+                yield None, None, "⏳ Stage 1/2: generating panorama..."
+                item.wait_stage("panogen")
+                if item.error is not None:
+                    raise item.error
+                pano_seconds = time.perf_counter() - start
+                pano_note = "Panorama: reused from cache" if request["pano_cached"] else f"Panorama: {pano_seconds:.1f}s"
             
+            yield str(request["pano_path"]), None, f"✅ {pano_note}\n⏳ Stage 2/2: building 3D scene..."
+            
+            # Step 2: Generate 3D scene
+            item.wait()
+            if item.error is not None:
+                raise item.error
+            timings = f"{pano_note}, Scene: {item.stage_seconds['scenegen']:.1f}s, "
+            if "postprocess" in item.stage_seconds:
+                timings += f"Post-processing: {item.stage_seconds['postprocess']:.1f}s, "
+            timings += f"Total: {time.perf_counter() - start:.1f}s"
+            yield _hunyuan_result(mode, request_args, request, timings)
+        
     except Exception as e:
-        return None, None, f"Error: {str(e)}\n{traceback.format_exc()}"
+        yield None, None, f"Error: {str(e)}\n{traceback.format_exc()}"
 
-def generate_worldgen_text2scene(prompt, use_sharp, return_mesh):
-    """Generate 3D scene using WorldGen from text"""
-    global worldgen_model
+def last_update(updates):
+    """Final value of a streaming generate function (or a plain result)"""
+    if not inspect.isgenerator(updates):
+        return updates
+    result = None
+    for result in updates:
+        pass
+    return result
+
+@on_workers("hunyuan")
+@metrics.instrumented("hunyuan_text2world")
+@profiler.profiled("hunyuan_text2world")
+def generate_hunyuan_text2world(prompt, labels_fg1, labels_fg2, scene_class):
+    """Generate 3D world using HunyuanWorld from text (streams stage progress)"""
+    yield from _run_hunyuan(
+        "hunyuan_text2world", (prompt, labels_fg1, labels_fg2, scene_class),
+        labels_fg1, labels_fg2, scene_class, prompt=prompt
+    )
+
+@on_workers("hunyuan")
+@metrics.instrumented("hunyuan_image2world")
+@profiler.profiled("hunyuan_image2world")
+def generate_hunyuan_image2world(image, labels_fg1, labels_fg2, scene_class):
+    """Generate 3D world using HunyuanWorld from image (streams stage progress)"""
+    yield from _run_hunyuan(
+        "hunyuan_image2world", (image, labels_fg1, labels_fg2, scene_class),
+        labels_fg1, labels_fg2, scene_class, image=image
+    )
+
+@on_workers("hunyuan")
+@metrics.instrumented("hunyuan_pano2world")
+@profiler.profiled("hunyuan_pano2world")
+def generate_hunyuan_pano2world(panorama, labels_fg1, labels_fg2, scene_class):
+    """Regenerate the 3D scene from an existing panorama (SceneGen only)"""
+    if not panorama:
+        yield None, None, "Generate or upload a panorama first!"
+        return
     
-    if worldgen_model is None:
+    yield from _run_hunyuan(
+        "hunyuan_pano2world", (panorama, labels_fg1, labels_fg2, scene_class),
+        labels_fg1, labels_fg2, scene_class, panorama=panorama
+    )
+
+@on_workers("worldgen")
+@metrics.instrumented("worldgen_text2scene")
+@profiler.profiled("worldgen_text2scene")
+def generate_worldgen_text2scene(prompt, use_sharp, return_mesh, splat_format="ply"):
+    """Generate 3D scene using WorldGen from text"""
+    if not _worldgen_ready(wait=True):
         return None, "Please initialize WorldGen first!"
     
     try:
-        output_dir = Path(tempfile.mkdtemp(prefix="worldgen_"))
+        cached = cached_result("worldgen_text2scene", prompt, use_sharp, return_mesh, splat_format)
+        if cached:
+            return cached
         
-        # Generate scene
-        result = worldgen_model.generate_world(
-            prompt=prompt,
-            use_sharp=use_sharp,
-            return_mesh=return_mesh
-        )
+        # Generate scene (reloads or restores the text-to-scene model if needed)
+        with registry.use("worldgen_t2s") as worldgen_model, metrics.stage("worldgen_text2scene", "generate_world"):
+            result = worldgen_model.generate_world(
+                prompt=prompt,
+                use_sharp=use_sharp,
+                return_mesh=return_mesh
+            )
         
         # Save output
-        if return_mesh:
-            import open3d as o3d
-            output_file = output_dir / "scene_mesh.ply"
-            o3d.io.write_triangle_mesh(str(output_file), result)
-        else:
-            output_file = output_dir / "scene_splat.ply"
-            result.save(str(output_file))
+        output_file = _store_worldgen_result(
+            "worldgen_text2scene", (prompt, use_sharp, return_mesh), result, return_mesh, splat_format
+        )
         
         return str(output_file), "Generation successful!"
         
     except Exception as e:
         return None, f"Error: {str(e)}\n{traceback.format_exc()}"
 
-def generate_worldgen_image2scene(image, prompt, use_sharp, return_mesh):
+@on_workers("worldgen")
+@metrics.instrumented("worldgen_image2scene")
+@profiler.profiled("worldgen_image2scene")
+def generate_worldgen_image2scene(image, prompt, use_sharp, return_mesh, splat_format="ply"):
     """Generate 3D scene using WorldGen from image"""
-    global worldgen_model
-    
-    if worldgen_model is None:
+    if not _worldgen_ready(wait=True):
         return None, "Please initialize WorldGen first!"
     
     try:
-        # Switch to image-to-scene mode if needed
-        if worldgen_model.mode != "i2s":
-            worldgen_model = None
-            from worldgen import WorldGen
-            worldgen_model = WorldGen(
-                mode="i2s",
-                device=torch.device("cuda" if torch.cuda.is_available() else "cpu"),
-                low_vram=True
-            )
-        
-        output_dir = Path(tempfile.mkdtemp(prefix="worldgen_"))
+        cached = cached_result("worldgen_image2scene", image, prompt, use_sharp, return_mesh, splat_format)
+        if cached:
+            return cached
         
         # Load image
         img = Image.open(image) if isinstance(image, str) else image
         
-        # Generate scene
-        result = worldgen_model.generate_world(
-            image=img,
-            prompt=prompt,
-            use_sharp=use_sharp,
-            return_mesh=return_mesh
-        )
+        # Generate scene; the text-to-scene model stays resident if it fits
+        with registry.use("worldgen_i2s") as worldgen_model, metrics.stage("worldgen_image2scene", "generate_world"):
+            result = worldgen_model.generate_world(
+                image=img,
+                prompt=prompt,
+                use_sharp=use_sharp,
+                return_mesh=return_mesh
+            )
         
         # Save output
-        if return_mesh:
-            import open3d as o3d
-            output_file = output_dir / "scene_mesh.ply"
-            o3d.io.write_triangle_mesh(str(output_file), result)
-        else:
-            output_file = output_dir / "scene_splat.ply"
-            result.save(str(output_file))
+        output_file = _store_worldgen_result(
+            "worldgen_image2scene", (image, prompt, use_sharp, return_mesh), result, return_mesh, splat_format
+        )
         
         return str(output_file), "Generation successful!"
         
     except Exception as e:
         return None, f"Error: {str(e)}\n{traceback.format_exc()}"
 
+@on_workers("hunyuan")
+def _hunyuan_text2world_batch(requests):
+    """Run several text-to-world requests, sharing one PanoGen pass"""
+    if not _hunyuan_ready(wait=True):
+        return [(None, None, "Please initialize HunyuanWorld-1.0 first!")] * len(requests)
+    
+    try:
+        # SceneGen depends on each request's labels, so it runs per request
+        with metrics.request("hunyuan_text2world"):
+            states = hunyuan_pipeline.run([
+                _hunyuan_request(labels_fg1, labels_fg2, scene_class, prompt=prompt)
+                for prompt, labels_fg1, labels_fg2, scene_class in requests
+            ])
+            results = [
+                _hunyuan_result("hunyuan_text2world", args, state)
+                for args, state in zip(requests, states)
+            ]
+    except Exception as e:
+        results = [(None, None, f"Error: {str(e)}\n{traceback.format_exc()}")] * len(requests)
+    for result in results:
+        metrics.outcome("hunyuan_text2world", result)
+    return results
+
+@on_workers("worldgen")
+def _worldgen_text2scene_batch(requests):
+    """Run several text-to-scene requests that share use_sharp/return_mesh"""
+    if not _worldgen_ready(wait=True):
+        return [(None, "Please initialize WorldGen first!")] * len(requests)
+    
+    try:
+        prompts = [args[0] for args in requests]
+        use_sharp, return_mesh = requests[0][1:3]
+        
+        with metrics.request("worldgen_text2scene"):
+            with registry.use("worldgen_t2s") as worldgen_model, metrics.stage("worldgen_text2scene", "generate_world"):
+                if hasattr(worldgen_model, "generate_world_batch"):
+                    results = worldgen_model.generate_world_batch(
+                        prompts=prompts,
+                        use_sharp=use_sharp,
+                        return_mesh=return_mesh
+                    )
+                else:
+                    results = [
+                        worldgen_model.generate_world(prompt=prompt, use_sharp=use_sharp, return_mesh=return_mesh)
+                        for prompt in prompts
+                    ]
+            
+            outputs = []
+            for args, result in zip(requests, results):
+                output_file = _store_worldgen_result(
+                    "worldgen_text2scene", args[:3], result, return_mesh, _splat_format("worldgen_text2scene", args)
+                )
+                outputs.append((str(output_file), "Generation successful!"))
+        
+    except Exception as e:
+        outputs = [(None, f"Error: {str(e)}\n{traceback.format_exc()}")] * len(requests)
+    for output in outputs:
+        metrics.outcome("worldgen_text2scene", output)
+    return outputs
+
+# Text requests that may share one model call: mode -> (batch key, batch function).
+# Queued requests with the same key are collected for a short window and run together.
+BATCHING = {
+    "hunyuan_text2world": (
+        lambda prompt, labels_fg1, labels_fg2, scene_class: "hunyuan_text2world",
+        _hunyuan_text2world_batch
+    ),
+    "worldgen_text2scene": (
+        lambda prompt, use_sharp, return_mesh, splat_format="ply": (
+            "worldgen_text2scene", bool(use_sharp), bool(return_mesh), splat_format
+        ),
+        _worldgen_text2scene_batch
+    ),
+}
+
+# Generations run on a bounded worker pool per backend so parallel clicks never
+# share a model object; the Gradio handlers only submit jobs and poll them
+def _replicas(backend):
+    return worker_pool.replicas(backend) if _uses_workers(backend) else 1
+
+scheduler = JobScheduler(
+    limits={
+        # Two Hunyuan jobs keep both pipeline stages busy; the limits are per device
+        "hunyuan": int(os.environ.get("WORLD3D_HUNYUAN_CONCURRENCY", "2")) * _replicas("hunyuan"),
+        "worldgen": int(os.environ.get("WORLD3D_WORLDGEN_CONCURRENCY", "1")) * _replicas("worldgen"),
+    },
+    max_queue_depth=int(os.environ.get("WORLD3D_MAX_QUEUE_DEPTH", "16")),
+    batch_window=float(os.environ.get("WORLD3D_BATCH_WINDOW_MS", "50")) / 1000,
+    max_batch_size=int(os.environ.get("WORLD3D_MAX_BATCH_SIZE", "8")),
+    # Cheapest expected job first; waiting and other users' run time shift the order
+    aging=float(os.environ.get("WORLD3D_SCHED_AGING", "1.0")),
+    fair_share=float(os.environ.get("WORLD3D_FAIR_SHARE", "1.0")),
+    share_half_life=float(os.environ.get("WORLD3D_FAIR_SHARE_HALF_LIFE_S", "600"))
+)
+
+# Jobs projected to finish later than this (seconds after submission) are rejected; 0 = no deadline
+DEADLINES = {
+    "hunyuan": float(os.environ.get("WORLD3D_HUNYUAN_DEADLINE_S", "0")),
+    "worldgen": float(os.environ.get("WORLD3D_WORLDGEN_DEADLINE_S", "0")),
+}
+
+def generate_profiled(name, *args):
+    """Run generate function name with its profile forced (how ?profile=1 reaches a pool worker)"""
+    with request_profiler.force():
+        result = getattr(sys.modules[__name__], name)(*args)
+        if inspect.isgenerator(result):
+            yield from result
+        else:
+            yield result
+
+def _profiled_call(backend, fn):
+    """fn with its profile forced, wherever it runs"""
+    if _uses_workers(backend):
+        return functools.partial(worker_pool.stream, "generate_profiled", fn.__name__, group=backend)
+    return request_profiler.forcing(fn)
+
+def submit_job(backend, mode, fn, args, profile=False, user=None, deadline=None):
+    """Answer from the result cache or queue fn(*args) on the scheduler; returns the Job
+    
+    Cache hits come back as an already finished job (job.fn is None). A
+    request identical to one still queued or running gets that job, so both
+    callers share its result. Raises QueueFullError when the backend queue is
+    full, or DeadlineError when the job would not finish within deadline
+    seconds (default: DEADLINES). user is who the request counts against for
+    fair share (default: the Gradio client). profile=True runs the request on
+    its own, unbatched, with its profile forced (see request_profiler); a
+    cache hit has nothing to profile.
+    """
+    if mode is not None:
+        try:
+            cached = cached_result(mode, *args, record_miss=False)
+        except OSError:
+            cached = None  # e.g. the input image is gone; let the job report it
+        if cached:
+            metrics.outcome(mode, cached)
+            return scheduler.finished(backend, cached)
+    
+    options = {
+        "cost_key": cost_key(mode, args) if mode is not None else None,
+        "user": user if user is not None else current_user(),
+        "deadline": deadline or DEADLINES.get(backend) or None,
+    }
+    if profile:
+        return scheduler.submit(backend, _profiled_call(backend, fn), *args, **options)
+    
+    batch_key, batch_fn = None, None
+    if mode in BATCHING:
+        key_fn, batch_fn = BATCHING[mode]
+        batch_key = key_fn(*args)
+    key = inflight_key(mode, args) if mode is not None else None
+    return scheduler.submit(backend, fn, *args, batch_key=batch_key, batch_fn=batch_fn, key=key, **options)
+
+def queued(backend, fn, num_outputs, mode=None, mesh_output=None):
+    """Wrap fn so it runs on the scheduler and streams its queue position
+    
+    Requests already in the result cache are answered without queueing, and
+    text requests are micro-batched with compatible queued ones. The output at
+    index mesh_output shows the mesh's LOD previews before the full mesh.
+    """
+    @functools.wraps(fn)
+    def handler(*args):
+        keep = [gr.update()] * (num_outputs - 1)
+        try:
+            job = submit_job(backend, mode, fn, args)
+        except QueueFullError as e:
+            yield (*keep, f"Server busy: {e}")
+            return
+        if job.fn is None:
+            yield from progressive(job.result, mesh_output)
+            return
+        
+        try:
+            seen = 0
+            while not job.wait(timeout=0.5):
+                if job.updates > seen:
+                    # Partial result from a streaming generate function; the
+                    # final mesh is left to the progressive previews below
+                    seen = job.updates
+                    if mesh_output is None or not isinstance(job.latest[mesh_output], str):
+                        yield job.latest
+                elif job.latest is not None:
+                    yield (*keep, f"{job.latest[-1]}\n({job.run_seconds():.0f}s elapsed)")
+                else:
+                    yield (*keep, job.describe())
+            
+            if job.status == "done":
+                yield from progressive(job.result, mesh_output)
+            elif job.status == "cancelled":
+                yield (*keep, "Cancelled")
+            else:
+                yield (*keep, f"Error: {job.error}")
+        finally:
+            # Cancel button or closed tab: drop the job if it never started
+            job.cancel()
+    
+    return handler
+
+def _run_batch(backend, mode, fn, requests):
+    """Queue one job per request and stream progress until all are done
+    
+    The jobs share a batch key, so the scheduler runs them in micro-batches.
+    Yields (output files, status).
+    """
+    key_fn, batch_fn = BATCHING[mode]
+    user = current_user()
+    files = [None] * len(requests)
+    jobs = {}
+    try:
+        for i, args in enumerate(requests):
+            cached = cached_result(mode, *args, record_miss=False)
+            if cached:
+                metrics.outcome(mode, cached)
+                files[i] = cached[-2]  # mesh (Hunyuan) or scene file (WorldGen)
+            else:
+                jobs[i] = scheduler.submit(
+                    backend, fn, *args, batch_key=key_fn(*args), batch_fn=batch_fn, key=inflight_key(mode, args),
+                    cost_key=cost_key(mode, args), user=user, deadline=DEADLINES.get(backend) or None
+                )
+    except QueueFullError as e:
+        for job in jobs.values():
+            job.cancel()
+        yield None, f"Server busy: {e}"
+        return
+    
+    try:
+        while True:
+            pending = [job for job in jobs.values() if not job.done()]
+            done = len(requests) - len(pending)
+            if not pending:
+                break
+            yield gr.update(), f"⚙️ {done}/{len(requests)} done, {len(pending)} queued or running"
+            pending[0].wait(timeout=0.5)
+    finally:
+        for job in jobs.values():
+            job.cancel()
+    
+    failed = []
+    for i, job in jobs.items():
+        if job.status == "done" and job.result[-2]:
+            files[i] = job.result[-2]
+        else:
+            failed.append(f"#{i + 1}: {job.result[-1] if job.result else job.error}")
+    
+    outputs = [f for f in files if f]
+    status = f"✅ {len(outputs)}/{len(requests)} generated"
+    if failed:
+        status += "\n" + "\n".join(failed)
+    yield outputs, status
+
+def _prompt_lines(prompts):
+    return [line.strip() for line in (prompts or "").splitlines() if line.strip()]
+
+def generate_hunyuan_text2world_batch(prompts, labels_fg1, labels_fg2, scene_class):
+    """Generate one HunyuanWorld GLB per prompt line"""
+    requests = [(prompt, labels_fg1, labels_fg2, scene_class) for prompt in _prompt_lines(prompts)]
+    if not requests:
+        yield None, "Enter at least one prompt (one per line)"
+        return
+    yield from _run_batch("hunyuan", "hunyuan_text2world", generate_hunyuan_text2world, requests)
+
+def generate_worldgen_text2scene_batch(prompts, use_sharp, return_mesh, splat_format="ply"):
+    """Generate one WorldGen scene per prompt line"""
+    requests = [(prompt, use_sharp, return_mesh, splat_format) for prompt in _prompt_lines(prompts)]
+    if not requests:
+        yield None, "Enter at least one prompt (one per line)"
+        return
+    yield from _run_batch("worldgen", "worldgen_text2scene", generate_worldgen_text2scene, requests)
+
+def _warmup_line(model, names, initialized):
+    """Warm-up progress of one backend: its imports, then its models when they load at start-up"""
+    names = [name for name in names + [model] if name in preloader.steps]
+    step = preloader.steps.get(model)
+    if step is not None and step.state == "done":
+        return f"{model} ready ({preloader.report(names)})\n{step.result}"
+    if step is None and initialized:
+        return f"{model} initialized"
+    if not preloader.done():
+        return f"Warming up: {preloader.report(names)}"
+    if step is None:
+        return f"Warm-up done ({preloader.report(names)}). Click Initialize to load the models."
+    return f"Warm-up failed ({preloader.report(names)}). Click Initialize to retry."
+
+def warmup_status():
+    """Stream warm-up progress into the model status boxes until it is done"""
+    deadline = time.time() + 3600
+    while True:
+        done = preloader.done() or not preloader.started() or time.time() > deadline
+        yield (
+            _warmup_line("HunyuanWorld-1.0", ["torch", "hy3dworld"], _hunyuan_ready()),
+            _warmup_line("WorldGen", ["torch", "worldgen", "open3d"], _worldgen_ready()),
+        )
+        if done:
+            return
+        time.sleep(1.0)
+
+def server_status():
+    """Report model residency and the job queues"""
+    stats = scheduler.stats()
+    lines = [f"Warm-up: {preloader.report()}"]
+    if worker_pool is not None:
+        lines.append(worker_pool.report())
+    if not (_uses_workers("hunyuan") and _uses_workers("worldgen")):
+        lines.append(registry.residency_report())
+    lines.append("")
+    for backend, info in stats["backends"].items():
+        lines.append(
+            f"{backend}: {info['running']}/{info['limit']} running, "
+            f"{info['queued']}/{scheduler.max_queue_depth} queued"
+        )
+    lines.append("Jobs: " + ", ".join(f"{k}={v}" for k, v in stats["counters"].items()))
+    if stats["counters"]["coalesced"]:
+        lines.append(
+            f"Coalescing: {stats['counters']['coalesced']} duplicate requests joined a running job, "
+            f"saving {stats['saved_seconds']:.1f}s of generation"
+        )
+    estimates = {name: info for name, info in stats["estimates"].items() if name not in stats["backends"]}
+    if estimates:
+        lines.append("Expected run time: " + ", ".join(
+            f"{name} {info['seconds']:.1f}s ({info['runs']} runs)" for name, info in sorted(estimates.items())
+        ))
+    
+    pipeline = hunyuan_pipeline.stats()  # in this process; idle when the worker pool runs the models
+    stages = ", ".join(
+        f"{name} {info['queued']} queued / {info['busy_seconds']:.0f}s busy"
+        for name, info in pipeline["stages"].items()
+    )
+    lines.append(
+        f"Hunyuan pipeline: {stages}; peak {format_bytes(pipeline['peak_reserved_bytes'])} reserved, "
+        f"{pipeline['counters']['memory_waits']} memory waits"
+    )
+    
+    if snapshots is not None and snapshots.report():
+        lines.append("Snapshots: " + snapshots.report().replace("\n", "; "))
+    if profiler.stats()["profiled"]:
+        lines.append(f"Profiler: {profiler.report()}")
+    
+    cache = result_cache.stats()
+    lines.append(
+        f"Result cache: {cache['entries']} entries, {format_bytes(cache['bytes'])} of "
+        f"{format_bytes(cache['max_bytes'])}, hit rate {cache['hit_rate']:.0%} "
+        f"({cache['hits']} hits, {cache['misses']} misses, {cache['evictions']} evictions)"
+    )
+    
+    store = artifacts.stats()
+    lines.append(
+        f"Artifacts: {store['dirs']} directories, {format_bytes(store['bytes'])} of "
+        f"{format_bytes(store['max_bytes']) if store['max_bytes'] else 'unlimited'} "
+        f"({store['held']} held, {store['expired']} expired, {store['evicted']} evicted), "
+        f"{format_bytes(store['disk_free'])} free on disk"
+    )
+    return "\n".join(lines)
+
+@metrics.on_scrape
+def _metrics_gauges():
+    """Queue, cache, artifact store and device memory gauges, read when /metrics is scraped"""
+    if "WORLD3D_WORKER" not in os.environ:
+        for backend, info in scheduler.stats()["backends"].items():
+            metrics.set_gauge("world3d_queue_depth", info["queued"], backend=backend)
+            metrics.set_gauge("world3d_jobs_running", info["running"], backend=backend)
+        metrics.set_gauge("world3d_cache_bytes", result_cache.stats()["bytes"])
+        artifact_store.record_metrics(artifacts)
+    if registry.device is not None and not (_uses_workers("hunyuan") and _uses_workers("worldgen")):
+        import torch
+        if torch.cuda.is_available():
+            metrics.set_gauge("world3d_device_memory_allocated_bytes", torch.cuda.memory_allocated())
+
+def metrics_samples():
+    """Metrics of this process, for the app process to merge (runs on pool workers)"""
+    metrics.collect()
+    return metrics.snapshot()
+
+def _worker_metrics():
+    """Samples of every ready pool worker, labelled with its index"""
+    if worker_pool is None:
+        return []
+    samples = []
+    for index, worker_samples in worker_pool.gather("metrics_samples").items():
+        samples += metrics.merge(worker_samples, worker=str(index))
+    return samples
+
 # Create Gradio Interface
 with gr.Blocks(title="3D World Generation Studio", theme=gr.themes.Soft()) as demo:
     gr.Markdown("# 🌍 3D World Generation Studio")
@@ -238,7 +1225,10 @@ with gr.Blocks(title="3D World Generation Studio", theme=gr.themes.Soft()) as de
     
     # Model Initialization Section
     with gr.Accordion("🔧 Model Initialization", open=True):
-        gr.Markdown("Initialize the models before use. This may take a few minutes on first run.")
+        gr.Markdown(
+            "Models load and warm up in the background at start-up (WORLD3D_AUTOLOAD). "
+            "Use the buttons to load them by hand or to retry."
+        )
         with gr.Row():
             with gr.Column():
                 init_hunyuan_btn = gr.Button("Initialize HunyuanWorld-1.0", variant="primary")
@@ -246,6 +1236,9 @@ with gr.Blocks(title="3D World Generation Studio", theme=gr.themes.Soft()) as de
             with gr.Column():
                 init_worldgen_btn = gr.Button("Initialize WorldGen", variant="primary")
                 worldgen_status = gr.Textbox(label="Status", interactive=False)
+        with gr.Row():
+            server_status_btn = gr.Button("Show Server Status")
+            server_status_box = gr.Textbox(label="Server Status", interactive=False, lines=8)
     
     # Main Generation Tabs
     with gr.Tabs():
@@ -278,10 +1271,13 @@ with gr.Blocks(title="3D World Generation Studio", theme=gr.themes.Soft()) as de
                                 value="outdoor",
                                 label="Scene Class"
                             )
-                            hy_text_btn = gr.Button("Generate World", variant="primary")
+                            with gr.Row():
+                                hy_text_btn = gr.Button("Generate World", variant="primary")
+                                hy_text_cancel_btn = gr.Button("Cancel", variant="stop")
                         
                         with gr.Column():
                             hy_text_pano = gr.Image(label="Generated Panorama", type="filepath")
+                            hy_text_rescene_btn = gr.Button("Regenerate scene from this panorama")
                             hy_text_mesh = gr.Model3D(label="3D World (GLB)", clear_color=[0.0, 0.0, 0.0, 0.0])
                             hy_text_status = gr.Textbox(label="Status", interactive=False)
                 
@@ -302,12 +1298,37 @@ with gr.Blocks(title="3D World Generation Studio", theme=gr.themes.Soft()) as de
                                 value="outdoor",
                                 label="Scene Class"
                             )
-                            hy_img_btn = gr.Button("Generate World", variant="primary")
+                            with gr.Row():
+                                hy_img_btn = gr.Button("Generate World", variant="primary")
+                                hy_img_cancel_btn = gr.Button("Cancel", variant="stop")
                         
                         with gr.Column():
                             hy_img_pano = gr.Image(label="Generated Panorama", type="filepath")
+                            hy_img_rescene_btn = gr.Button("Regenerate scene from this panorama")
                             hy_img_mesh = gr.Model3D(label="3D World (GLB)", clear_color=[0.0, 0.0, 0.0, 0.0])
                             hy_img_status = gr.Textbox(label="Status", interactive=False)
+                
+                with gr.Tab("Batch"):
+                    gr.Markdown("One prompt per line. Queued prompts share PanoGen passes.")
+                    with gr.Row():
+                        with gr.Column():
+                            hy_batch_prompts = gr.Textbox(
+                                label="Text Prompts",
+                                placeholder="A snowy mountain village at dawn\nA tropical beach with palm trees",
+                                lines=8
+                            )
+                            hy_batch_fg1 = gr.Textbox(label="Foreground Layer 1 (optional)")
+                            hy_batch_fg2 = gr.Textbox(label="Foreground Layer 2 (optional)")
+                            hy_batch_class = gr.Dropdown(
+                                choices=["outdoor", "indoor"],
+                                value="outdoor",
+                                label="Scene Class"
+                            )
+                            hy_batch_btn = gr.Button("Generate Worlds", variant="primary")
+                        
+                        with gr.Column():
+                            hy_batch_files = gr.File(label="3D Worlds (GLB)", file_count="multiple")
+                            hy_batch_status = gr.Textbox(label="Status", interactive=False, lines=4)
         
         # WorldGen Tab
         with gr.Tab("⚡ WorldGen"):
@@ -332,7 +1353,15 @@ with gr.Blocks(title="3D World Generation Studio", theme=gr.themes.Soft()) as de
                                 label="Return Mesh (instead of Gaussian Splat)",
                                 value=False
                             )
-                            wg_text_btn = gr.Button("Generate Scene", variant="primary")
+                            wg_text_format = gr.Dropdown(
+                                choices=SPLAT_FORMATS,
+                                value="ply",
+                                label="Splat Format",
+                                info="Compressed splats are ~4x smaller; the preview here may not render them"
+                            )
+                            with gr.Row():
+                                wg_text_btn = gr.Button("Generate Scene", variant="primary")
+                                wg_text_cancel_btn = gr.Button("Cancel", variant="stop")
                         
                         with gr.Column():
                             wg_text_output = gr.Model3D(label="3D Scene", clear_color=[0.0, 0.0, 0.0, 0.0])
@@ -355,11 +1384,37 @@ with gr.Blocks(title="3D World Generation Studio", theme=gr.themes.Soft()) as de
                                 label="Return Mesh (instead of Gaussian Splat)",
                                 value=False
                             )
-                            wg_img_btn = gr.Button("Generate Scene", variant="primary")
+                            wg_img_format = gr.Dropdown(
+                                choices=SPLAT_FORMATS,
+                                value="ply",
+                                label="Splat Format",
+                                info="Compressed splats are ~4x smaller; the preview here may not render them"
+                            )
+                            with gr.Row():
+                                wg_img_btn = gr.Button("Generate Scene", variant="primary")
+                                wg_img_cancel_btn = gr.Button("Cancel", variant="stop")
                         
                         with gr.Column():
                             wg_img_output = gr.Model3D(label="3D Scene", clear_color=[0.0, 0.0, 0.0, 0.0])
                             wg_img_status = gr.Textbox(label="Status", interactive=False)
+                
+                with gr.Tab("Batch"):
+                    gr.Markdown("One prompt per line. Prompts with the same settings run in batches.")
+                    with gr.Row():
+                        with gr.Column():
+                            wg_batch_prompts = gr.Textbox(
+                                label="Text Prompts",
+                                placeholder="A cozy bedroom with modern furniture\nA medieval library",
+                                lines=8
+                            )
+                            wg_batch_sharp = gr.Checkbox(label="Use ML-Sharp (experimental)", value=False)
+                            wg_batch_mesh = gr.Checkbox(label="Return Mesh (instead of Gaussian Splat)", value=False)
+                            wg_batch_format = gr.Dropdown(choices=SPLAT_FORMATS, value="ply", label="Splat Format")
+                            wg_batch_btn = gr.Button("Generate Scenes", variant="primary")
+                        
+                        with gr.Column():
+                            wg_batch_files = gr.File(label="3D Scenes (PLY)", file_count="multiple")
+                            wg_batch_status = gr.Textbox(label="Status", interactive=False, lines=4)
     
     # Information Section
     with gr.Accordion("ℹ️ Model Information", open=False):
@@ -372,7 +1427,7 @@ with gr.Blocks(title="3D World Generation Studio", theme=gr.themes.Soft()) as de
         ### WorldGen
         - **Features**: Fast generation (seconds), Gaussian Splatting, flexible rendering
         - **Best for**: Quick prototyping, diverse scene styles
-        - **Output**: PLY format (Gaussian Splat or Mesh)
+        - **Output**: PLY format (Gaussian Splat, compressed Gaussian Splat or Mesh)
         
         ### System Requirements
         - CUDA-capable GPU (recommended: 16GB+ VRAM)
@@ -382,35 +1437,100 @@ with gr.Blocks(title="3D World Generation Studio", theme=gr.themes.Soft()) as de
     # Connect events
     init_hunyuan_btn.click(fn=initialize_hunyuan, outputs=hunyuan_status)
     init_worldgen_btn.click(fn=initialize_worldgen, outputs=worldgen_status)
+    server_status_btn.click(fn=server_status, outputs=server_status_box)
     
-    hy_text_btn.click(
-        fn=generate_hunyuan_text2world,
+    # Generations go through the job scheduler; Cancel drops a job that is still queued
+    hy_text_event = hy_text_btn.click(
+        fn=queued("hunyuan", generate_hunyuan_text2world, 3, mode="hunyuan_text2world", mesh_output=1),
         inputs=[hy_text_prompt, hy_text_fg1, hy_text_fg2, hy_text_class],
         outputs=[hy_text_pano, hy_text_mesh, hy_text_status]
     )
     
-    hy_img_btn.click(
-        fn=generate_hunyuan_image2world,
+    # Only SceneGen runs: iterate on the layer labels without regenerating the panorama
+    hy_text_rescene_event = hy_text_rescene_btn.click(
+        fn=queued("hunyuan", generate_hunyuan_pano2world, 3, mode="hunyuan_pano2world", mesh_output=1),
+        inputs=[hy_text_pano, hy_text_fg1, hy_text_fg2, hy_text_class],
+        outputs=[hy_text_pano, hy_text_mesh, hy_text_status]
+    )
+    hy_text_cancel_btn.click(fn=None, cancels=[hy_text_event, hy_text_rescene_event])
+    
+    hy_img_event = hy_img_btn.click(
+        fn=queued("hunyuan", generate_hunyuan_image2world, 3, mode="hunyuan_image2world", mesh_output=1),
         inputs=[hy_img_input, hy_img_fg1, hy_img_fg2, hy_img_class],
         outputs=[hy_img_pano, hy_img_mesh, hy_img_status]
     )
     
-    wg_text_btn.click(
-        fn=generate_worldgen_text2scene,
-        inputs=[wg_text_prompt, wg_text_sharp, wg_text_mesh],
+    # Only SceneGen runs: iterate on the layer labels without regenerating the panorama
+    hy_img_rescene_event = hy_img_rescene_btn.click(
+        fn=queued("hunyuan", generate_hunyuan_pano2world, 3, mode="hunyuan_pano2world", mesh_output=1),
+        inputs=[hy_img_pano, hy_img_fg1, hy_img_fg2, hy_img_class],
+        outputs=[hy_img_pano, hy_img_mesh, hy_img_status]
+    )
+    hy_img_cancel_btn.click(fn=None, cancels=[hy_img_event, hy_img_rescene_event])
+    
+    wg_text_event = wg_text_btn.click(
+        fn=queued("worldgen", generate_worldgen_text2scene, 2, mode="worldgen_text2scene", mesh_output=0),
+        inputs=[wg_text_prompt, wg_text_sharp, wg_text_mesh, wg_text_format],
         outputs=[wg_text_output, wg_text_status]
     )
+    wg_text_cancel_btn.click(fn=None, cancels=[wg_text_event])
     
-    wg_img_btn.click(
-        fn=generate_worldgen_image2scene,
-        inputs=[wg_img_input, wg_img_prompt, wg_img_sharp, wg_img_mesh],
+    wg_img_event = wg_img_btn.click(
+        fn=queued("worldgen", generate_worldgen_image2scene, 2, mode="worldgen_image2scene", mesh_output=0),
+        inputs=[wg_img_input, wg_img_prompt, wg_img_sharp, wg_img_mesh, wg_img_format],
         outputs=[wg_img_output, wg_img_status]
     )
+    wg_img_cancel_btn.click(fn=None, cancels=[wg_img_event])
+    
+    hy_batch_btn.click(
+        fn=generate_hunyuan_text2world_batch,
+        inputs=[hy_batch_prompts, hy_batch_fg1, hy_batch_fg2, hy_batch_class],
+        outputs=[hy_batch_files, hy_batch_status],
+        api_name="hunyuan_text2world_batch"
+    )
+    
+    wg_batch_btn.click(
+        fn=generate_worldgen_text2scene_batch,
+        inputs=[wg_batch_prompts, wg_batch_sharp, wg_batch_mesh, wg_batch_format],
+        outputs=[wg_batch_files, wg_batch_status],
+        api_name="worldgen_text2scene_batch"
+    )
+    
+    demo.load(fn=warmup_status, outputs=[hunyuan_status, worldgen_status])
+
+# Handlers only poll the scheduler, so Gradio itself can run them all concurrently
+demo.queue(default_concurrency_limit=None)
+
+if __name__ != "__main__":
+    preloader.start()  # imported by a pool worker or the batch runner: warm up right away
 
 if __name__ == "__main__":
-    demo.launch(
+    if not preload.BACKGROUND:
+        preloader.start()  # WORLD3D_PRELOAD=0: everything before the port is bound
+    server, _, _ = demo.launch(
         server_name="0.0.0.0",  # Make accessible from other machines
         server_port=7860,
         share=True,  # Create a public URL
-        show_error=True
+        show_error=True,
+        allowed_paths=[str(result_cache.root), str(artifacts.root)],
+        prevent_thread_lock=True
     )
+    
+    # Large artifacts with HTTP Range support (GET /files/artifacts/<dir>/<file>),
+    # streamed from a memory map and kept from eviction while in flight
+    roots = {"artifacts": artifacts.root, "cache": result_cache.root}
+    mapped_io.add_range_route(server, roots, hold=artifacts.hold)
+    
+    # JSON job API for integrations (POST /api/v1/<mode>, then poll /api/v1/jobs/<id>)
+    api = rest_api.JobApi(rest_api.functions_for(sys.modules[__name__], "app"), submit_job, roots, artifacts.new_dir)
+    api.mount(server)
+    
+    # GET /healthz (liveness) and /readyz (200 once the models are warm) for the Docker healthcheck
+    rest_api.add_health_routes(server, readiness)
+    
+    # GET /metrics in the Prometheus text format when WORLD3D_METRICS=1
+    metrics.add_metrics_route(server, _worker_metrics)
+    
+    # The UI is up; import torch and the model packages, then load the models, behind it
+    preloader.start()
+    demo.block_thread()
\ No newline at end of file
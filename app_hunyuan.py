@@ -3,15 +3,26 @@ Gradio Web App for HunyuanWorld-1.0
 High-quality 360° immersive 3D world generation
 """
 
+import functools
 import gradio as gr
-import torch
 import os
 import sys
 from pathlib import Path
 from PIL import Image
-import tempfile
+import shutil
+import threading
+import time
 import traceback
 
+import artifact_store
+import mapped_io
+import metrics
+import postprocess
+import preload
+import request_profiler
+import rest_api
+from job_queue import JobScheduler
+
 # Add model directory to path
 HUNYUAN_PATH = Path("HunyuanWorld-1.0")
 sys.path.insert(0, str(HUNYUAN_PATH))
@@ -20,46 +31,135 @@ sys.path.insert(0, str(HUNYUAN_PATH))
 hunyuan_panogen = None
 hunyuan_scenegen = None
 
+# Outputs are kept under one root and evicted by age and size
+artifacts = artifact_store.from_env(sweep_on_start=False)
+
+# Slow, sampled or ?profile=1 requests are profiled into their output directory
+profiler = request_profiler.from_env(artifacts.new_dir)
+
+# Optional clean-up of every generated file (WORLD3D_POSTPROCESS, off by default)
+POSTPROCESS = postprocess.from_env()
+
+def _postprocess(output_file, mode):
+    """Run the enabled post-processing steps on a generated file in place"""
+    if not POSTPROCESS["steps"]:
+        return
+    try:
+        with metrics.stage(mode, "postprocess"):
+            stats = postprocess.process_file(output_file, POSTPROCESS)
+        print(f"Post-processed {output_file}: {postprocess.describe(stats)}")
+    except Exception as e:
+        print(f"Post-processing skipped for {output_file}: {e}")
+
+def _device():
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+def _import_models():
+    import hy3dworld.panogen
+    import hy3dworld.scenegen
+
 def initialize_models():
     """Initialize HunyuanWorld models"""
     global hunyuan_panogen, hunyuan_scenegen
     try:
+        device = preloader.wait("torch")
+        preloader.wait("hy3dworld")
         from hy3dworld.panogen import PanoGen
         from hy3dworld.scenegen import SceneGen
         
-        device = "cuda" if torch.cuda.is_available() else "cpu"
+        with metrics.timed("world3d_model_load_seconds", model="hunyuan_panogen", kind="load"):
+            hunyuan_panogen = PanoGen(
+                device=device,
+                fp8_gemm=True,
+                fp8_attention=True
+            )
         
-        hunyuan_panogen = PanoGen(
-            device=device,
-            fp8_gemm=True,
-            fp8_attention=True
-        )
-        
-        hunyuan_scenegen = SceneGen(
-            device=device,
-            fp8_gemm=True,
-            fp8_attention=True
-        )
+        with metrics.timed("world3d_model_load_seconds", model="hunyuan_scenegen", kind="load"):
+            hunyuan_scenegen = SceneGen(
+                device=device,
+                fp8_gemm=True,
+                fp8_attention=True
+            )
         
         return "✅ HunyuanWorld-1.0 initialized successfully!"
     except Exception as e:
         return f"❌ Error: {str(e)}\n{traceback.format_exc()}"
 
+def warm_up():
+    """Initialize the models and run one throwaway generation through them (start-up step)"""
+    status = initialize_models()
+    if hunyuan_panogen is None or hunyuan_scenegen is None:
+        raise RuntimeError(status)
+    if preload.WARMUP_INFERENCE:
+        output_dir = artifacts.new_dir("warmup_")
+        try:
+            start = time.perf_counter()
+            hunyuan_panogen.generate(prompt=preload.WARMUP_PROMPT, output_path=str(output_dir))
+            panogen_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            hunyuan_scenegen.generate(
+                image_path=str(output_dir / "panorama.png"),
+                labels_fg1=[],
+                labels_fg2=[],
+                classes="outdoor",
+                output_path=str(output_dir)
+            )
+            scenegen_seconds = time.perf_counter() - start
+        finally:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        status += f"\nWarm-up generation: PanoGen {panogen_seconds:.1f}s, SceneGen {scenegen_seconds:.1f}s"
+    return status
+
+# torch and the model package are imported in the background once the UI is up,
+# then the models are loaded and warmed up unless WORLD3D_AUTOLOAD is "none"
+_warmup = [
+    ("torch", _device),
+    ("hy3dworld", _import_models),
+    ("artifacts", artifacts.sweep),
+]
+if preload.autoload_from_env(["hunyuan"]):
+    _warmup.append(("HunyuanWorld-1.0", warm_up))
+preloader = preload.Preloader(_warmup)
+
+def warmup_status():
+    yield from preload.progress(preloader, done="Warm-up finished")
+    step = preloader.steps.get("HunyuanWorld-1.0")
+    if step is not None and step.state == "done":
+        yield step.result
+
+# UI clicks and API jobs use the same global model objects, so only one
+# generation runs at a time, whichever path it came from
+_generation_lock = threading.Lock()
+
+def serialized(fn):
+    """fn, run while holding the generation lock"""
+    @functools.wraps(fn)
+    def locked(*args, **kwargs):
+        with _generation_lock:
+            return fn(*args, **kwargs)
+    return locked
+
+@serialized
+@metrics.instrumented("hunyuan_text2world")
+@profiler.profiled("hunyuan_text2world")
 def generate_text2world(prompt, labels_fg1, labels_fg2, scene_class):
     """Generate 3D world from text"""
     global hunyuan_panogen, hunyuan_scenegen
     
+    preloader.settle("HunyuanWorld-1.0")  # a start-up load still running
     if hunyuan_panogen is None or hunyuan_scenegen is None:
         return None, None, "Please initialize models first!"
     
     try:
-        output_dir = Path(tempfile.mkdtemp(prefix="hunyuan_"))
+        output_dir = artifacts.new_dir("hunyuan_")
         
         # Step 1: Generate panorama
-        hunyuan_panogen.generate(
-            prompt=prompt,
-            output_path=str(output_dir)
-        )
+        with metrics.stage("hunyuan_text2world", "panogen"):
+            hunyuan_panogen.generate(
+                prompt=prompt,
+                output_path=str(output_dir)
+            )
         
         pano_path = output_dir / "panorama.png"
         
@@ -67,17 +167,19 @@ def generate_text2world(prompt, labels_fg1, labels_fg2, scene_class):
         labels_fg1_list = labels_fg1.split() if labels_fg1 else []
         labels_fg2_list = labels_fg2.split() if labels_fg2 else []
         
-        hunyuan_scenegen.generate(
-            image_path=str(pano_path),
-            labels_fg1=labels_fg1_list,
-            labels_fg2=labels_fg2_list,
-            classes=scene_class,
-            output_path=str(output_dir)
-        )
+        with metrics.stage("hunyuan_text2world", "scenegen"):
+            hunyuan_scenegen.generate(
+                image_path=str(pano_path),
+                labels_fg1=labels_fg1_list,
+                labels_fg2=labels_fg2_list,
+                classes=scene_class,
+                output_path=str(output_dir)
+            )
         
         mesh_file = output_dir / "scene_mesh.glb"
         
         if mesh_file.exists():
+            _postprocess(mesh_file, "hunyuan_text2world")
             return str(pano_path), str(mesh_file), "✅ Generation successful!"
         else:
             return str(pano_path), None, f"⚠️ Panorama generated, mesh not found in: {output_dir}"
@@ -85,22 +187,27 @@ def generate_text2world(prompt, labels_fg1, labels_fg2, scene_class):
     except Exception as e:
         return None, None, f"❌ Error: {str(e)}\n{traceback.format_exc()}"
 
+@serialized
+@metrics.instrumented("hunyuan_image2world")
+@profiler.profiled("hunyuan_image2world")
 def generate_image2world(image, labels_fg1, labels_fg2, scene_class):
     """Generate 3D world from image"""
     global hunyuan_panogen, hunyuan_scenegen
     
+    preloader.settle("HunyuanWorld-1.0")  # a start-up load still running
     if hunyuan_panogen is None or hunyuan_scenegen is None:
         return None, None, "Please initialize models first!"
     
     try:
-        output_dir = Path(tempfile.mkdtemp(prefix="hunyuan_"))
+        output_dir = artifacts.new_dir("hunyuan_")
         
         # Step 1: Generate panorama
-        hunyuan_panogen.generate(
-            prompt="",
-            image_path=image,
-            output_path=str(output_dir)
-        )
+        with metrics.stage("hunyuan_image2world", "panogen"):
+            hunyuan_panogen.generate(
+                prompt="",
+                image_path=image,
+                output_path=str(output_dir)
+            )
         
         pano_path = output_dir / "panorama.png"
         
@@ -108,17 +215,19 @@ def generate_image2world(image, labels_fg1, labels_fg2, scene_class):
         labels_fg1_list = labels_fg1.split() if labels_fg1 else []
         labels_fg2_list = labels_fg2.split() if labels_fg2 else []
         
-        hunyuan_scenegen.generate(
-            image_path=str(pano_path),
-            labels_fg1=labels_fg1_list,
-            labels_fg2=labels_fg2_list,
-            classes=scene_class,
-            output_path=str(output_dir)
-        )
+        with metrics.stage("hunyuan_image2world", "scenegen"):
+            hunyuan_scenegen.generate(
+                image_path=str(pano_path),
+                labels_fg1=labels_fg1_list,
+                labels_fg2=labels_fg2_list,
+                classes=scene_class,
+                output_path=str(output_dir)
+            )
         
         mesh_file = output_dir / "scene_mesh.glb"
         
         if mesh_file.exists():
+            _postprocess(mesh_file, "hunyuan_image2world")
             return str(pano_path), str(mesh_file), "✅ Generation successful!"
         else:
             return str(pano_path), None, f"⚠️ Panorama generated, mesh not found in: {output_dir}"
@@ -225,6 +334,7 @@ with gr.Blocks(title="HunyuanWorld-1.0", theme=gr.themes.Soft()) as demo:
     
     # Connect events
     init_btn.click(fn=initialize_models, outputs=status)
+    demo.load(fn=warmup_status, outputs=status)
     
     text_btn.click(
         fn=generate_text2world,
@@ -239,9 +349,39 @@ with gr.Blocks(title="HunyuanWorld-1.0", theme=gr.themes.Soft()) as demo:
     )
 
 if __name__ == "__main__":
-    demo.launch(
+    if not preload.BACKGROUND:
+        preloader.start()
+    server, _, _ = demo.launch(
         server_name="0.0.0.0",
         server_port=7860,
         share=True,
-        show_error=True
+        show_error=True,
+        allowed_paths=[str(artifacts.root)],
+        prevent_thread_lock=True
     )
+    
+    # Large artifacts with HTTP Range support (GET /files/artifacts/<dir>/<file>),
+    # streamed from a memory map and kept from eviction while in flight
+    mapped_io.add_range_route(server, {"artifacts": artifacts.root}, hold=artifacts.hold)
+    
+    # JSON job API for integrations (POST /api/v1/<mode>, then poll /api/v1/jobs/<id>),
+    # queued on its own worker thread; the generation lock keeps it from running next to a UI click
+    api_scheduler = JobScheduler(limits={"hunyuan": 1})
+    api = rest_api.JobApi(
+        rest_api.functions_for(sys.modules[__name__], "app_hunyuan"),
+        lambda backend, mode, fn, args, profile=False, **options: api_scheduler.submit(
+            backend, request_profiler.forcing(fn) if profile else fn, *args, cost_key=(mode,), **options
+        ),
+        {"artifacts": artifacts.root},
+        artifacts.new_dir
+    )
+    api.mount(server)
+    
+    # GET /healthz (liveness) and /readyz (200 once the model is warm) for the Docker healthcheck
+    rest_api.add_health_routes(server, lambda: (preloader.ready(), {"steps": preloader.stats()}))
+    
+    # GET /metrics in the Prometheus text format when WORLD3D_METRICS=1
+    metrics.on_scrape(lambda: artifact_store.record_metrics(artifacts))
+    metrics.add_metrics_route(server)
+    preloader.start()
+    demo.block_thread()
\ No newline at end of file
@@ -3,15 +3,26 @@ Gradio Web App for WorldGen
 Fast 3D scene generation in seconds
 """
 
+import functools
 import gradio as gr
-import torch
 import os
 import sys
 from pathlib import Path
 from PIL import Image
-import tempfile
+import threading
+import time
 import traceback
 
+import artifact_store
+import mapped_io
+import metrics
+import postprocess
+import preload
+import request_profiler
+import rest_api
+import splat_io
+from job_queue import JobScheduler
+
 # Add model directory to path
 WORLDGEN_PATH = Path("WorldGen")
 sys.path.insert(0, str(WORLDGEN_PATH))
@@ -19,56 +30,154 @@ sys.path.insert(0, str(WORLDGEN_PATH))
 # Global model instance
 worldgen_model = None
 
+# Outputs are kept under one root and evicted by age and size
+artifacts = artifact_store.from_env(sweep_on_start=False)
+
+# Slow, sampled or ?profile=1 requests are profiled into their output directory
+profiler = request_profiler.from_env(artifacts.new_dir)
+
+# Optional clean-up of every generated file (WORLD3D_POSTPROCESS, off by default)
+POSTPROCESS = postprocess.from_env()
+
+def _postprocess(output_file, mode):
+    """Run the enabled post-processing steps on a generated file in place"""
+    if not POSTPROCESS["steps"]:
+        return
+    try:
+        with metrics.stage(mode, "postprocess"):
+            stats = postprocess.process_file(output_file, POSTPROCESS)
+        print(f"Post-processed {output_file}: {postprocess.describe(stats)}")
+    except Exception as e:
+        print(f"Post-processing skipped for {output_file}: {e}")
+
+SPLAT_FORMATS = [
+    ("PLY (float32)", "ply"),
+    ("Compressed PLY (quantized; for PlayCanvas / SuperSplat viewers)", "compressed"),
+]
+SPLAT_PRUNE_OPACITY = float(os.environ.get("WORLD3D_SPLAT_PRUNE_OPACITY", "0.005"))
+
+def _device():
+    import torch
+    return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+def _import_model():
+    import worldgen
+
+def _import_open3d():
+    import open3d
+
 def initialize_model():
     """Initialize WorldGen model"""
     global worldgen_model
     try:
+        device = preloader.wait("torch")
+        preloader.wait("worldgen")
         from worldgen import WorldGen
         
-        worldgen_model = WorldGen(
-            mode="t2s",
-            device=torch.device("cuda" if torch.cuda.is_available() else "cpu"),
-            low_vram=True
-        )
+        with metrics.timed("world3d_model_load_seconds", model="worldgen_t2s", kind="load"):
+            worldgen_model = WorldGen(
+                mode="t2s",
+                device=device,
+                low_vram=True
+            )
         return "✅ WorldGen initialized successfully!"
     except Exception as e:
         return f"❌ Error: {str(e)}\n{traceback.format_exc()}"
 
-def generate_text2scene(prompt, use_sharp, return_mesh):
+def warm_up():
+    """Initialize the model and run one throwaway generation (start-up step)"""
+    status = initialize_model()
+    if worldgen_model is None:
+        raise RuntimeError(status)
+    if preload.WARMUP_INFERENCE:
+        start = time.perf_counter()
+        worldgen_model.generate_world(prompt=preload.WARMUP_PROMPT, use_sharp=False, return_mesh=False)
+        status += f"\nWarm-up generation: {time.perf_counter() - start:.1f}s"
+    return status
+
+# torch, WorldGen and open3d are imported in the background once the UI is up,
+# then the model is loaded and warmed up unless WORLD3D_AUTOLOAD is "none"
+_warmup = [
+    ("torch", _device),
+    ("worldgen", _import_model),
+    ("open3d", _import_open3d, True),
+    ("artifacts", artifacts.sweep),
+]
+if preload.autoload_from_env(["worldgen"]):
+    _warmup.append(("WorldGen", warm_up))
+preloader = preload.Preloader(_warmup)
+
+def warmup_status():
+    yield from preload.progress(preloader, done="Warm-up finished")
+    step = preloader.steps.get("WorldGen")
+    if step is not None and step.state == "done":
+        yield step.result
+
+# UI clicks and API jobs use the same global model objects, so only one
+# generation runs at a time, whichever path it came from
+_generation_lock = threading.Lock()
+
+def serialized(fn):
+    """fn, run while holding the generation lock"""
+    @functools.wraps(fn)
+    def locked(*args, **kwargs):
+        with _generation_lock:
+            return fn(*args, **kwargs)
+    return locked
+
+@serialized
+@metrics.instrumented("worldgen_text2scene")
+@profiler.profiled("worldgen_text2scene")
+def generate_text2scene(prompt, use_sharp, return_mesh, splat_format="ply"):
     """Generate 3D scene from text"""
     global worldgen_model
     
+    preloader.settle("WorldGen")  # a start-up load still running
     if worldgen_model is None:
         return None, "Please initialize WorldGen first!"
     
     try:
-        output_dir = Path(tempfile.mkdtemp(prefix="worldgen_"))
+        output_dir = artifacts.new_dir("worldgen_")
         
         # Generate scene
-        result = worldgen_model.generate_world(
-            prompt=prompt,
-            use_sharp=use_sharp,
-            return_mesh=return_mesh
-        )
+        with metrics.stage("worldgen_text2scene", "generate_world"):
+            result = worldgen_model.generate_world(
+                prompt=prompt,
+                use_sharp=use_sharp,
+                return_mesh=return_mesh
+            )
         
         # Save output
         if return_mesh:
             import open3d as o3d
             output_file = output_dir / "scene_mesh.ply"
-            o3d.io.write_triangle_mesh(str(output_file), result)
+            with metrics.stage("worldgen_text2scene", "save"):
+                o3d.io.write_triangle_mesh(str(output_file), result)
+            _postprocess(output_file, "worldgen_text2scene")
         else:
             output_file = output_dir / "scene_splat.ply"
-            result.save(str(output_file))
+            with metrics.stage("worldgen_text2scene", "save"):
+                result.save(str(output_file))
+            _postprocess(output_file, "worldgen_text2scene")
+            if splat_format == "compressed":
+                compressed = output_dir / "scene_splat.compressed.ply"
+                with metrics.stage("worldgen_text2scene", "compress"):
+                    splat_io.compress_file(output_file, compressed, prune_opacity=SPLAT_PRUNE_OPACITY)
+                output_file = compressed
         
         return str(output_file), "✅ Generation successful!"
         
     except Exception as e:
         return None, f"❌ Error: {str(e)}\n{traceback.format_exc()}"
 
-def generate_image2scene(image, prompt, use_sharp, return_mesh):
+@serialized
+@metrics.instrumented("worldgen_image2scene")
+@profiler.profiled("worldgen_image2scene")
+def generate_image2scene(image, prompt, use_sharp, return_mesh, splat_format="ply"):
     """Generate 3D scene from image"""
     global worldgen_model
     
+    preloader.settle("WorldGen")  # a start-up load still running
     if worldgen_model is None:
         return None, "Please initialize WorldGen first!"
     
@@ -76,33 +185,44 @@ def generate_image2scene(image, prompt, use_sharp, return_mesh):
         # Switch to i2s mode if needed
         if worldgen_model.mode != "i2s":
             from worldgen import WorldGen
-            worldgen_model = WorldGen(
-                mode="i2s",
-                device=torch.device("cuda" if torch.cuda.is_available() else "cpu"),
-                low_vram=True
-            )
+            with metrics.timed("world3d_model_load_seconds", model="worldgen_i2s", kind="load"):
+                worldgen_model = WorldGen(
+                    mode="i2s",
+                    device=preloader.wait("torch"),
+                    low_vram=True
+                )
         
-        output_dir = Path(tempfile.mkdtemp(prefix="worldgen_"))
+        output_dir = artifacts.new_dir("worldgen_")
         
         # Load image
         img = Image.open(image) if isinstance(image, str) else image
         
         # Generate scene
-        result = worldgen_model.generate_world(
-            image=img,
-            prompt=prompt,
-            use_sharp=use_sharp,
-            return_mesh=return_mesh
-        )
+        with metrics.stage("worldgen_image2scene", "generate_world"):
+            result = worldgen_model.generate_world(
+                image=img,
+                prompt=prompt,
+                use_sharp=use_sharp,
+                return_mesh=return_mesh
+            )
         
         # Save output
         if return_mesh:
             import open3d as o3d
             output_file = output_dir / "scene_mesh.ply"
-            o3d.io.write_triangle_mesh(str(output_file), result)
+            with metrics.stage("worldgen_image2scene", "save"):
+                o3d.io.write_triangle_mesh(str(output_file), result)
+            _postprocess(output_file, "worldgen_image2scene")
         else:
             output_file = output_dir / "scene_splat.ply"
-            result.save(str(output_file))
+            with metrics.stage("worldgen_image2scene", "save"):
+                result.save(str(output_file))
+            _postprocess(output_file, "worldgen_image2scene")
+            if splat_format == "compressed":
+                compressed = output_dir / "scene_splat.compressed.ply"
+                with metrics.stage("worldgen_image2scene", "compress"):
+                    splat_io.compress_file(output_file, compressed, prune_opacity=SPLAT_PRUNE_OPACITY)
+                output_file = compressed
         
         return str(output_file), "✅ Generation successful!"
         
@@ -140,6 +260,12 @@ with gr.Blocks(title="WorldGen", theme=gr.themes.Soft()) as demo:
                         value=False,
                         info="Mesh is compatible with game engines"
                     )
+                    text_format = gr.Dropdown(
+                        choices=SPLAT_FORMATS,
+                        value="ply",
+                        label="Splat Format",
+                        info="Compressed splats are ~4x smaller; the preview here may not render them"
+                    )
                     text_btn = gr.Button("Generate Scene", variant="primary", size="lg")
                 
                 with gr.Column():
@@ -163,6 +289,12 @@ with gr.Blocks(title="WorldGen", theme=gr.themes.Soft()) as demo:
                         label="Return Mesh (instead of Gaussian Splat)",
                         value=False
                     )
+                    img_format = gr.Dropdown(
+                        choices=SPLAT_FORMATS,
+                        value="ply",
+                        label="Splat Format",
+                        info="Compressed splats are ~4x smaller; the preview here may not render them"
+                    )
                     img_btn = gr.Button("Generate Scene", variant="primary", size="lg")
                 
                 with gr.Column():
@@ -201,23 +333,54 @@ with gr.Blocks(title="WorldGen", theme=gr.themes.Soft()) as demo:
     
     # Connect events
     init_btn.click(fn=initialize_model, outputs=status)
+    demo.load(fn=warmup_status, outputs=status)
     
     text_btn.click(
         fn=generate_text2scene,
-        inputs=[text_prompt, text_sharp, text_mesh],
+        inputs=[text_prompt, text_sharp, text_mesh, text_format],
         outputs=[text_output, text_status]
     )
     
     img_btn.click(
         fn=generate_image2scene,
-        inputs=[img_input, img_prompt, img_sharp, img_mesh],
+        inputs=[img_input, img_prompt, img_sharp, img_mesh, img_format],
         outputs=[img_output, img_status]
     )
 
 if __name__ == "__main__":
-    demo.launch(
+    if not preload.BACKGROUND:
+        preloader.start()
+    server, _, _ = demo.launch(
         server_name="0.0.0.0",
         server_port=7861,  # Different port
         share=True,
-        show_error=True
+        show_error=True,
+        allowed_paths=[str(artifacts.root)],
+        prevent_thread_lock=True
+    )
+    
+    # Large artifacts with HTTP Range support (GET /files/artifacts/<dir>/<file>),
+    # streamed from a memory map and kept from eviction while in flight
+    mapped_io.add_range_route(server, {"artifacts": artifacts.root}, hold=artifacts.hold)
+    
+    # JSON job API for integrations (POST /api/v1/<mode>, then poll /api/v1/jobs/<id>),
+    # queued on its own worker thread; the generation lock keeps it from running next to a UI click
+    api_scheduler = JobScheduler(limits={"worldgen": 1})
+    api = rest_api.JobApi(
+        rest_api.functions_for(sys.modules[__name__], "app_worldgen"),
+        lambda backend, mode, fn, args, profile=False, **options: api_scheduler.submit(
+            backend, request_profiler.forcing(fn) if profile else fn, *args, cost_key=(mode,), **options
+        ),
+        {"artifacts": artifacts.root},
+        artifacts.new_dir
     )
+    api.mount(server)
+    
+    # GET /healthz (liveness) and /readyz (200 once the model is warm) for the Docker healthcheck
+    rest_api.add_health_routes(server, lambda: (preloader.ready(), {"steps": preloader.stats()}))
+    
+    # GET /metrics in the Prometheus text format when WORLD3D_METRICS=1
+    metrics.on_scrape(lambda: artifact_store.record_metrics(artifacts))
+    metrics.add_metrics_route(server)
+    preloader.start()
+    demo.block_thread()
\ No newline at end of file
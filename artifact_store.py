@@ -0,0 +1,169 @@
+"""
+Output artifact store shared by the Gradio apps
+Every generation writes into its own directory under one root (the
+docker-compose ./outputs volume) instead of a tempfile.mkdtemp directory that
+is never removed. Directories are evicted once they are older than the TTL or
+when the store grows past its size limit, oldest first.
+
+Directories that are held (e.g. while their files are being served) and
+directories used within the last min_age seconds are never evicted.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import metrics
+
+GB = 1024 ** 3
+
+def _dir_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+class ArtifactStore:
+    """Per-request output directories under root, bounded by age and size"""
+    
+    def __init__(self, root, max_bytes=None, ttl_seconds=None, min_age_seconds=600, sweep_interval=60,
+                 sweep_on_start=True):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.min_age_seconds = min_age_seconds
+        self.sweep_interval = sweep_interval
+        self.counters = {"created": 0, "expired": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        self._refs = {}   # directory name -> holders
+        self._sizes = {}  # directory name -> (mtime, bytes), measured once it is idle
+        self._last_sweep = 0.0
+        self.root.mkdir(parents=True, exist_ok=True)
+        if sweep_on_start:
+            self.sweep()
+    
+    def new_dir(self, prefix):
+        """Create a fresh output directory, like tempfile.mkdtemp(prefix=...)"""
+        path = Path(tempfile.mkdtemp(prefix=prefix, dir=self.root))
+        with self._lock:
+            self.counters["created"] += 1
+        if time.time() - self._last_sweep > self.sweep_interval:
+            self.sweep()
+        return path
+    
+    def _name(self, path):
+        """Top-level directory of path inside the store, or None"""
+        try:
+            relative = Path(path).resolve().relative_to(self.root.resolve())
+        except ValueError:
+            return None
+        return relative.parts[0] if relative.parts else None
+    
+    @contextmanager
+    def hold(self, path):
+        """Keep the directory containing path from being evicted for the block"""
+        name = self._name(path)
+        if name is None:
+            yield
+            return
+        
+        with self._lock:
+            self._refs[name] = self._refs.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._refs[name] -= 1
+                if not self._refs[name]:
+                    del self._refs[name]
+                self._sizes.pop(name, None)  # may have grown while held
+            try:
+                os.utime(self.root / name)  # counts as a use for the TTL
+            except OSError:
+                pass
+    
+    def is_held(self, path):
+        return self._name(path) in self._refs
+    
+    def _measure(self, now):
+        """(last used, name, bytes, idle) per directory; call with the lock held
+        
+        Idle directories are measured once and remembered until they change.
+        """
+        entries = []
+        for path in self.root.iterdir():
+            if not path.is_dir():
+                continue
+            try:
+                last_used = path.stat().st_mtime
+            except OSError:
+                continue
+            idle = path.name not in self._refs and now - last_used >= self.min_age_seconds
+            measured = self._sizes.get(path.name)
+            if measured is not None and measured[0] == last_used:
+                size = measured[1]
+            else:
+                size = _dir_size(path)
+                if idle:
+                    self._sizes[path.name] = (last_used, size)
+            entries.append((last_used, path.name, size, idle))
+        return entries
+    
+    def sweep(self):
+        """Evict expired directories, then the oldest ones over max_bytes"""
+        now = time.time()
+        with self._lock:
+            self._last_sweep = now
+            entries = self._measure(now)
+            total = sum(size for _, _, size, _ in entries)
+            for last_used, name, size, idle in sorted(entries):
+                if not idle:
+                    continue
+                if self.ttl_seconds is not None and now - last_used > self.ttl_seconds:
+                    self.counters["expired"] += 1
+                elif self.max_bytes is not None and total > self.max_bytes:
+                    self.counters["evicted"] += 1
+                else:
+                    continue
+                shutil.rmtree(self.root / name, ignore_errors=True)
+                self._sizes.pop(name, None)
+                total -= size
+    
+    def stats(self):
+        """Counters plus directory count, disk usage and free space of the root"""
+        with self._lock:
+            entries = self._measure(time.time())
+            return {
+                **self.counters,
+                "dirs": len(entries),
+                "held": len(self._refs),
+                "bytes": sum(size for _, _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+                "disk_free": shutil.disk_usage(self.root).free,
+            }
+
+def record_metrics(store):
+    """Set the store's disk usage and eviction gauges (for a metrics.on_scrape function)"""
+    if not metrics.ENABLED:
+        return
+    stats = store.stats()
+    metrics.set_gauge("world3d_artifact_store_bytes", stats["bytes"])
+    metrics.set_gauge("world3d_artifact_store_dirs", stats["dirs"])
+    metrics.set_gauge("world3d_artifact_store_disk_free_bytes", stats["disk_free"])
+    if stats["max_bytes"] is not None:
+        metrics.set_gauge("world3d_artifact_store_max_bytes", stats["max_bytes"])
+    for reason in ("expired", "evicted"):
+        metrics.set_gauge("world3d_artifact_dirs_removed_total", stats[reason], reason=reason)
+
+def from_env(default_root="outputs/artifacts", sweep_on_start=True):
+    """Store configured from the WORLD3D_ARTIFACT_* environment variables"""
+    max_gb = float(os.environ.get("WORLD3D_ARTIFACT_MAX_GB", "50"))
+    ttl_hours = float(os.environ.get("WORLD3D_ARTIFACT_TTL_HOURS", "24"))
+    return ArtifactStore(
+        root=os.environ.get("WORLD3D_ARTIFACT_DIR", default_root),
+        max_bytes=int(max_gb * GB) if max_gb > 0 else None,
+        ttl_seconds=ttl_hours * 3600 if ttl_hours > 0 else None,
+        min_age_seconds=float(os.environ.get("WORLD3D_ARTIFACT_MIN_AGE_S", "600")),
+        sweep_on_start=sweep_on_start
+    )
\ No newline at end of file
@@ -0,0 +1,245 @@
+"""
+Headless batch runner for offline generation
+Reads generation jobs from a JSONL file, runs them through the same generate
+functions as the Gradio apps with the models loaded once for the whole run,
+and appends one result line per job (outputs and timings) to a manifest.
+With app.py, Hunyuan jobs run --in-flight at a time through its PanoGen ->
+SceneGen pipeline, so one job's panorama is generated while the previous
+job's mesh is built; everything else runs one job at a time.
+Re-running with the same manifest skips jobs that already succeeded, so a
+crashed run resumes where it stopped and failed jobs are retried.
+    
+    python batch_runner.py jobs.jsonl --manifest manifest.jsonl --output-dir outputs/batch
+
+Each job line looks like:
+    
+    {"id": "lake-01", "mode": "hunyuan_text2world", "prompt": "A mountain lake",
+     "labels_fg1": "trees", "labels_fg2": "", "scene_class": "outdoor"}
+    {"id": "room-07", "mode": "worldgen_image2scene", "image": "inputs/room.jpg",
+     "prompt": "", "use_sharp": false, "return_mesh": true}
+"""
+
+import argparse
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+# mode -> (backend, argument names)
+MODES = {
+    "hunyuan_text2world": ("hunyuan", ["prompt", "labels_fg1", "labels_fg2", "scene_class"]),
+    "hunyuan_image2world": ("hunyuan", ["image", "labels_fg1", "labels_fg2", "scene_class"]),
+    "worldgen_text2scene": ("worldgen", ["prompt", "use_sharp", "return_mesh", "splat_format"]),
+    "worldgen_image2scene": ("worldgen", ["image", "prompt", "use_sharp", "return_mesh", "splat_format"]),
+}
+
+DEFAULTS = {
+    "prompt": "",
+    "labels_fg1": "",
+    "labels_fg2": "",
+    "scene_class": "outdoor",
+    "image": None,
+    "use_sharp": False,
+    "return_mesh": False,
+    "splat_format": "ply",
+}
+
+# Which app module serves each backend, with its init and generate functions
+APPS = {
+    "app": {
+        "hunyuan": ("initialize_hunyuan", {
+            "hunyuan_text2world": "generate_hunyuan_text2world",
+            "hunyuan_image2world": "generate_hunyuan_image2world",
+        }),
+        "worldgen": ("initialize_worldgen", {
+            "worldgen_text2scene": "generate_worldgen_text2scene",
+            "worldgen_image2scene": "generate_worldgen_image2scene",
+        }),
+    },
+    "app_hunyuan": {
+        "hunyuan": ("initialize_models", {
+            "hunyuan_text2world": "generate_text2world",
+            "hunyuan_image2world": "generate_image2world",
+        }),
+    },
+    "app_worldgen": {
+        "worldgen": ("initialize_model", {
+            "worldgen_text2scene": "generate_text2scene",
+            "worldgen_image2scene": "generate_image2scene",
+        }),
+    },
+}
+
+def job_id(job, line):
+    """The job's own id, or a stable hash of its JSON line"""
+    if job.get("id") is not None:
+        return str(job["id"])
+    return hashlib.sha256(line.encode()).hexdigest()[:16]
+
+def read_jobs(path):
+    jobs = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            job = json.loads(line)
+            if job.get("mode") not in MODES:
+                raise ValueError(f"{path}:{number}: unknown mode {job.get('mode')!r}")
+            job["id"] = job_id(job, line)
+            jobs.append(job)
+    return jobs
+
+def read_finished(manifest):
+    """Ids of jobs that already succeeded in an earlier run"""
+    finished = set()
+    if not Path(manifest).exists():
+        return finished
+    with open(manifest) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn last line after a crash
+            if entry.get("status") == "ok":
+                finished.add(entry["id"])
+    return finished
+
+def split_result(mode, result):
+    """Map a generate function's return tuple to ({name: path}, message)"""
+    *paths, message = result
+    if mode.startswith("hunyuan"):
+        names = ["panorama", "mesh"]
+    else:
+        names = ["scene"]
+    return {name: path for name, path in zip(names, paths) if path}, message
+
+def keep_outputs(outputs, output_dir, job_id):
+    """Copy artifacts out of the temporary directories into output_dir/job_id"""
+    if output_dir is None:
+        return outputs
+    target = Path(output_dir) / job_id
+    target.mkdir(parents=True, exist_ok=True)
+    kept = {}
+    for name, path in outputs.items():
+        dest = target / Path(path).name
+        shutil.copy2(path, dest)
+        kept[name] = str(dest)
+    return kept
+
+def append_manifest(manifest, entry):
+    """Append one line and fsync so a crash never loses a finished job"""
+    with open(manifest, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def load_app(app_name, backends):
+    """Import the app module and initialize the backends the jobs need"""
+    os.environ.setdefault("WORLD3D_AUTOLOAD", "none")  # only the backends the jobs use, loaded below
+    module = importlib.import_module(app_name)
+    for backend in sorted(backends):
+        if backend not in APPS[app_name]:
+            raise ValueError(f"{app_name}.py does not serve {backend} jobs")
+        init_name, _ = APPS[app_name][backend]
+        start = time.perf_counter()
+        status = getattr(module, init_name)()
+        print(f"[init] {backend} in {time.perf_counter() - start:.1f}s: {status}", flush=True)
+    return module
+
+def run_job(module, app_name, job):
+    mode = job["mode"]
+    backend, arg_names = MODES[mode]
+    _, functions = APPS[app_name][backend]
+    fn = getattr(module, functions[mode])
+    args = [job.get(name, DEFAULTS[name]) for name in arg_names]
+    result = fn(*args)
+    if inspect.isgenerator(result):
+        # Streaming handlers yield stage progress; log it and keep the last value
+        for result in result:
+            print(f"    {job['id']}: {result[-1].splitlines()[0]}", flush=True)
+    return result
+
+def run_entry(module, app_name, job, output_dir, lock):
+    """Run one job and build its manifest entry
+    
+    seconds is the job's own run time; queue_seconds the time it waited for
+    its backend's lock behind the jobs submitted before it.
+    """
+    queued = start = time.perf_counter()
+    started_at = time.time()
+    try:
+        with lock:
+            started_at = time.time()
+            start = time.perf_counter()
+            result = run_job(module, app_name, job)
+        outputs, message = split_result(job["mode"], result)
+        outputs = keep_outputs(outputs, output_dir, job["id"])
+        primary = "mesh" if job["mode"].startswith("hunyuan") else "scene"
+        status = "ok" if primary in outputs else "error"
+    except Exception as e:
+        outputs, message, status = {}, f"{type(e).__name__}: {e}", "error"
+    
+    return {
+        "id": job["id"],
+        "mode": job["mode"],
+        "status": status,
+        "outputs": outputs,
+        "message": message,
+        "seconds": round(time.perf_counter() - start, 3),
+        "queue_seconds": round(start - queued, 3),
+        "started_at": started_at,
+        "finished_at": time.time(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("jobs", help="JSONL file with one generation job per line")
+    parser.add_argument("--manifest", default="manifest.jsonl", help="JSONL results file (appended)")
+    parser.add_argument("--output-dir", default="outputs/batch", help="where artifacts are copied ('' keeps temp paths)")
+    parser.add_argument("--app", default="app", choices=sorted(APPS), help="app module that runs the jobs")
+    parser.add_argument("--in-flight", type=int, default=2, help="Hunyuan jobs overlapping in the stage pipeline")
+    args = parser.parse_args()
+    
+    jobs = read_jobs(args.jobs)
+    finished = read_finished(args.manifest)
+    todo = [job for job in jobs if job["id"] not in finished]
+    print(f"{len(jobs)} jobs, {len(jobs) - len(todo)} already done, {len(todo)} to run", flush=True)
+    if not todo:
+        return 0
+    
+    module = load_app(args.app, {MODES[job["mode"]][0] for job in todo})
+    output_dir = args.output_dir or None
+    
+    # One job per backend at a time, except Hunyuan jobs when the pipeline
+    # keeps its stages apart
+    locks = {backend: threading.Lock() for backend in ("hunyuan", "worldgen")}
+    if hasattr(module, "hunyuan_pipeline"):
+        locks["hunyuan"] = threading.BoundedSemaphore(max(args.in_flight, 1))
+    
+    failures = 0
+    run_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(args.in_flight, 1) + 1) as pool:
+        futures = [
+            pool.submit(run_entry, module, args.app, job, output_dir, locks[MODES[job["mode"]][0]])
+            for job in todo
+        ]
+        for index, future in enumerate(as_completed(futures), 1):
+            entry = future.result()
+            failures += entry["status"] != "ok"
+            append_manifest(args.manifest, entry)
+            print(f"[{index}/{len(todo)}] {entry['id']} {entry['status']} in {entry['seconds']:.1f}s", flush=True)
+    
+    total = time.perf_counter() - run_start
+    print(f"Done: {len(todo) - failures} ok, {failures} failed in {total:.1f}s", flush=True)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
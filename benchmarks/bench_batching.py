@@ -0,0 +1,70 @@
+"""
+Throughput of micro-batched vs one-at-a-time text requests on fake models
+Fake models charge BATCH_MARGINAL_COST of a single call for every extra item
+in a batch; real gains depend on how well the model batches.
+    
+    python benchmarks/bench_batching.py --requests 64 --time-scale 0.05
+"""
+
+import argparse
+import time
+
+from common import print_table, summarize, use_fake_models, write_json
+
+def run(app, mode, requests, max_batch_size):
+    backend, fn_name = mode.split("_")[0], "generate_" + mode
+    key_fn, batch_fn = app.BATCHING[mode]
+    app.scheduler.max_batch_size = max_batch_size
+    app.scheduler.max_queue_depth = len(requests)
+    
+    start = time.perf_counter()
+    jobs = [
+        app.scheduler.submit(backend, getattr(app, fn_name), *args, batch_key=key_fn(*args), batch_fn=batch_fn)
+        for args in requests
+    ]
+    for job in jobs:
+        job.wait()
+    wall = time.perf_counter() - start
+    
+    return {
+        "wall_seconds": wall,
+        "throughput": len(jobs) / wall,
+        "latency": summarize([job.finished_at - job.submitted_at for job in jobs]),
+        "mean_batch_size": sum(job.batch_size for job in jobs) / len(jobs),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--time-scale", type=float, default=0.05)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+    
+    use_fake_models(args.time_scale)
+    import app
+    
+    app.initialize_hunyuan()
+    app.initialize_worldgen()
+    
+    workloads = {
+        "worldgen_text2scene": [(f"scene {i}", False, False) for i in range(args.requests)],
+        "hunyuan_text2world": [(f"world {i}", "", "", "outdoor") for i in range(args.requests // 4)],
+    }
+    
+    results = {}
+    for mode, requests in workloads.items():
+        # Unique prompts per run so the result cache never answers
+        for label, size in [("one_at_a_time", 1), ("batched", args.batch_size)]:
+            tagged = [(f"{label} {r[0]}", *r[1:]) for r in requests]
+            results[f"{mode}/{label}"] = run(app, mode, tagged, size)
+    
+    for name, result in results.items():
+        print(f"{name:<40} {result['throughput']:8.2f} req/s  "
+              f"mean batch {result['mean_batch_size']:.1f}")
+    print_table("Latency (s)", {name: r["latency"] for name, r in results.items()})
+    
+    write_json(args.output, results)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""
+Heap use and time of memory-mapped vs copying artifact reads
+Writes a synthetic splat PLY, then compares reading it into the Python heap
+(np.fromfile, as the old reader did) with mapping it (mapped_io.map_ply), for
+opening the file, computing its bounds and reading every property, and times
+streaming it back as HTTP range chunks.
+    
+    python benchmarks/bench_mapped_io.py --splats 2000000
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from common import use_fake_models, write_json
+
+def measure(fn):
+    """(result, seconds, peak traced heap bytes) of fn()"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--splats", type=int, default=2000000)
+    parser.add_argument("--sh-degree", type=int, default=3)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+    
+    use_fake_models()  # puts the repo root on sys.path
+    import mapped_io
+    import splat_io
+    
+    rng = np.random.default_rng(0)
+    names = ["x", "y", "z", "f_dc_0", "f_dc_1", "f_dc_2", "opacity",
+             "scale_0", "scale_1", "scale_2", "rot_0", "rot_1", "rot_2", "rot_3"]
+    names += [f"f_rest_{i}" for i in range(3 * ((args.sh_degree + 1) ** 2 - 1))]
+    path = Path(tempfile.mkdtemp(prefix="bench_mapped_io_")) / "scene_splat.ply"
+    splat_io.write_splat(path, {name: rng.normal(size=args.splats).astype(np.float32) for name in names})
+    size = path.stat().st_size
+    print(f"{path}: {args.splats} splats, {size / 1e6:.0f} MB")
+    
+    def copied():
+        with open(path, "rb") as f:
+            elements = mapped_io.read_ply_header(f)
+            dtype = np.dtype(elements[0][2])
+            return np.fromfile(f, dtype=dtype, count=elements[0][1])
+    
+    def mapped():
+        return mapped_io.map_ply(path)["vertex"]
+    
+    def bounds(vertex):
+        return [(vertex[axis].min(), vertex[axis].max()) for axis in "xyz"]
+    
+    def every_property(vertex):
+        return sum(float(vertex[name].sum()) for name in vertex.dtype.names)
+    
+    def stream():
+        return sum(len(chunk) for chunk in mapped_io.iter_file_range(path, 0, size - 1))
+    
+    results = {}
+    for name, load in [("copy", copied), ("mmap", mapped)]:
+        vertex, open_seconds, open_heap = measure(load)
+        _, bounds_seconds, bounds_heap = measure(lambda: bounds(vertex))
+        _, all_seconds, all_heap = measure(lambda: every_property(vertex))
+        results[name] = {
+            "open_seconds": open_seconds,
+            "open_heap_bytes": open_heap,
+            "bounds_seconds": bounds_seconds,
+            "bounds_heap_bytes": bounds_heap,
+            "all_properties_seconds": all_seconds,
+            "all_properties_heap_bytes": all_heap,
+        }
+        del vertex
+    _, stream_seconds, stream_heap = measure(stream)
+    results["range_stream"] = {"seconds": stream_seconds, "heap_bytes": stream_heap, "mb_per_s": size / 1e6 / stream_seconds}
+    
+    print(f"{'':<8}{'open s':>9}{'open heap MB':>14}{'bounds s':>10}{'all props s':>13}{'peak heap MB':>14}")
+    for name in ("copy", "mmap"):
+        r = results[name]
+        peak = max(r["open_heap_bytes"], r["bounds_heap_bytes"], r["all_properties_heap_bytes"])
+        print(f"{name:<8}{r['open_seconds']:>9.3f}{r['open_heap_bytes'] / 1e6:>14.1f}{r['bounds_seconds']:>10.3f}"
+              f"{r['all_properties_seconds']:>13.3f}{peak / 1e6:>14.1f}")
+    stream = results["range_stream"]
+    print(f"\nRange streaming: {stream['mb_per_s']:.0f} MB/s, peak heap {stream['heap_bytes'] / 1e6:.1f} MB")
+    
+    write_json(args.output, results)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""
+Size and encode time of the mesh LOD chain
+Runs mesh_lod.build_lods on a mesh (a SceneGen GLB or WorldGen PLY) or, by
+default, on a synthetic vertex-coloured sphere, and reports every level with
+its download time at a given bandwidth.
+    
+    python benchmarks/bench_mesh_lod.py --mesh outputs/artifacts/hunyuan_x/scene_mesh.glb
+    python benchmarks/bench_mesh_lod.py --segments 1024 --lods 64,256 --mbps 20
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from common import use_fake_models, write_json
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mesh", help="mesh file to process (default: synthetic sphere)")
+    parser.add_argument("--segments", type=int, default=1024, help="synthetic sphere resolution")
+    parser.add_argument("--lods", default="64,256", help="grid resolutions of the decimated levels")
+    parser.add_argument("--mbps", type=float, default=20.0, help="client bandwidth for download estimates")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+    
+    use_fake_models()
+    import fake_models
+    import mesh_lod
+    
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_mesh_lod_"))
+    mesh_path = args.mesh
+    if mesh_path is None:
+        mesh_path = work_dir / "scene_mesh.glb"
+        fake_models.write_glb(mesh_path, segments=args.segments)
+    
+    levels = mesh_lod.build_lods(mesh_path, work_dir, resolutions=mesh_lod.parse_resolutions(args.lods))
+    original = levels[-1]["bytes"]
+    
+    print(f"{'level':<12}{'vertices':>10}{'faces':>10}{'size':>12}{'ratio':>8}{'encode s':>10}{'download s':>12}")
+    results = {}
+    for level in levels:
+        download = level["bytes"] * 8 / (args.mbps * 1e6)
+        print(
+            f"{level['name']:<12}{level['vertices']:>10}{level['faces']:>10}"
+            f"{level['bytes'] / 1e6:>10.2f}MB{level['bytes'] / original:>8.2f}"
+            f"{level['encode_seconds']:>10.3f}{download:>12.2f}"
+        )
+        results[level["name"]] = {
+            "vertices": level["vertices"],
+            "faces": level["faces"],
+            "bytes": level["bytes"],
+            "ratio": level["bytes"] / original,
+            "encode_seconds": level["encode_seconds"],
+            "download_seconds": download,
+        }
+    print("\n(encode s of 'original' is the time to load and parse it)")
+    
+    write_json(args.output, results)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,285 @@
+"""
+Benchmark suite for the four generation modes of app.py, with baseline comparison
+Drives Hunyuan text->world and image->world and WorldGen text->scene and
+image->scene through the same queued handlers the UI buttons call (result
+cache, scheduler, pipeline, LOD previews). Each mode runs in a fresh process
+and records:
+    
+    load          Initialize of its backend
+    cold          the first request after that
+    warm          further requests, one at a time
+    concurrency   latency and throughput with N clients at once, per level
+    memory        peak host RSS and peak device memory of the process
+    artifacts     bytes of the files a request returns
+
+Every request has a unique prompt or image, so the result cache never answers.
+By default the models are fakes that sleep like the real ones, which runs on a
+CPU-only box; --real uses the installed models.
+    
+    python benchmarks/bench_modes.py --output bench.json
+    python benchmarks/bench_modes.py --baseline bench.json --tolerance 0.2
+    python benchmarks/bench_modes.py --real --modes hunyuan_text2world --warm-runs 3 --concurrency 1,2
+
+With --baseline, every metric is compared with the earlier results. The exit
+status is 1 when a metric got worse by more than --tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from common import REPO_ROOT, print_table, summarize, use_fake_models, write_json
+
+# mode -> (backend, outputs of the handler, index of the mesh output)
+MODES = {
+    "hunyuan_text2world": ("hunyuan", 3, 1),
+    "hunyuan_image2world": ("hunyuan", 3, 1),
+    "worldgen_text2scene": ("worldgen", 2, 0),
+    "worldgen_image2scene": ("worldgen", 2, 0),
+}
+
+def _image(path, rng):
+    """A small random input image, different for every request"""
+    from PIL import Image
+    
+    Image.frombytes("RGB", (256, 128), rng.randbytes(256 * 128 * 3)).save(path)
+    return str(path)
+
+def _arguments(mode, i, rng, image_dir, return_mesh):
+    """Handler arguments of request i, as the UI sends them"""
+    prompt = f"a quiet valley with a river, request {i}-{rng.randrange(10 ** 9)}"
+    if mode == "hunyuan_text2world":
+        return (prompt, "", "", "outdoor")
+    if mode == "hunyuan_image2world":
+        return (_image(os.path.join(image_dir, f"{i}.png"), rng), "", "", "outdoor")
+    if mode == "worldgen_text2scene":
+        return (prompt, False, return_mesh, "ply")
+    return (_image(os.path.join(image_dir, f"{i}.png"), rng), "", False, return_mesh, "ply")
+
+def _device_peak():
+    torch = sys.modules.get("torch")
+    if torch is None or not torch.cuda.is_available():
+        return None
+    return torch.cuda.max_memory_allocated()
+
+def measure(mode, args):
+    """Run one mode in this process; returns its results (child process)"""
+    os.environ["WORLD3D_LOD_STEP_S"] = "0"  # no pause between the LOD previews
+    import app
+    
+    backend, num_outputs, mesh_output = MODES[mode]
+    handler = app.queued(backend, getattr(app, f"generate_{mode}"), num_outputs, mode=mode, mesh_output=mesh_output)
+    app.scheduler.max_queue_depth = max(args.concurrency) * 2 + args.requests
+    rng = random.Random(f"{args.seed}-{mode}")
+    image_dir = tempfile.mkdtemp(prefix="bench_modes_")
+    counter = iter(range(10 ** 9))
+    lock = threading.Lock()
+    errors, artifact_bytes = [], []
+    
+    def request():
+        with lock:
+            request_args = _arguments(mode, next(counter), rng, image_dir, args.return_mesh)
+        start = time.perf_counter()
+        result = app.last_update(handler(*request_args))
+        seconds = time.perf_counter() - start
+        files = [f for f in result[:-1] if isinstance(f, str) and os.path.exists(f)]
+        with lock:
+            if isinstance(result[-2], str) and os.path.exists(result[-2]):
+                artifact_bytes.append(sum(os.path.getsize(f) for f in files))
+            else:
+                errors.append(str(result[-1]).splitlines()[0] if result[-1] else "no output")
+        return seconds
+    
+    start = time.perf_counter()
+    status = app.initialize_hunyuan() if backend == "hunyuan" else app.initialize_worldgen()
+    results = {"load": time.perf_counter() - start, "initialize": status.splitlines()[0]}
+    results["cold"] = request()
+    results["warm"] = summarize([request() for _ in range(args.warm_runs)])
+    
+    results["concurrency"] = {}
+    for clients in args.concurrency:
+        latencies = []
+        remaining = [args.requests]
+        
+        def client():
+            while True:
+                with lock:
+                    if not remaining[0]:
+                        return
+                    remaining[0] -= 1
+                seconds = request()
+                with lock:
+                    latencies.append(seconds)
+        
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+        results["concurrency"][str(clients)] = {
+            "latency": summarize(latencies),
+            "throughput": len(latencies) / wall,
+            "wall_seconds": wall,
+        }
+    
+    torch = sys.modules.get("torch")
+    results.update({
+        "peak_host_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "peak_device_bytes": _device_peak(),
+        "artifact_bytes": summarize(artifact_bytes),
+        "errors": len(errors),
+        "first_errors": errors[:3],
+        "torch": getattr(torch, "__version__", None),
+    })
+    return results
+
+def run_mode(mode, argv):
+    """Run one mode in a fresh process (fresh models, cache and artifact store)"""
+    work = tempfile.mkdtemp(prefix=f"bench_{mode}_")
+    env = dict(
+        os.environ,
+        WORLD3D_CACHE_DIR=os.path.join(work, "cache"),
+        WORLD3D_ARTIFACT_DIR=os.path.join(work, "artifacts"),
+        WORLD3D_AUTOLOAD="none",
+    )
+    child = subprocess.run(
+        [sys.executable, __file__, "--child", mode] + argv,
+        env=env, stdout=subprocess.PIPE, text=True, cwd=work
+    )
+    lines = [line for line in child.stdout.splitlines() if line.startswith("{")]
+    if child.returncode or not lines:
+        raise RuntimeError(f"{mode} failed (exit status {child.returncode})")
+    return json.loads(lines[-1])
+
+def _metrics(results):
+    """Flat {name: (value, higher is better)} of the results, for the baseline comparison"""
+    flat = {}
+    for mode, info in results["modes"].items():
+        flat[f"{mode} load s"] = (info["load"], False)
+        flat[f"{mode} cold s"] = (info["cold"], False)
+        flat[f"{mode} warm p50 s"] = (info["warm"]["p50"], False)
+        for clients, level in info["concurrency"].items():
+            flat[f"{mode} x{clients} p95 s"] = (level["latency"]["p95"], False)
+            flat[f"{mode} x{clients} req/s"] = (level["throughput"], True)
+        flat[f"{mode} peak host MB"] = (info["peak_host_bytes"] / 1e6, False)
+        if info["peak_device_bytes"] is not None:
+            flat[f"{mode} peak device MB"] = (info["peak_device_bytes"] / 1e6, False)
+        flat[f"{mode} artifact MB"] = (info["artifact_bytes"]["mean"] / 1e6, False)
+    return flat
+
+def compare(results, baseline, tolerance):
+    """Print every metric next to its baseline; returns the names of those that regressed"""
+    if baseline["environment"].get("fake_models") != results["environment"]["fake_models"]:
+        print("\nWarning: the baseline ran with different models (fake vs real)")
+    current, previous = _metrics(results), _metrics(baseline)
+    regressions = []
+    print(f"\nAgainst the baseline (tolerance {tolerance:.0%})")
+    print(f"{'':<48}{'baseline':>12}{'now':>12}{'change':>10}")
+    for name, (value, higher_is_better) in current.items():
+        if name not in previous:
+            continue
+        old = previous[name][0]
+        change = (value - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<48}{old:>12.3f}{value:>12.3f}{change:>+10.1%}{flag}")
+    return regressions
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default=",".join(MODES), help="comma separated modes to run")
+    parser.add_argument("--warm-runs", type=int, default=5, help="sequential warm requests")
+    parser.add_argument("--concurrency", default="1,2,4", help="comma separated client counts")
+    parser.add_argument("--requests", type=int, default=8, help="requests per concurrency level")
+    parser.add_argument("--return-mesh", action="store_true", help="WorldGen returns meshes instead of splats")
+    parser.add_argument("--time-scale", type=float, default=0.05, help="fake model sleep scale")
+    parser.add_argument("--real", action="store_true", help="use the installed models instead of fakes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="earlier --output to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c]
+    
+    if args.real:
+        sys.path.insert(0, str(REPO_ROOT))
+    else:
+        use_fake_models(args.time_scale)
+    if args.child:
+        print(json.dumps(measure(args.child, args)), flush=True)
+        return
+    
+    # The children get the same settings
+    argv = [
+        "--warm-runs", str(args.warm_runs), "--concurrency", ",".join(map(str, args.concurrency)),
+        "--requests", str(args.requests), "--time-scale", str(args.time_scale), "--seed", str(args.seed),
+    ] + ["--return-mesh"] * args.return_mesh + ["--real"] * args.real
+    
+    modes = [mode for mode in args.modes.split(",") if mode]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+    results = {
+        "environment": {
+            "fake_models": not args.real,
+            "time_scale": None if args.real else args.time_scale,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "commit": _git_commit(),
+            "warm_runs": args.warm_runs,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "return_mesh": args.return_mesh,
+            "seed": args.seed,
+        },
+        "modes": {},
+    }
+    for mode in modes:
+        print(f"Running {mode}...", flush=True)
+        results["modes"][mode] = run_mode(mode, argv)
+    results["environment"]["torch"] = next(iter(results["modes"].values()))["torch"]
+    
+    for mode, info in results["modes"].items():
+        rows = {"cold": summarize([info["cold"]]), "warm": info["warm"]}
+        for clients, level in info["concurrency"].items():
+            rows[f"{clients} clients ({level['throughput']:.2f} req/s)"] = level["latency"]
+        print_table(f"{mode}: seconds (load {info['load']:.2f}s)", rows)
+        device = f", peak device {info['peak_device_bytes'] / 1e6:.0f} MB" if info["peak_device_bytes"] else ""
+        print(
+            f"peak host RSS {info['peak_host_bytes'] / 1e6:.0f} MB{device}, "
+            f"artifacts {info['artifact_bytes']['mean'] / 1e6:.2f} MB per request, {info['errors']} errors"
+        )
+    write_json(args.output, results)
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metrics regressed beyond {args.tolerance:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Throughput of the staged Hunyuan pipeline vs running the stages back to back
+Stub stages sleep for the PanoGen / SceneGen inference times of the fake model
+profiles and reserve their memory footprints, so the memory ceiling decides
+whether the stages may overlap.
+    
+    python benchmarks/bench_pipeline.py --requests 16 --time-scale 0.05
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import print_table, summarize, use_fake_models, write_json
+
+def stub_stage(name):
+    import fake_models
+    _, infer_seconds, memory_bytes = fake_models.PROFILES[name]
+    
+    def stage(state):
+        time.sleep(infer_seconds * fake_models.time_scale())
+        return state
+    
+    return stage, memory_bytes
+
+def serial(requests):
+    """Both stages per request, one request at a time (the old behaviour)"""
+    pano, _ = stub_stage("hunyuan_panogen")
+    scene, _ = stub_stage("hunyuan_scenegen")
+    latencies = []
+    start = time.perf_counter()
+    for state in requests:
+        submitted = time.perf_counter()
+        scene(pano(state))
+        latencies.append(time.perf_counter() - submitted)
+    return time.perf_counter() - start, latencies, None
+
+def pipelined(requests, clients, queue_size, ceiling):
+    from pipeline import StagedPipeline
+    
+    pano, pano_bytes = stub_stage("hunyuan_panogen")
+    scene, scene_bytes = stub_stage("hunyuan_scenegen")
+    pipeline = StagedPipeline(
+        [("panogen", pano, pano_bytes), ("scenegen", scene, scene_bytes)],
+        queue_size=queue_size,
+        memory_ceiling_bytes=ceiling
+    )
+    
+    def client(state):
+        submitted = time.perf_counter()
+        pipeline.run(state)
+        return time.perf_counter() - submitted
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = list(pool.map(client, requests))
+    wall = time.perf_counter() - start
+    stats = pipeline.stats()
+    pipeline.close()
+    return wall, latencies, stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--clients", type=int, default=2, help="requests in flight (Hunyuan concurrency)")
+    parser.add_argument("--queue-size", type=int, default=1)
+    parser.add_argument("--time-scale", type=float, default=0.05)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+    
+    use_fake_models(args.time_scale)
+    from fake_models import GB
+    
+    requests = [{"prompt": f"world {i}"} for i in range(args.requests)]
+    runs = {
+        "serial": lambda: serial(requests),
+        "pipelined (no ceiling)": lambda: pipelined(requests, args.clients, args.queue_size, None),
+        "pipelined (24 GB ceiling)": lambda: pipelined(requests, args.clients, args.queue_size, 24 * GB),
+        "pipelined (16 GB ceiling)": lambda: pipelined(requests, args.clients, args.queue_size, 16 * GB),
+    }
+    
+    results = {}
+    for name, run in runs.items():
+        wall, latencies, stats = run()
+        results[name] = {
+            "wall_seconds": wall,
+            "throughput": len(latencies) / wall,
+            "latency": summarize(latencies),
+            "pipeline": stats,
+        }
+    
+    baseline = results["serial"]["throughput"]
+    for name, result in results.items():
+        stats = result["pipeline"] or {}
+        peak = stats.get("peak_reserved_bytes", 0) / GB
+        print(f"{name:<40} {result['throughput']:8.2f} req/s  "
+              f"x{result['throughput'] / baseline:.2f}  peak {peak:.0f} GB reserved")
+    print_table("Latency (s)", {name: r["latency"] for name, r in results.items()})
+    
+    write_json(args.output, results)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+Speed of the vectorized post-processing steps on million-element inputs
+Times every step of postprocess.py on a synthetic splat cloud (dense blobs plus
+scattered floaters) and a synthetic triangle soup mesh (a sphere with unwelded
+vertices plus small floating pieces), and compares dedup / outlier removal
+with a per-element Python loop on a subsample, extrapolated to the full size.
+    
+    python benchmarks/bench_postprocess.py --points 1000000 --faces 1000000
+"""
+
+import argparse
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from common import use_fake_models, write_json
+
+def synthetic_splats(count, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(-5, 5, size=(32, 3))
+    positions = centers[rng.integers(0, len(centers), count)] + rng.normal(0, 0.5, size=(count, 3))
+    floaters = rng.random(count) < 0.02
+    positions[floaters] = rng.uniform(-40, 40, size=(floaters.sum(), 3))
+    duplicates = rng.random(count) < 0.05
+    positions[duplicates] = positions[rng.integers(0, count, duplicates.sum())]
+    
+    data = {name: positions[:, i] for i, name in enumerate("xyz")}
+    for i in range(3):
+        data[f"f_dc_{i}"] = rng.normal(0, 1, count)
+        data[f"scale_{i}"] = rng.normal(-4.5, 1, count)
+    data["opacity"] = rng.normal(0, 3, count)
+    rotation = rng.normal(size=(count, 4))
+    for i in range(4):
+        data[f"rot_{i}"] = rotation[:, i]
+    return {name: values.astype(np.float32) for name, values in data.items()}
+
+def synthetic_soup(num_faces, seed=0):
+    """Triangle soup sphere (three unshared vertices per face) plus floating triangles"""
+    rng = np.random.default_rng(seed)
+    rows = max(int(np.sqrt(num_faces / 2)), 2)
+    theta, phi = np.meshgrid(np.linspace(0, np.pi, rows + 1), np.linspace(0, 2 * np.pi, rows + 1), indexing="ij")
+    grid = np.stack([np.sin(theta) * np.cos(phi), np.cos(theta), np.sin(theta) * np.sin(phi)], axis=-1) * 10
+    index = np.arange((rows + 1) ** 2).reshape(rows + 1, rows + 1)
+    a, b = index[:-1, :-1].reshape(-1), index[:-1, 1:].reshape(-1)
+    c, d = index[1:, :-1].reshape(-1), index[1:, 1:].reshape(-1)
+    faces = np.concatenate([np.stack([a, c, b], axis=1), np.stack([b, c, d], axis=1)])
+    soup = grid.reshape(-1, 3)[faces].reshape(-1, 3)
+    
+    floaters = rng.uniform(-8, 8, size=(num_faces // 100, 1, 3)) + rng.normal(0, 0.05, size=(num_faces // 100, 3, 3))
+    positions = np.concatenate([soup, floaters.reshape(-1, 3)]).astype(np.float32)
+    return positions, np.arange(len(positions)).reshape(-1, 3)
+
+def loop_dedup(positions, tolerance):
+    """Reference: weld vertices with a dict keyed by grid cell, one vertex at a time"""
+    seen = {}
+    remap = []
+    for x, y, z in positions.tolist():
+        key = (int(x // tolerance), int(y // tolerance), int(z // tolerance))
+        remap.append(seen.setdefault(key, len(seen)))
+    return remap
+
+def loop_neighbors(positions, cell):
+    """Reference: neighbour counts with a dict of cell counts and 27 lookups per point"""
+    counts = defaultdict(int)
+    keys = [(int(x // cell), int(y // cell), int(z // cell)) for x, y, z in positions.tolist()]
+    for key in keys:
+        counts[key] += 1
+    offsets = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)]
+    return [sum(counts.get((x + dx, y + dy, z + dz), 0) for dx, dy, dz in offsets) for x, y, z in keys]
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=1000000, help="synthetic splat count")
+    parser.add_argument("--faces", type=int, default=1000000, help="synthetic mesh face count")
+    parser.add_argument("--loop-sample", type=int, default=100000, help="points for the Python loop reference")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+    
+    use_fake_models()  # puts the repo root on sys.path
+    import postprocess
+    
+    settings = postprocess.from_env()
+    settings["radius"] = 30.0
+    results = {"splats": {}, "mesh": {}, "loop_reference": {}}
+    
+    data = synthetic_splats(args.points)
+    positions = np.stack([data["x"], data["y"], data["z"]], axis=1).astype(np.float64)
+    for step in postprocess.STEPS:
+        (_, stats), seconds = timed(postprocess.process_splat, data, {**settings, "steps": (step,)})
+        results["splats"][step] = {"seconds": seconds, "splats": stats["splats"]}
+    (_, stats), seconds = timed(postprocess.process_splat, data, {**settings, "steps": postprocess.STEPS})
+    results["splats"]["all"] = {"seconds": seconds, "splats": stats["splats"]}
+    
+    mesh_positions, faces = synthetic_soup(args.faces)
+    scale = postprocess._extent(mesh_positions)
+    (index, inverse), weld_seconds = timed(postprocess.weld, mesh_positions, settings["weld_tolerance"] * scale)
+    welded = inverse[faces]
+    valid, valid_seconds = timed(postprocess.valid_faces, welded)
+    welded = welded[valid]
+    keep, component_seconds = timed(postprocess.large_components, len(index), welded, settings["floater_fraction"])
+    _, crop_seconds = timed(postprocess.within_radius, mesh_positions[index], settings["radius"])
+    _, normal_seconds = timed(postprocess.vertex_normals, mesh_positions[index], welded[keep])
+    results["mesh"] = {
+        "vertices": (len(mesh_positions), len(index)),
+        "faces": (len(faces), int(keep.sum())),
+        "weld_seconds": weld_seconds,
+        "valid_faces_seconds": valid_seconds,
+        "components_seconds": component_seconds,
+        "crop_seconds": crop_seconds,
+        "normals_seconds": normal_seconds,
+    }
+    
+    sample = positions[:args.loop_sample]
+    cell = settings["outlier_cell"] * postprocess._extent(positions)
+    for name, loop, vectorized, size in [
+        ("dedup", loop_dedup, postprocess.weld, settings["weld_tolerance"] * scale),
+        ("neighbors", loop_neighbors, postprocess.neighbor_counts, cell),
+    ]:
+        _, loop_seconds = timed(loop, sample, size)
+        _, vector_seconds = timed(vectorized, sample, size)
+        results["loop_reference"][name] = {
+            "sample": len(sample),
+            "loop_seconds": loop_seconds,
+            "vectorized_seconds": vector_seconds,
+            "speedup": loop_seconds / vector_seconds,
+            "loop_seconds_extrapolated": loop_seconds * len(positions) / len(sample),
+        }
+    
+    print(f"Splats ({args.points}):")
+    for step, result in results["splats"].items():
+        before, after = result["splats"]
+        print(f"  {step:<10}{result['seconds']:>8.2f}s   {before} -> {after}")
+    mesh = results["mesh"]
+    print(f"Mesh ({mesh['faces'][0]} faces, {mesh['vertices'][0]} -> {mesh['vertices'][1]} vertices, "
+          f"{mesh['faces'][1]} faces kept):")
+    for key in ("weld_seconds", "valid_faces_seconds", "components_seconds", "crop_seconds", "normals_seconds"):
+        print(f"  {key.replace('_seconds', ''):<12}{mesh[key]:>8.2f}s")
+    print(f"Python loop reference ({args.loop_sample} points):")
+    for name, result in results["loop_reference"].items():
+        print(f"  {name:<10} loop {result['loop_seconds']:.2f}s, vectorized {result['vectorized_seconds']:.3f}s "
+              f"(x{result['speedup']:.0f}); loop at full size ~{result['loop_seconds_extrapolated']:.0f}s")
+    
+    write_json(args.output, results)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""
+Load test for the JSON job API (rest_api.py) with fake models
+Serves the API of app.py on a local port, submits text jobs through it and
+runs many concurrent pollers against their status endpoints while the jobs
+run, then keeps polling the finished jobs for a while. Reports job throughput,
+submit and poll latency, polls per second and the server process's CPU time
+per poll. The server runs in a child process, so the client's load does not
+share its interpreter.
+    
+    python benchmarks/bench_rest_api.py --pollers 200 --jobs 40 --time-scale 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from common import print_table, summarize, use_fake_models, write_json
+
+def process_cpu_seconds(pid):
+    """User + system CPU time of a process from /proc (Linux), or None where unavailable"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rpartition(")")[2].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+class Connection:
+    """Minimal keep-alive HTTP/1.1 GET client, so hundreds of pollers cost the client little CPU"""
+    
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+    
+    async def get_json(self, path):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        self.writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode())
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in head.split(b"\r\n"):
+            name, _, value = line.partition(b":")
+            if name.lower() == b"content-length":
+                length = int(value)
+        return json.loads(await self.reader.readexactly(length))
+    
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+async def run(httpx, base, args, server_pid):
+    """Submit jobs and poll them from many clients; returns timings and the final results"""
+    submit_latency, poll_latency, job_seconds = [], [], []
+    job_ids, statuses = [], {}
+    submitting = [True]
+    async with httpx.AsyncClient(timeout=60) as client:
+        async def submitter():
+            for i in range(args.jobs):
+                # Unique prompts so the result cache never answers
+                if i % 2:
+                    mode, body = "worldgen_text2scene", {"prompt": f"a bedroom #{i}-{time.time()}"}
+                else:
+                    mode, body = "hunyuan_text2world", {"prompt": f"a lake #{i}-{time.time()}"}
+                start = time.perf_counter()
+                response = await client.post(f"{base}/{mode}", json=body)
+                submit_latency.append(time.perf_counter() - start)
+                if response.status_code == 202:
+                    job_ids.append(response.json()["job_id"])
+                else:
+                    statuses[f"submit-{i}"] = response.status_code
+                await asyncio.sleep(0.01)
+            submitting[0] = False
+        
+        async def poller(seed):
+            rng = random.Random(seed)
+            connection = Connection(args.port)
+            while submitting[0] or any(statuses.get(job_id) not in ("done", "failed", "cancelled") for job_id in job_ids):
+                if not job_ids:
+                    await asyncio.sleep(0.01)
+                    continue
+                job_id = rng.choice(job_ids)
+                start = time.perf_counter()
+                status = await connection.get_json(f"/api/v1/jobs/{job_id}")
+                poll_latency.append(time.perf_counter() - start)
+                statuses[job_id] = status["status"]
+                if args.poll_interval:
+                    await asyncio.sleep(args.poll_interval)
+            connection.close()
+        
+        cpu_start = process_cpu_seconds(server_pid)
+        start = time.perf_counter()
+        await asyncio.gather(submitter(), *[poller(i) for i in range(args.pollers)])
+        wall = time.perf_counter() - start
+        cpu_end = process_cpu_seconds(server_pid)
+        
+        # Polls alone, against finished jobs: the per-poll cost without generations running
+        async def steady_poller(seed):
+            rng = random.Random(seed)
+            connection = Connection(args.port)
+            stop = time.perf_counter() + args.poll_seconds
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                await connection.get_json(f"/api/v1/jobs/{rng.choice(job_ids)}")
+                steady_latency.append(time.perf_counter() - start)
+                if args.poll_interval:
+                    await asyncio.sleep(args.poll_interval)
+            connection.close()
+        
+        steady_latency = []
+        steady_cpu_start = process_cpu_seconds(server_pid)
+        if job_ids:
+            await asyncio.gather(*[steady_poller(i) for i in range(args.pollers)])
+        steady_cpu_end = process_cpu_seconds(server_pid)
+        
+        results = []
+        for job_id in job_ids:
+            response = await client.get(f"{base}/jobs/{job_id}/result")
+            results.append(response.json())
+            job_seconds.append(results[-1]["queue_seconds"] + results[-1]["run_seconds"])
+    
+    server_cpu = cpu_end - cpu_start if cpu_start is not None else None
+    steady_cpu = steady_cpu_end - steady_cpu_start if steady_cpu_start is not None else None
+    return {
+        "wall": wall,
+        "server_cpu": server_cpu,
+        "steady_cpu": steady_cpu,
+        "submit_latency": submit_latency,
+        "poll_latency": poll_latency,
+        "steady_latency": steady_latency,
+        "job_seconds": job_seconds,
+        "results": results,
+    }
+
+def serve(port, max_jobs):
+    """Serve app.py's job API on port until killed (runs in a child process)"""
+    import uvicorn
+    from starlette.applications import Starlette
+    
+    import app
+    import rest_api
+    
+    app.initialize_hunyuan()
+    app.initialize_worldgen()
+    server_app = Starlette()
+    rest_api.JobApi(
+        rest_api.functions_for(app, "app"),
+        app.submit_job,
+        {"artifacts": app.artifacts.root, "cache": app.result_cache.root},
+        app.artifacts.new_dir,
+        max_jobs=max_jobs
+    ).mount(server_app)
+    uvicorn.run(server_app, port=port, log_level="warning")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pollers", type=int, default=200, help="concurrent status pollers")
+    parser.add_argument("--jobs", type=int, default=40, help="jobs to submit")
+    parser.add_argument("--poll-interval", type=float, default=0.25, help="seconds between one poller's requests")
+    parser.add_argument("--time-scale", type=float, default=0.05, help="fake model sleep scale")
+    parser.add_argument("--poll-seconds", type=float, default=5.0, help="length of the polling-only phase")
+    parser.add_argument("--port", type=int, default=7870)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+    
+    use_fake_models(args.time_scale)
+    if args.serve:
+        serve(args.port, args.jobs * 2)
+        return
+    import httpx
+    
+    # The server gets its own process (and GIL), so client load does not skew its numbers
+    server = subprocess.Popen([sys.executable, __file__, "--serve", "--port", str(args.port),
+                               "--jobs", str(args.jobs), "--time-scale", str(args.time_scale)])
+    base = f"http://127.0.0.1:{args.port}/api/v1"
+    try:
+        deadline = time.time() + 120
+        while True:
+            try:
+                httpx.get(f"{base}/modes").raise_for_status()
+                break
+            except httpx.HTTPError:
+                if time.time() > deadline or server.poll() is not None:
+                    raise RuntimeError("API server did not start")
+                time.sleep(0.2)
+        timings = asyncio.run(run(httpx, base, args, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+    
+    wall, results = timings["wall"], timings["results"]
+    completed = sum(1 for r in results if r.get("status") == "done" and r.get("outputs"))
+    polls, steady_polls = len(timings["poll_latency"]), len(timings["steady_latency"])
+    print(f"{len(results)} jobs, {completed} completed with artifact URLs in {wall:.2f}s "
+          f"({completed / wall:.2f} jobs/s) while {args.pollers} clients polled ({polls / wall:.0f} polls/s)")
+    steady = {"polls": steady_polls, "polls_per_second": steady_polls / args.poll_seconds}
+    if timings["steady_cpu"] is not None and steady_polls:
+        steady["server_cpu_ms_per_poll"] = timings["steady_cpu"] / steady_polls * 1e3
+        print(f"Polling only: {steady['polls_per_second']:.0f} polls/s, "
+              f"{steady['server_cpu_ms_per_poll']:.3f} ms server CPU per poll")
+    latency = {
+        "submit": summarize(timings["submit_latency"]),
+        "status poll (jobs running)": summarize(timings["poll_latency"]),
+        "status poll (polling only)": summarize(timings["steady_latency"]),
+        "job (queue + run)": summarize(timings["job_seconds"]),
+    }
+    print_table("Latency (s)", latency)
+    if results and results[0].get("outputs"):
+        print(f"\nExample outputs: {results[0]['outputs']}")
+    
+    write_json(args.output, {
+        "pollers": args.pollers,
+        "poll_interval": args.poll_interval,
+        "jobs": args.jobs,
+        "wall_seconds": wall,
+        "completed": completed,
+        "job_throughput": completed / wall,
+        "polls": polls,
+        "server_cpu_seconds": timings["server_cpu"],
+        "polling_only": steady,
+        "latency": latency,
+    })
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
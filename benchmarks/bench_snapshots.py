@@ -0,0 +1,88 @@
+"""
+Load time of a model from its checkpoint vs from a snapshot (model_snapshot.py)
+Builds a fake PanoGen (which sleeps like the real load and quantization) with
+--weights-mb of tensors attached, saves its snapshot, then loads it again
+from the memory-mapped snapshot. Also times the fingerprint of the source
+checkpoints (the Hugging Face cache by default), which every load computes.
+Needs torch.
+    
+    python benchmarks/bench_snapshots.py --weights-mb 2048 --runs 3
+    python benchmarks/bench_snapshots.py --time-scale 0 --sources ~/.cache/huggingface/hub
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+from common import print_table, summarize, use_fake_models, write_json
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weights-mb", type=int, default=1024, help="size of the tensors the fake model holds")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="fake load sleep scale (1: 2s per load)")
+    parser.add_argument("--sources", help="checkpoint directory to fingerprint (default: the Hugging Face cache)")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+    
+    use_fake_models(args.time_scale)
+    import torch
+    
+    import fake_models
+    import model_snapshot
+    
+    def build():
+        model = fake_models.FakePanoGen(device="cpu")
+        # Stand-in for the quantized weights: fp8 where this torch has it
+        dtype = getattr(torch, "float8_e4m3fn", torch.uint8)
+        model.weights = torch.zeros(args.weights_mb * 1024 * 1024, dtype=torch.uint8).view(dtype)
+        return model
+    
+    sources = [args.sources] if args.sources else model_snapshot.hf_repo_dirs()
+    timings = {"checkpoint load": [], "snapshot save": [], "snapshot load": [], "fingerprint": []}
+    root = tempfile.mkdtemp(prefix="bench_snapshots_")
+    try:
+        for _ in range(args.runs):
+            store = model_snapshot.SnapshotStore(root)
+            
+            start = time.perf_counter()
+            fingerprint = model_snapshot.source_fingerprint(sources, {"torch": torch.__version__})
+            timings["fingerprint"].append(time.perf_counter() - start)
+            
+            start = time.perf_counter()
+            model = build()
+            timings["checkpoint load"].append(time.perf_counter() - start)
+            
+            start = time.perf_counter()
+            store.save("hunyuan_panogen", fingerprint, model)
+            timings["snapshot save"].append(time.perf_counter() - start)
+            del model
+            
+            start = time.perf_counter()
+            loaded = store.load("hunyuan_panogen", fingerprint, "cpu")
+            # Touch every page, as moving the weights to a GPU would
+            loaded.weights.view(torch.uint8).sum()
+            timings["snapshot load"].append(time.perf_counter() - start)
+            size = store.stats()["snapshots"]["hunyuan_panogen"]["bytes"]
+            del loaded
+            shutil.rmtree(root, ignore_errors=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    
+    rows = {name: summarize(values) for name, values in timings.items()}
+    print(f"Snapshot: {size / 1e6:.0f} MB, sources: {', '.join(str(s) for s in sources)}")
+    print_table("Seconds", rows)
+    speedup = rows["checkpoint load"]["p50"] / rows["snapshot load"]["p50"] if rows["snapshot load"]["p50"] else None
+    if speedup:
+        print(f"\nSnapshot load is {speedup:.1f}x faster than building from the checkpoint")
+    write_json(args.output, {
+        "weights_mb": args.weights_mb,
+        "time_scale": args.time_scale,
+        "snapshot_bytes": size,
+        "seconds": rows,
+        "speedup": speedup,
+    })
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Size, speed and accuracy of the compressed splat format
+Encodes a splat PLY (a WorldGen scene_splat.ply) or, by default, a synthetic
+cloud of random Gaussians, and reports the compression ratio, encode / decode /
+streaming times and the round trip error for a few opacity pruning thresholds.
+    
+    python benchmarks/bench_splat_compression.py --splats 500000 --sh-degree 3
+    python benchmarks/bench_splat_compression.py --ply outputs/artifacts/worldgen_x/scene_splat.ply
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import use_fake_models, write_json
+
+def synthetic_splats(count, sh_degree, seed=0):
+    """Random Gaussians clustered like a scene: a few dense blobs plus a sparse shell"""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(-5, 5, size=(16, 3))
+    positions = centers[rng.integers(0, len(centers), count)] + rng.normal(0, 0.6, size=(count, 3))
+    sparse = rng.random(count) < 0.1
+    positions[sparse] = rng.normal(0, 20, size=(sparse.sum(), 3))
+    
+    data = {name: positions[:, i] for i, name in enumerate("xyz")}
+    for i in range(3):
+        data[f"f_dc_{i}"] = rng.normal(0, 1.0, count)
+        data[f"scale_{i}"] = rng.normal(-4.5, 1.0, count)
+    data["opacity"] = rng.normal(0, 3.0, count)
+    rotation = rng.normal(size=(count, 4))
+    for i in range(4):
+        data[f"rot_{i}"] = rotation[:, i]
+    for i in range(3 * ((sh_degree + 1) ** 2 - 1)):
+        data[f"f_rest_{i}"] = rng.normal(0, 0.1, count)
+    return {name: values.astype(np.float32) for name, values in data.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ply", help="splat PLY to compress (default: synthetic Gaussians)")
+    parser.add_argument("--splats", type=int, default=200000, help="synthetic splat count")
+    parser.add_argument("--sh-degree", type=int, default=3, help="synthetic SH degree (0-3)")
+    parser.add_argument("--prune", default="0,0.005,0.02", help="opacity thresholds to compare")
+    parser.add_argument("--mbps", type=float, default=20.0, help="client bandwidth for download estimates")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+    
+    use_fake_models()  # puts the repo root on sys.path
+    import splat_io
+    
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_splat_"))
+    source = Path(args.ply) if args.ply else work_dir / "scene_splat.ply"
+    if not args.ply:
+        splat_io.write_splat(source, synthetic_splats(args.splats, args.sh_degree))
+    data = splat_io.read_splat(source)
+    source_bytes = source.stat().st_size
+    print(f"{source}: {len(data['x'])} splats, {source_bytes / 1e6:.1f} MB, "
+          f"{source_bytes * 8 / (args.mbps * 1e6):.1f}s download at {args.mbps:g} Mbit/s")
+    
+    results = {}
+    for threshold in (float(value) for value in args.prune.split(",")):
+        target = work_dir / f"scene_splat_prune{threshold:g}.compressed.ply"
+        stats = splat_io.compress_file(source, target, prune_opacity=threshold)
+        
+        start = time.perf_counter()
+        splat_io.read_splat(target)
+        decode_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        first_step = None
+        for _ in splat_io.iter_compressed(target):
+            if first_step is None:
+                first_step = time.perf_counter() - start
+        stream_seconds = time.perf_counter() - start
+        
+        results[f"prune {threshold:g}"] = {
+            **stats,
+            "download_seconds": stats["target_bytes"] * 8 / (args.mbps * 1e6),
+            "decode_seconds": decode_seconds,
+            "stream_first_step_seconds": first_step,
+            "stream_seconds": stream_seconds,
+            "errors": splat_io.roundtrip_errors(data, prune_opacity=threshold),
+        }
+    
+    print(f"{'run':<14}{'kept':>10}{'MB':>8}{'ratio':>8}{'encode s':>10}{'decode s':>10}{'download s':>12}")
+    for name, result in results.items():
+        print(f"{name:<14}{result['kept']:>10}{result['target_bytes'] / 1e6:>8.1f}{result['ratio']:>8.2f}"
+              f"{result['seconds']:>10.2f}{result['decode_seconds']:>10.2f}{result['download_seconds']:>12.1f}")
+    
+    print("\nRound trip error (positions relative to the scene diagonal, rotations in degrees)")
+    for name, result in results.items():
+        errors = result["errors"]
+        print(f"{name:<14}" + "  ".join(f"{key} {value:.3g}" for key, value in errors.items() if key not in ("splats", "kept")))
+    
+    write_json(args.output, results)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
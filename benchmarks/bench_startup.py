@@ -0,0 +1,112 @@
+"""
+Cold start of app.py with fake models, with and without background warm-up
+Starts the app in a fresh process per run and records, from the moment the
+process was spawned: how long `import app` took, when the UI first answered
+an HTTP request, when the warm-up steps (torch, model packages, cache scan)
+had all finished, and when the first generation (Initialize, then one
+text-to-world request) returned. WORLD3D_PRELOAD=0 runs the same steps before the port is
+bound, as the app did before the warm-up moved to the background.
+    
+    python benchmarks/bench_startup.py --runs 3
+
+Fake models skip the model packages, so on a GPU host the gap between the two
+modes grows with the real import time of torch, hy3dworld and worldgen.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from common import print_table, summarize, use_fake_models, write_json
+
+def serve(port, spawned_at):
+    """Import and launch app.py, report timings on stdout, then time a first request (child process)"""
+    since = lambda: time.time() - spawned_at
+    timings = {"interpreter": since()}
+    
+    start = time.perf_counter()
+    import app
+    timings["import_app"] = time.perf_counter() - start
+    
+    app.demo.launch(server_name="127.0.0.1", server_port=port, prevent_thread_lock=True, quiet=True)
+    app.preloader.start()
+    timings["launched"] = since()
+    print(json.dumps(timings), flush=True)
+    
+    # A user who clicks Initialize as soon as the page shows, then generates
+    app.initialize_hunyuan()
+    timings["initialized"] = since()
+    result = app.last_update(app.generate_hunyuan_text2world(f"a lake at dawn {time.time()}", "", "", "outdoor"))
+    timings["first_result"] = since()
+    while not app.preloader.done():
+        time.sleep(0.05)
+    steps = app.preloader.steps.values()
+    timings["warm"] = max(step.started_at + step.seconds for step in steps if step.seconds is not None) - spawned_at
+    timings["steps"] = app.preloader.stats()
+    timings["ok"] = bool(result[1])
+    print(json.dumps(timings), flush=True)
+    app.demo.close()
+
+def run_once(port, preload):
+    """Start a fresh app process; returns its timings"""
+    env = dict(os.environ, WORLD3D_PRELOAD="1" if preload else "0")
+    spawned_at = time.time()
+    child = subprocess.Popen(
+        [sys.executable, __file__, "--serve", "--port", str(port), "--spawned-at", repr(spawned_at)],
+        env=env, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        # The first UI response, as a browser would see it
+        ui = None
+        while ui is None:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+                ui = time.time() - spawned_at
+            except OSError:
+                if child.poll() is not None or time.time() - spawned_at > 300:
+                    raise RuntimeError("app did not start")
+                time.sleep(0.02)
+        
+        lines = [json.loads(line) for line in child.stdout if line.startswith("{")]
+    finally:
+        child.wait(timeout=120)
+    timings = lines[-1]
+    timings["ui"] = ui
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="cold starts per mode")
+    parser.add_argument("--time-scale", type=float, default=0.1, help="fake model sleep scale")
+    parser.add_argument("--port", type=int, default=7880)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--spawned-at", type=float, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+    
+    use_fake_models(args.time_scale)
+    if args.serve:
+        serve(args.port, args.spawned_at)
+        return
+    
+    metrics = ["import_app", "ui", "first_result", "warm"]
+    rows, results = {}, {}
+    for preload in (True, False):
+        label = "background warm-up" if preload else "WORLD3D_PRELOAD=0"
+        runs = [run_once(args.port, preload) for _ in range(args.runs)]
+        results[label] = {metric: summarize([run[metric] for run in runs]) for metric in metrics}
+        results[label]["steps"] = runs[-1]["steps"]
+        for metric in metrics:
+            rows[f"{metric} ({label})"] = results[label][metric]
+        steps = ", ".join(f"{name} {info['seconds']:.2f}s" for name, info in runs[-1]["steps"].items() if info["seconds"])
+        print(f"{label}: steps {steps}")
+    
+    print_table("Seconds since process start (import_app: duration)", rows)
+    write_json(args.output, {"runs": args.runs, "time_scale": args.time_scale, "results": results})
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
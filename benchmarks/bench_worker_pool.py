@@ -0,0 +1,107 @@
+"""
+Throughput of the device-pinned worker pool with fake models on CPU
+Runs the same text-to-scene / text-to-world jobs through worker pools of
+1..N fake devices (one process each, see worker_pool.py) and reports jobs/s
+and latency per pool size. With --kill-after, one worker is killed mid-run to
+show its calls being retried and the worker coming back.
+    
+    python benchmarks/bench_worker_pool.py --devices 1,2,4 --jobs 32 --time-scale 0.2
+    python benchmarks/bench_worker_pool.py --devices 4 --jobs 64 --kill-after 2
+"""
+
+import argparse
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import print_table, summarize, use_fake_models, write_json
+
+def run(pool, jobs, concurrency, kill_after=None):
+    """Submit jobs from concurrency threads; returns (latencies, failures, wall seconds, recovery seconds)"""
+    latencies, failures = [], []
+    
+    def one(i):
+        start = time.perf_counter()
+        try:
+            if i % 2:
+                pool.call("generate_worldgen_text2scene", f"a room #{i}-{time.time()}", False, False)
+            else:
+                pool.call("generate_hunyuan_text2world", f"a lake #{i}-{time.time()}", "", "", "outdoor")
+        except Exception as e:
+            failures.append(str(e).splitlines()[0])
+            return
+        latencies.append(time.perf_counter() - start)
+    
+    recovery = []
+    
+    def kill():
+        time.sleep(kill_after)
+        victim = pool.workers[0]
+        os.kill(victim.process.pid, signal.SIGKILL)
+        killed_at = time.perf_counter()
+        while victim.restarts == 0 or not victim.ready:
+            time.sleep(0.1)
+        recovery.append(time.perf_counter() - killed_at)
+    
+    killer = threading.Thread(target=kill) if kill_after is not None else None
+    start = time.perf_counter()
+    if killer:
+        killer.start()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(one, range(jobs)))
+    wall = time.perf_counter() - start
+    if killer:
+        killer.join()
+    return latencies, failures, wall, recovery[0] if recovery else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", default="1,2,4", help="pool sizes to compare")
+    parser.add_argument("--jobs", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=2, help="jobs in flight per device")
+    parser.add_argument("--time-scale", type=float, default=0.2, help="fake model sleep scale")
+    parser.add_argument("--kill-after", type=float, help="kill worker 0 this many seconds into each run")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+    
+    use_fake_models(args.time_scale)
+    from worker_pool import WorkerPool
+    
+    results = {}
+    for size in [int(n) for n in args.devices.split(",")]:
+        start = time.perf_counter()
+        pool = WorkerPool("app", ["cpu"] * size, heartbeat_interval=0.5, restart_delay=0.5)
+        pool.broadcast("initialize_hunyuan")
+        pool.broadcast("initialize_worldgen")
+        startup = time.perf_counter() - start
+        try:
+            latencies, failures, wall, recovery = run(pool, args.jobs, args.concurrency * size, args.kill_after)
+            stats = pool.stats()
+        finally:
+            pool.close()
+        results[size] = {
+            "startup_seconds": startup,
+            "wall_seconds": wall,
+            "throughput": len(latencies) / wall,
+            "failures": failures,
+            "recovery_seconds": recovery,
+            "latency": summarize(latencies),
+            "per_worker_completed": [w["completed"] for w in stats["workers"]],
+            "counters": stats["counters"],
+        }
+    
+    print(f"{'devices':<10}{'jobs/s':>10}{'speedup':>10}{'startup s':>12}{'failed':>8}{'retried':>9}  per-worker calls")
+    base = results[min(results)]["throughput"]
+    for size, r in results.items():
+        print(f"{size:<10}{r['throughput']:>10.2f}{r['throughput'] / base:>10.2f}{r['startup_seconds']:>12.1f}"
+              f"{len(r['failures']):>8}{r['counters']['retried']:>9}  {r['per_worker_completed']}")
+        if r["recovery_seconds"] is not None:
+            print(f"{'':<10}killed worker 0: ready again after {r['recovery_seconds']:.1f}s")
+    print_table("Job latency (s)", {f"{size} devices": r["latency"] for size, r in results.items()})
+    
+    write_json(args.output, results)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
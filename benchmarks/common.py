@@ -0,0 +1,55 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+def use_fake_models(time_scale=None):
+    """Switch the apps to fake models; must run before importing an app"""
+    os.environ["WORLD3D_FAKE_MODELS"] = "1"
+    os.environ.setdefault("WORLD3D_AUTOLOAD", "none")  # the benchmarks initialize what they measure
+    if time_scale is not None:
+        os.environ["WORLD3D_FAKE_TIME_SCALE"] = str(time_scale)
+    sys.path.insert(0, str(REPO_ROOT))
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def summarize(values):
+    """Count, mean and p50/p95/p99 of a list of latencies in seconds"""
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0,
+    }
+
+def print_table(title, rows):
+    """Print {name: summary} rows as an aligned table"""
+    print(f"\n{title}")
+    print(f"{'':<40}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, row in rows.items():
+        print(
+            f"{name:<40}{row['count']:>8}{row['mean']:>10.3f}"
+            f"{row['p50']:>10.3f}{row['p95']:>10.3f}{row['p99']:>10.3f}"
+        )
+
+def write_json(path, results):
+    if path:
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {path}")
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Load test for the job scheduler in app.py
+Runs concurrent clients against the real generate functions backed by fake
+models and reports throughput, rejections and p50/p95/p99 latency.
+    
+    python benchmarks/load_test.py --clients 16 --requests 200 --time-scale 0.01
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from common import print_table, summarize, use_fake_models, write_json
+
+# mode -> (backend, app function, arguments)
+MODES = {
+    "hunyuan_text2world": ("hunyuan", "generate_hunyuan_text2world", ("a lake", "", "", "outdoor")),
+    "worldgen_text2scene": ("worldgen", "generate_worldgen_text2scene", ("a bedroom", False, False)),
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=100, help="total requests")
+    parser.add_argument("--hunyuan-share", type=float, default=0.3, help="fraction of Hunyuan requests")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="fake model sleep scale")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+    
+    use_fake_models(args.time_scale)
+    import app
+    
+    app.initialize_hunyuan()
+    app.initialize_worldgen()
+    
+    latencies = {mode: [] for mode in MODES}
+    queue_waits = {mode: [] for mode in MODES}
+    rejected = {mode: 0 for mode in MODES}
+    lock = threading.Lock()
+    remaining = [args.requests]
+    
+    def client(seed):
+        rng = random.Random(seed)
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+                request_id = remaining[0]
+            
+            mode = "hunyuan_text2world" if rng.random() < args.hunyuan_share else "worldgen_text2scene"
+            backend, fn_name, fn_args = MODES[mode]
+            # Unique prompts so the result cache never answers
+            fn_args = (f"{fn_args[0]} #{request_id}-{seed}",) + fn_args[1:]
+            start = time.perf_counter()
+            try:
+                job = app.scheduler.submit(backend, getattr(app, fn_name), *fn_args)
+            except app.QueueFullError:
+                with lock:
+                    rejected[mode] += 1
+                continue
+            job.wait()
+            with lock:
+                latencies[mode].append(time.perf_counter() - start)
+                queue_waits[mode].append(job.queue_seconds())
+    
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    
+    completed = sum(len(v) for v in latencies.values())
+    print(f"Completed {completed} requests in {wall:.2f}s "
+          f"({completed / wall:.2f} req/s), rejected {sum(rejected.values())}")
+    print_table("End-to-end latency (s)", {m: summarize(v) for m, v in latencies.items()})
+    print_table("Queue wait (s)", {m: summarize(v) for m, v in queue_waits.items()})
+    
+    write_json(args.output, {
+        "clients": args.clients,
+        "requests": args.requests,
+        "wall_seconds": wall,
+        "throughput": completed / wall,
+        "rejected": rejected,
+        "latency": {m: summarize(v) for m, v in latencies.items()},
+        "queue_wait": {m: summarize(v) for m, v in queue_waits.items()},
+        "scheduler": app.scheduler.stats(),
+    })
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
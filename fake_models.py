@@ -0,0 +1,180 @@
+"""
+Fake PanoGen, SceneGen and WorldGen models for CPU-only testing
+They mimic the call signatures and output files of the real models, sleep for
+a configurable time instead of running inference and report a fake footprint
+so the model registry can exercise its memory budget.
+
+Enable them in the apps with WORLD3D_FAKE_MODELS=1. WORLD3D_FAKE_TIME_SCALE
+scales every sleep (0 makes the fakes instant).
+"""
+
+import json
+import math
+import os
+import struct
+import time
+import zlib
+from pathlib import Path
+
+GB = 1024 ** 3
+
+# Extra time for each additional item in a batch, as a fraction of one call
+BATCH_MARGINAL_COST = 0.35
+
+# name -> (load seconds, inference seconds, memory bytes)
+PROFILES = {
+    "hunyuan_panogen": (2.0, 4.0, 12 * GB),
+    "hunyuan_scenegen": (2.0, 6.0, 10 * GB),
+    "worldgen_t2s": (1.0, 1.0, 8 * GB),
+    "worldgen_i2s": (1.0, 1.0, 8 * GB),
+}
+
+def enabled():
+    return os.environ.get("WORLD3D_FAKE_MODELS", "0") == "1"
+
+def time_scale():
+    return float(os.environ.get("WORLD3D_FAKE_TIME_SCALE", "1.0"))
+
+def write_png(path, width=64, height=32, color=(90, 140, 200)):
+    """Write a solid colour RGB PNG without needing PIL"""
+    def chunk(kind, data):
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+    
+    row = b"\x00" + bytes(color) * width
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(row * height)))
+        f.write(chunk(b"IEND", b""))
+
+def write_glb(path, segments=96):
+    """Write a vertex-coloured UV sphere GLB (segments * segments / 2 quads)"""
+    rings = segments // 2
+    positions, colors, indices = [], [], []
+    for i in range(rings + 1):
+        theta = math.pi * i / rings
+        for j in range(segments + 1):
+            phi = 2 * math.pi * j / segments
+            positions += [math.sin(theta) * math.cos(phi), math.cos(theta), math.sin(theta) * math.sin(phi)]
+            colors += [int(255 * i / rings), 140, int(255 * j / segments), 255]
+    for i in range(rings):
+        for j in range(segments):
+            a = i * (segments + 1) + j
+            b = a + segments + 1
+            indices += [a, b, a + 1, a + 1, b, b + 1]
+    
+    count = len(positions) // 3
+    position_bytes = struct.pack(f"<{len(positions)}f", *positions)
+    color_bytes = struct.pack(f"<{len(colors)}B", *colors)
+    index_bytes = struct.pack(f"<{len(indices)}I", *indices)
+    binary = position_bytes + color_bytes + index_bytes
+    gltf = {
+        "asset": {"version": "2.0"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0, "COLOR_0": 1}, "indices": 2}]}],
+        "buffers": [{"byteLength": len(binary)}],
+        "bufferViews": [
+            {"buffer": 0, "byteOffset": 0, "byteLength": len(position_bytes), "target": 34962},
+            {"buffer": 0, "byteOffset": len(position_bytes), "byteLength": len(color_bytes), "target": 34962},
+            {"buffer": 0, "byteOffset": len(position_bytes) + len(color_bytes),
+             "byteLength": len(index_bytes), "target": 34963},
+        ],
+        "accessors": [
+            {"bufferView": 0, "componentType": 5126, "count": count, "type": "VEC3",
+             "min": [-1, -1, -1], "max": [1, 1, 1]},
+            {"bufferView": 1, "componentType": 5121, "normalized": True, "count": count, "type": "VEC4"},
+            {"bufferView": 2, "componentType": 5125, "count": len(indices), "type": "SCALAR"},
+        ],
+    }
+    text = json.dumps(gltf).encode()
+    text += b" " * (-len(text) % 4)
+    total = 12 + 8 + len(text) + 8 + len(binary)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<4sII", b"glTF", 2, total))
+        f.write(struct.pack("<I4s", len(text), b"JSON") + text)
+        f.write(struct.pack("<I4s", len(binary), b"BIN\x00") + binary)
+
+def write_ply(path, num_points=1024, splat=True):
+    """Write a small binary PLY point cloud (3DGS layout when splat=True)"""
+    names = ["x", "y", "z"]
+    if splat:
+        names += ["f_dc_0", "f_dc_1", "f_dc_2", "opacity",
+                  "scale_0", "scale_1", "scale_2", "rot_0", "rot_1", "rot_2", "rot_3"]
+    header = ["ply", "format binary_little_endian 1.0", f"element vertex {num_points}"]
+    header += [f"property float {name}" for name in names]
+    header += ["end_header"]
+    with open(path, "wb") as f:
+        f.write(("\n".join(header) + "\n").encode())
+        for i in range(num_points):
+            values = [0.0] * len(names)
+            values[0] = (i % 32) / 32.0
+            values[1] = (i // 32 % 32) / 32.0
+            values[2] = (i // 1024) / 32.0
+            if splat:
+                values[7] = 1.0
+            f.write(struct.pack(f"<{len(names)}f", *values))
+
+class FakeModel:
+    """Base class: sleeps like the real model and reports a memory footprint"""
+    
+    def __init__(self, name, device="cpu", **kwargs):
+        load_seconds, self.infer_seconds, self.memory_bytes = PROFILES[name]
+        self.name = name
+        self.device = str(device)
+        self.kwargs = kwargs
+        time.sleep(load_seconds * time_scale())
+    
+    def to(self, device):
+        self.device = str(device)
+        return self
+    
+    def _infer(self, batch_size=1):
+        scale = 1 + BATCH_MARGINAL_COST * (batch_size - 1)
+        time.sleep(self.infer_seconds * scale * time_scale())
+
+class FakePanoGen(FakeModel):
+    def __init__(self, device="cpu", **kwargs):
+        super().__init__("hunyuan_panogen", device, **kwargs)
+    
+    def generate(self, prompt="", output_path=".", image_path=None, **kwargs):
+        self._infer()
+        write_png(Path(output_path) / "panorama.png")
+    
+    def generate_batch(self, prompts, output_paths, **kwargs):
+        self._infer(len(prompts))
+        for output_path in output_paths:
+            write_png(Path(output_path) / "panorama.png")
+
+class FakeSceneGen(FakeModel):
+    def __init__(self, device="cpu", **kwargs):
+        super().__init__("hunyuan_scenegen", device, **kwargs)
+    
+    def generate(self, image_path, labels_fg1=None, labels_fg2=None, classes="outdoor",
+                 output_path=".", **kwargs):
+        self._infer()
+        write_glb(Path(output_path) / "scene_mesh.glb")
+
+class FakeWorldResult:
+    """Stand-in for the splat / mesh object returned by WorldGen"""
+    
+    def __init__(self, splat):
+        self.splat = splat
+    
+    def save(self, path):
+        write_ply(path, splat=self.splat)
+
+class FakeWorldGen(FakeModel):
+    def __init__(self, mode="t2s", device="cpu", **kwargs):
+        super().__init__(f"worldgen_{mode}", device, **kwargs)
+        self.mode = mode
+    
+    def generate_world(self, prompt="", image=None, use_sharp=False, return_mesh=False, **kwargs):
+        self._infer()
+        return FakeWorldResult(splat=not return_mesh)
+    
+    def generate_world_batch(self, prompts, use_sharp=False, return_mesh=False, **kwargs):
+        self._infer(len(prompts))
+        return [FakeWorldResult(splat=not return_mesh) for _ in prompts]
\ No newline at end of file
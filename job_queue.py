@@ -0,0 +1,473 @@
+"""
+Job scheduler in front of the generation functions
+Each backend (Hunyuan, WorldGen) has its own bounded worker pool so parallel
+clicks never share a GPU model object, plus a bounded queue that rejects new
+work immediately once it is full.
+
+Functions that return a generator stream partial results: every yielded
+value is published as job.latest and the last one becomes job.result.
+
+Jobs submitted with a batch_key are micro-batched: when a worker picks one up
+it waits up to batch_window seconds for more queued jobs with the same key and
+runs them together through the job's batch_fn.
+
+Jobs submitted with a key are single-flight: while a job with the same key is
+queued or running, submit() hands out that job instead of queueing a
+duplicate, and every caller gets its result. Each caller gets its own
+JobHandle, so cancelling only drops that caller.
+
+Queued jobs are not run first come, first served. Each job's run time is
+estimated from the runs of earlier jobs with the same cost key (its mode and
+the parameters that change the work, see CostModel), and the worker takes
+the job with the lowest score:
+    
+    estimate + fair_share * recent run time of its user - aging * seconds waited
+
+so short jobs overtake long ones, users who just had a lot of run time wait
+for the others, and every job eventually runs. A job with a deadline is
+rejected at submit() when the work ahead of it says it would finish late.
+"""
+
+import inspect
+import itertools
+import threading
+import time
+from collections import deque
+
+import metrics
+
+class QueueFullError(Exception):
+    """Raised by submit() when a backend queue is at its maximum depth"""
+
+class DeadlineError(QueueFullError):
+    """Raised by submit() when a job is projected to finish after its deadline"""
+
+class CostModel:
+    """Expected run time of jobs, an exponentially weighted average of the runs so far
+    
+    Cost keys are tuples that start with the mode, e.g. ("worldgen_text2scene",
+    "sharp", "mesh"). A key that has not run yet falls back to its mode, then
+    to the backend, then to default, so with no history every job looks the
+    same and the queue stays first come, first served.
+    """
+    
+    def __init__(self, alpha=0.3, default=60.0):
+        self.alpha = alpha
+        self.default = default
+        self._estimates = {}  # key, (mode,) or backend -> [seconds, runs]
+        self._lock = threading.Lock()
+    
+    def _chain(self, backend, key):
+        if not key:
+            return [backend]
+        return [key, key[:1], backend] if len(key) > 1 else [key, backend]
+    
+    def estimate(self, backend, key=None):
+        """(seconds, measured): measured is False when nothing on the chain has run and seconds is the default"""
+        with self._lock:
+            for k in self._chain(backend, key):
+                if k in self._estimates:
+                    return self._estimates[k][0], True
+        return self.default, False
+    
+    def record(self, backend, key, seconds):
+        with self._lock:
+            for k in self._chain(backend, key):
+                entry = self._estimates.get(k)
+                if entry is None:
+                    self._estimates[k] = [seconds, 1]
+                else:
+                    entry[0] += self.alpha * (seconds - entry[0])
+                    entry[1] += 1
+    
+    def stats(self):
+        """{mode or cost key: {"seconds", "runs"}} of the keys that have run"""
+        with self._lock:
+            return {
+                ":".join(k) if isinstance(k, tuple) else k: {"seconds": seconds, "runs": runs}
+                for k, (seconds, runs) in self._estimates.items()
+            }
+
+class Job:
+    """A queued call of fn(*args, **kwargs) on one backend"""
+    
+    _ids = itertools.count(1)
+    
+    def __init__(self, backend, fn, args, kwargs, batch_key=None, batch_fn=None, key=None,
+                 cost_key=None, user=None, deadline=None):
+        self.id = next(self._ids)
+        self.backend = backend
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.waiters = 1  # callers still interested; cancelling only drops the job at zero
+        self.attached = 0  # callers that got this job instead of a duplicate
+        self.cost_key = cost_key
+        self.user = user
+        self.estimate = 0.0  # expected run seconds, set by the scheduler
+        self.batch_key = batch_key
+        self.batch_fn = batch_fn
+        self.batch_size = 1
+        self.latest = None
+        self.updates = 0
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.deadline_at = self.submitted_at + deadline if deadline else None
+        self.started_at = None
+        self.finished_at = None
+        self._scheduler = None
+        self._done = threading.Event()
+    
+    def done(self):
+        return self._done.is_set()
+    
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns False on timeout"""
+        return self._done.wait(timeout)
+    
+    def cancel(self):
+        """Cancel the job if it has not started yet; returns True on success
+        
+        A job shared by several callers only detaches this caller until the
+        last one cancels.
+        """
+        return self._scheduler.cancel(self)
+    
+    def position(self):
+        """1-based position in the current run order of the backend queue, 0 once it is running"""
+        return self._scheduler.position(self)
+    
+    def queue_seconds(self):
+        end = self.started_at or time.time()
+        return end - self.submitted_at
+    
+    def run_seconds(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+    
+    def describe(self):
+        """Short status line for the UI"""
+        if self.status == "queued":
+            position = self.position()
+            depth = self._scheduler.queue_depth(self.backend)
+            start = self._scheduler.expected_start(self)
+            return (f"⏳ Queued: position {position} of {depth} ({self.queue_seconds():.0f}s waiting, "
+                    f"~{start:.0f}s to start)")
+        if self.status == "running":
+            if self.batch_size > 1:
+                return f"⚙️ Running in a batch of {self.batch_size} ({self.run_seconds():.0f}s)"
+            return f"⚙️ Running ({self.run_seconds():.0f}s)"
+        return self.status
+    
+    def _publish(self, update):
+        self.latest = update
+        self.updates += 1
+    
+    def _finish(self, status, result=None, error=None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        self._done.set()
+
+class JobHandle:
+    """One caller's view of a keyed Job, which identical submissions share
+    
+    Everything but cancel() is the job's; cancel() detaches this caller once,
+    and cancels the job when no other caller is left.
+    """
+    
+    def __init__(self, job):
+        self.job = job
+        self.detached = False
+    
+    def __getattr__(self, name):
+        return getattr(self.job, name)
+    
+    def cancel(self):
+        return self.job._scheduler.cancel(self.job, handle=self)
+
+class JobScheduler:
+    """Per-backend queues drained by a fixed number of worker threads, cheapest score first
+    
+    aging is how many seconds of expected run time a second of waiting is
+    worth; fair_share weighs each user's run time, which decays by half every
+    share_half_life seconds.
+    """
+    
+    def __init__(self, limits, max_queue_depth=16, batch_window=0.05, max_batch_size=8,
+                 cost_model=None, aging=1.0, fair_share=1.0, share_half_life=600.0):
+        self.limits = dict(limits)
+        self.max_queue_depth = max_queue_depth
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.cost_model = cost_model or CostModel()
+        self.aging = aging
+        self.fair_share = fair_share
+        self.share_half_life = share_half_life
+        self.counters = {
+            "submitted": 0,
+            "rejected": 0,
+            "cancelled": 0,
+            "completed": 0,
+            "failed": 0,
+            "batches": 0,
+            "batched_jobs": 0,
+            "coalesced": 0,
+            "deadline_rejected": 0,
+            "late": 0,
+        }
+        self.saved_seconds = 0.0  # run time of coalesced duplicates that never ran
+        self._inflight = {}  # key -> queued or running job
+        self._queues = {backend: deque() for backend in self.limits}
+        self._running = {backend: 0 for backend in self.limits}
+        self._active = {backend: [] for backend in self.limits}  # running jobs
+        self._usage = {}  # user -> [run seconds, as of time]
+        self._cond = threading.Condition()
+        
+        for backend, limit in self.limits.items():
+            for i in range(limit):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(backend,),
+                    name=f"{backend}-worker-{i}",
+                    daemon=True
+                )
+                thread.start()
+    
+    def submit(self, backend, fn, *args, batch_key=None, batch_fn=None, key=None, cost_key=None,
+               user=None, deadline=None, **kwargs):
+        """Queue fn(*args, **kwargs) on backend and return its Job
+        
+        Jobs with the same batch_key may instead be run together as
+        batch_fn([args, ...]), which must return one result per job. While a
+        job with the same key is queued or running, that job is shared: keyed
+        submissions return a JobHandle of their own.
+        cost_key and user drive the run order (see CostModel); a job that
+        would not finish within deadline seconds raises DeadlineError.
+        """
+        job = Job(backend, fn, args, kwargs, batch_key=batch_key, batch_fn=batch_fn, key=key,
+                  cost_key=cost_key, user=user, deadline=deadline)
+        job._scheduler = self
+        job.estimate, measured = self.cost_model.estimate(backend, cost_key)
+        with self._cond:
+            shared = self._inflight.get(key) if key is not None else None
+            if shared is not None:
+                shared.waiters += 1
+                shared.attached += 1
+                self.counters["coalesced"] += 1
+                metrics.inc("world3d_coalesced_requests_total", backend=backend)
+                return JobHandle(shared)
+            queue = self._queues[backend]
+            if len(queue) >= self.max_queue_depth:
+                self.counters["rejected"] += 1
+                raise QueueFullError(
+                    f"{backend} queue is full ({len(queue)} jobs waiting), please retry later"
+                )
+            # Without a measured run time the deadline cannot be judged; the job runs and provides one
+            if job.deadline_at is not None and measured:
+                finish = self._expected_start(job, list(queue) + [job]) + job.estimate
+                if job.submitted_at + finish > job.deadline_at:
+                    self.counters["deadline_rejected"] += 1
+                    metrics.inc("world3d_deadline_rejections_total", backend=backend)
+                    raise DeadlineError(
+                        f"{backend} job would take ~{finish:.1f}s with the work queued ahead of it, "
+                        f"over its {deadline:g}s deadline; please retry later"
+                    )
+            queue.append(job)
+            if key is not None:
+                self._inflight[key] = job
+            self.counters["submitted"] += 1
+            self._cond.notify_all()
+        return JobHandle(job) if key is not None else job
+    
+    def finished(self, backend, result):
+        """A Job that is already done with result, e.g. for a result cache hit"""
+        job = Job(backend, None, (), {})
+        job._scheduler = self
+        job.started_at = job.submitted_at
+        job._finish("done", result=result)
+        return job
+    
+    def cancel(self, job, handle=None):
+        """Cancel a queued job; with the JobHandle of a shared job, only detach that caller
+        
+        Returns True if the job was cancelled.
+        """
+        with self._cond:
+            if handle is not None and handle.detached:
+                return False
+            if job.status != "queued" or job not in self._queues[job.backend]:
+                return False
+            if handle is not None:
+                handle.detached = True
+            if job.waiters > 1:
+                # Only this caller leaves; the others still want the job
+                job.waiters -= 1
+                job.attached -= 1
+                return False
+            self._queues[job.backend].remove(job)
+            self._forget(job)
+            self.counters["cancelled"] += 1
+        job._finish("cancelled")
+        return True
+    
+    def _forget(self, job):
+        """Stop handing out job to new callers of its key; called with the lock held"""
+        if job.key is not None and self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+    
+    def _user_usage(self, user, now):
+        """Decayed run time of user; called with the lock held"""
+        entry = self._usage.get(user)
+        if entry is None:
+            return 0.0
+        return entry[0] * 0.5 ** ((now - entry[1]) / self.share_half_life)
+    
+    def _charge(self, user, seconds, now):
+        """Add run time to user; called with the lock held"""
+        self._usage[user] = [max(self._user_usage(user, now) + seconds, 0.0), now]
+    
+    def _score(self, job, now):
+        return (job.estimate + self.fair_share * self._user_usage(job.user, now)
+                - self.aging * (now - job.submitted_at))
+    
+    def _order(self, jobs):
+        """Jobs in the order the workers would take them now; called with the lock held"""
+        now = time.time()
+        return sorted(jobs, key=lambda job: self._score(job, now))  # stable: ties stay FIFO
+    
+    def _expected_start(self, job, queued):
+        """Seconds until job is expected to start, from the estimates of the work ahead of it
+        
+        Called with the lock held. Running jobs count with what they have
+        left, and the backend's workers share the work.
+        """
+        now = time.time()
+        backend = job.backend
+        running = sum(max(j.estimate - (now - j.started_at), 0.0) for j in self._active[backend])
+        order = self._order(queued)
+        ahead = sum(j.estimate for j in order[:order.index(job)])
+        return (running + ahead) / self.limits[backend]
+    
+    def expected_start(self, job):
+        """Seconds until a queued job is expected to start (0 once it runs)"""
+        with self._cond:
+            if job.status != "queued" or job not in self._queues[job.backend]:
+                return 0.0
+            return self._expected_start(job, list(self._queues[job.backend]))
+    
+    def position(self, job):
+        with self._cond:
+            if job.status != "queued":
+                return 0
+            try:
+                return self._order(self._queues[job.backend]).index(job) + 1
+            except ValueError:
+                return 0
+    
+    def queue_depth(self, backend):
+        return len(self._queues[backend])
+    
+    def stats(self):
+        """Queue depth and running jobs per backend, global counters, run time saved by coalescing
+        and the run time estimates"""
+        with self._cond:
+            backends = {
+                backend: {
+                    "queued": len(self._queues[backend]),
+                    "running": self._running[backend],
+                    "limit": self.limits[backend],
+                }
+                for backend in self.limits
+            }
+            return {
+                "backends": backends,
+                "counters": dict(self.counters),
+                "saved_seconds": self.saved_seconds,
+                "estimates": self.cost_model.stats(),
+            }
+    
+    def _collect_batch(self, job):
+        """Gather queued jobs compatible with job; called with the lock held"""
+        queue = self._queues[job.backend]
+        deadline = time.time() + self.batch_window
+        while True:
+            compatible = [j for j in queue if j.batch_key == job.batch_key]
+            remaining = deadline - time.time()
+            if len(compatible) + 1 >= self.max_batch_size or remaining <= 0:
+                break
+            self._cond.wait(remaining)
+        
+        batch = [job] + compatible[:self.max_batch_size - 1]
+        for other in batch[1:]:
+            queue.remove(other)
+        return batch
+    
+    def _worker(self, backend):
+        queue = self._queues[backend]
+        while True:
+            with self._cond:
+                while not queue:
+                    self._cond.wait()
+                now = time.time()
+                job = min(queue, key=lambda j: self._score(j, now))
+                queue.remove(job)
+                # Taken: waiting for batch members below releases the lock, and
+                # cancel() must not look for the job in the queue meanwhile
+                job.status = "running"
+                batch = [job]
+                if job.batch_key is not None and self.max_batch_size > 1:
+                    batch = self._collect_batch(job)
+                for member in batch:
+                    member.status = "running"
+                    member.started_at = time.time()
+                    member.batch_size = len(batch)
+                    metrics.observe("world3d_queue_wait_seconds", member.queue_seconds(), backend=backend)
+                    self._charge(member.user, member.estimate, member.started_at)
+                self._active[backend].extend(batch)
+                self._running[backend] += 1
+                if len(batch) > 1:
+                    self.counters["batches"] += 1
+                    self.counters["batched_jobs"] += len(batch)
+            
+            try:
+                if len(batch) > 1:
+                    results = job.batch_fn([member.args for member in batch])
+                else:
+                    result = job.fn(*job.args, **job.kwargs)
+                    if inspect.isgenerator(result):
+                        for update in result:
+                            job._publish(update)
+                        result = job.latest
+                    results = [result]
+            except Exception as e:
+                status, results, error = "failed", [None] * len(batch), e
+            else:
+                status, error = "done", None
+            
+            with self._cond:
+                self._running[backend] -= 1
+                self.counters["completed" if status == "done" else "failed"] += len(batch)
+                now = time.time()
+                # A batch's run time is shared by its members
+                seconds = (now - job.started_at) / len(batch)
+                for member in batch:
+                    self._active[backend].remove(member)
+                    self._charge(member.user, seconds - member.estimate, now)
+                    if status == "done":
+                        self.cost_model.record(backend, member.cost_key, seconds)
+                    if member.deadline_at is not None and now > member.deadline_at:
+                        self.counters["late"] += 1
+                    self._forget(member)
+                    if member.attached:
+                        # Each attached caller would have run the job again
+                        saved = member.attached * seconds
+                        self.saved_seconds += saved
+                        metrics.inc("world3d_coalesced_seconds_total", saved, backend=backend)
+            for member, result in zip(batch, results):
+                member._finish(status, result=result, error=error)
\ No newline at end of file
@@ -0,0 +1,275 @@
+"""
+Memory-mapped access to generated PLY / GLB artifacts
+Maps the binary buffers of the files these apps write (3DGS and compressed
+splat PLYs, mesh PLYs, GLBs) and exposes them as numpy views, so re-processing
+or inspecting a multi-GB scene does not copy it into the Python heap: pages
+are read from the page cache on demand and shared between processes.
+
+Also serves artifact files to HTTP clients with Range support, streamed from a
+memory map one chunk at a time.
+    
+    python mapped_io.py stats outputs/artifacts/worldgen_x/scene_splat.ply
+"""
+
+import argparse
+import json
+import mimetypes
+import mmap
+import struct
+from pathlib import Path
+
+import numpy as np
+
+PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "<i2", "int16": "<i2", "ushort": "<u2", "uint16": "<u2",
+    "int": "<i4", "int32": "<i4", "uint": "<u4", "uint32": "<u4",
+    "float": "<f4", "float32": "<f4", "double": "<f8", "float64": "<f8",
+}
+
+# glTF componentType -> dtype, accessor type -> components
+GLTF_COMPONENTS = {5120: "i1", 5121: "u1", 5122: "<i2", 5123: "<u2", 5125: "<u4", 5126: "<f4"}
+GLTF_TYPES = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+
+def read_ply_header(f):
+    """Parse a binary little endian PLY header
+    
+    Returns [(element, count, properties)] where a property is (name, dtype)
+    or, for list properties, (name, count dtype, item dtype).
+    """
+    if f.readline().strip() != b"ply":
+        raise ValueError("not a PLY file")
+    elements = []
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError("truncated PLY header")
+        parts = line.decode("ascii").split()
+        if not parts or parts[0] in ("comment", "obj_info"):
+            continue
+        if parts[0] == "format" and parts[1] != "binary_little_endian":
+            raise ValueError(f"unsupported PLY format: {parts[1]}")
+        if parts[0] == "element":
+            elements.append((parts[1], int(parts[2]), []))
+        elif parts[0] == "property" and parts[1] == "list":
+            elements[-1][2].append((parts[4], PLY_TYPES[parts[2]], PLY_TYPES[parts[3]]))
+        elif parts[0] == "property":
+            elements[-1][2].append((parts[2], PLY_TYPES[parts[1]]))
+        elif parts[0] == "end_header":
+            return elements
+
+def map_ply(path):
+    """{element: read-only structured array view} over a binary PLY file
+    
+    List properties (mesh faces) must have the same length in every row, as
+    in the triangle meshes written by Open3D and trimesh; the count column is
+    mapped as "<name>_count" next to an (N, length) "<name>" field.
+    """
+    with open(path, "rb") as f:
+        elements = read_ply_header(f)
+        offset = f.tell()
+        size = f.seek(0, 2)
+    
+    result = {}
+    for name, count, properties in elements:
+        fields = []
+        for prop in properties:
+            if len(prop) == 2:
+                fields.append(prop)
+                continue
+            prop_name, count_dtype, item_dtype = prop
+            # Row length from the first row; every row is checked below
+            prefix = np.dtype(fields).itemsize if fields else 0
+            first = np.memmap(path, dtype=count_dtype, mode="r", offset=offset + prefix, shape=(1,))
+            fields += [(f"{prop_name}_count", count_dtype), (prop_name, item_dtype, (int(first[0]),))]
+        dtype = np.dtype(fields)
+        if offset + count * dtype.itemsize > size:
+            raise ValueError(f"{path}: element {name} is truncated or has lists of varying length")
+        array = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,)) if count else np.empty(0, dtype)
+        for prop in properties:
+            if len(prop) == 3 and count and not (array[f"{prop[0]}_count"] == array[prop[0]].shape[1]).all():
+                raise ValueError(f"{path}: list property {prop[0]} has rows of varying length")
+        result[name] = array
+        offset += count * dtype.itemsize
+    return result
+
+def _glb_chunks(path):
+    """(gltf json, byte offset of the BIN chunk or None)"""
+    with open(path, "rb") as f:
+        magic, _, _ = struct.unpack("<4sII", f.read(12))
+        if magic != b"glTF":
+            raise ValueError("not a GLB file")
+        length, kind = struct.unpack("<I4s", f.read(8))
+        gltf = json.loads(f.read(length))
+        header = f.read(8)
+        if len(header) < 8:
+            return gltf, None
+        _, kind = struct.unpack("<I4s", header)
+        return gltf, f.tell() if kind == b"BIN\x00" else None
+
+def map_glb(path):
+    """(gltf json, [accessor view or None]) for a GLB file
+    
+    Every accessor of the embedded buffer becomes a read-only (count,
+    components) view, honouring byteStride; sparse accessors and external
+    buffers are not mapped (None).
+    """
+    gltf, bin_offset = _glb_chunks(path)
+    if bin_offset is None:
+        return gltf, [None] * len(gltf.get("accessors", []))
+    mapped = np.memmap(path, dtype="u1", mode="r")
+    views = []
+    for accessor in gltf.get("accessors", []):
+        if "bufferView" not in accessor or "sparse" in accessor:
+            views.append(None)
+            continue
+        buffer_view = gltf["bufferViews"][accessor["bufferView"]]
+        if buffer_view.get("buffer", 0) != 0:
+            views.append(None)
+            continue
+        dtype = np.dtype(GLTF_COMPONENTS[accessor["componentType"]])
+        components = GLTF_TYPES[accessor["type"]]
+        stride = buffer_view.get("byteStride") or dtype.itemsize * components
+        start = bin_offset + buffer_view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+        views.append(np.ndarray(
+            shape=(accessor["count"], components),
+            dtype=dtype,
+            buffer=mapped,
+            offset=start,
+            strides=(stride, dtype.itemsize)
+        ))
+    return gltf, views
+
+def glb_primitives(path):
+    """Views of every mesh primitive in a GLB: [{attribute: view, "indices": (N, 3) view}]"""
+    gltf, views = map_glb(path)
+    primitives = []
+    for mesh in gltf.get("meshes", []):
+        for primitive in mesh.get("primitives", []):
+            entry = {name: views[index] for name, index in primitive.get("attributes", {}).items()}
+            if "indices" in primitive and views[primitive["indices"]] is not None and primitive.get("mode", 4) == 4:
+                entry["indices"] = views[primitive["indices"]].reshape(-1, 3)
+            primitives.append(entry)
+    return primitives
+
+def stats(path):
+    """Element / primitive counts and position bounds, computed on the mapped views"""
+    path = Path(path)
+    info = {"path": str(path), "bytes": path.stat().st_size}
+    bounds = []  # (low, high) per position buffer
+    if path.suffix.lower() == ".glb":
+        gltf, _ = map_glb(path)
+        primitives = glb_primitives(path)
+        positions = [p["POSITION"] for p in primitives if p.get("POSITION") is not None]
+        info["primitives"] = len(primitives)
+        info["vertices"] = sum(len(p) for p in positions)
+        info["faces"] = sum(len(p["indices"]) for p in primitives if "indices" in p)
+        info["quantized"] = "KHR_mesh_quantization" in gltf.get("extensionsUsed", [])
+        # Raw values: quantized positions are still on their integer grid
+        bounds = [(p.min(axis=0), p.max(axis=0)) for p in positions if len(p)]
+    else:
+        elements = map_ply(path)
+        info["elements"] = {name: len(array) for name, array in elements.items()}
+        vertex = elements.get("vertex")
+        if vertex is not None and len(vertex) and "x" in (vertex.dtype.names or ()):
+            columns = [vertex[axis] for axis in "xyz"]  # strided views, no copy
+            bounds = [([c.min() for c in columns], [c.max() for c in columns])]
+    if bounds:
+        info["bounds"] = [
+            np.min([low for low, _ in bounds], axis=0).tolist(),
+            np.max([high for _, high in bounds], axis=0).tolist(),
+        ]
+    return info
+
+def parse_range(header, size):
+    """(start, end) of the first range in an HTTP Range header, inclusive
+    
+    Returns None without a (bytes) range; raises ValueError when the range
+    cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    first = header[len("bytes="):].split(",")[0].strip()
+    start, _, end = first.partition("-")
+    if not start:
+        if not end or int(end) == 0:
+            raise ValueError(f"unsatisfiable range {header!r}")
+        return max(size - int(end), 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or end < start:
+        raise ValueError(f"unsatisfiable range {header!r}")
+    return start, end
+
+def iter_file_range(path, start, end, chunk_size=1 << 20):
+    """Yield bytes start..end (inclusive) of a file, one memory-mapped chunk at a time"""
+    if end < start:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        position = start
+        while position <= end:
+            stop = min(position + chunk_size, end + 1)
+            yield mapped[position:stop]
+            position = stop
+
+def add_range_route(app, roots, hold=None, prefix="/files"):
+    """Serve files under roots ({name: directory}) at {prefix}/{name}/{path}
+    
+    Supports HEAD and single byte ranges (206 Partial Content), so viewers can
+    fetch the parts of a large artifact they need. hold(path) is entered while
+    a file is streamed, e.g. ArtifactStore.hold to keep it from being evicted.
+    The route is inserted ahead of the app's own routes.
+    """
+    from starlette.responses import Response, StreamingResponse
+    from starlette.routing import Route
+    
+    roots = {name: Path(root).resolve() for name, root in roots.items()}
+    
+    def resolve(name, relative):
+        root = roots.get(name)
+        if root is None:
+            return None
+        path = (root / relative).resolve()
+        if root not in path.parents or not path.is_file():
+            return None
+        return path
+    
+    def stream(path, start, end):
+        if hold is None:
+            yield from iter_file_range(path, start, end)
+            return
+        with hold(path):
+            yield from iter_file_range(path, start, end)
+    
+    async def serve(request):
+        path = resolve(request.path_params["root"], request.path_params["path"])
+        if path is None:
+            return Response(status_code=404)
+        size = path.stat().st_size
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except ValueError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        
+        start, end = byte_range or (0, size - 1)
+        headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start + 1)}
+        if byte_range is not None:
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        status = 206 if byte_range is not None else 200
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if request.method == "HEAD":
+            return Response(status_code=status, headers=headers, media_type=media_type)
+        return StreamingResponse(stream(path, start, end), status_code=status, headers=headers, media_type=media_type)
+    
+    app.router.routes.insert(0, Route(f"{prefix}/{{root}}/{{path:path}}", serve, methods=["GET", "HEAD"]))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["stats"])
+    parser.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+    for path in args.paths:
+        print(json.dumps(stats(path)))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
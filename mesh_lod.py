@@ -0,0 +1,228 @@
+"""
+Compact mesh variants for progressive display
+Turns a generated mesh (SceneGen GLB or WorldGen PLY) into a chain of
+decimated levels of detail plus a full resolution copy, all written as GLBs
+with quantized attributes (KHR_mesh_quantization): 16-bit positions, 8-bit
+vertex colours and the smallest index type that fits. The UI shows the
+coarsest level first and swaps in finer ones until the original mesh is loaded.
+
+Decimation is vertex clustering on a regular grid, which is fast enough to run
+right after generation. Textures are baked into vertex colours, so the coarse
+levels are previews; the original file stays the final, full quality level.
+"""
+
+import json
+import struct
+import time
+from pathlib import Path
+
+import numpy as np
+
+# glTF constants
+FLOAT = 5126
+UNSIGNED_BYTE = 5121
+UNSIGNED_SHORT = 5123
+UNSIGNED_INT = 5125
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+def load_mesh(path):
+    """Read a mesh file as (positions, faces, colors) numpy arrays
+    
+    colors is an (N, 4) uint8 array, or None when the mesh has none.
+    """
+    import trimesh
+    
+    mesh = trimesh.load(str(path), force="mesh", process=False)
+    positions = np.asarray(mesh.vertices, dtype=np.float32)
+    faces = np.asarray(mesh.faces, dtype=np.int64)
+    
+    colors = None
+    visual = mesh.visual
+    if visual is not None and visual.kind is not None:
+        if visual.kind == "texture":
+            visual = visual.to_color()  # samples the texture at each vertex uv
+        vertex_colors = np.asarray(visual.vertex_colors, dtype=np.uint8)
+        if len(vertex_colors) == len(positions):
+            colors = vertex_colors[:, :4]
+    return positions, faces, colors
+
+def decimate(positions, faces, colors=None, resolution=128):
+    """Vertex clustering: merge all vertices in each grid cell into one
+    
+    resolution is the number of cells along the longest side of the bounding
+    box. Returns (positions, faces, colors) with degenerate and duplicate
+    faces removed.
+    """
+    low = positions.min(axis=0)
+    extent = float((positions.max(axis=0) - low).max()) or 1.0
+    cells = np.floor((positions - low) * (resolution / extent)).astype(np.int64)
+    cells = np.minimum(cells, resolution)
+    flat = (cells[:, 0] * (resolution + 1) + cells[:, 1]) * (resolution + 1) + cells[:, 2]
+    _, cluster, counts = np.unique(flat, return_inverse=True, return_counts=True)
+    cluster = cluster.reshape(-1)
+    
+    # Cluster centroid (and mean colour) via weighted bincounts
+    merged = np.stack([
+        np.bincount(cluster, weights=positions[:, axis], minlength=len(counts)) for axis in range(3)
+    ], axis=1) / counts[:, None]
+    merged_colors = None
+    if colors is not None:
+        merged_colors = np.stack([
+            np.bincount(cluster, weights=colors[:, channel], minlength=len(counts)) for channel in range(colors.shape[1])
+        ], axis=1) / counts[:, None]
+    
+    tris = cluster[faces]
+    keep = (tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 0] != tris[:, 2])
+    tris = tris[keep]
+    _, first = np.unique(np.sort(tris, axis=1), axis=0, return_index=True)
+    tris = tris[np.sort(first)]
+    
+    # Drop clusters no longer referenced by any face
+    used = np.unique(tris)
+    remap = np.full(len(counts), -1, dtype=np.int64)
+    remap[used] = np.arange(len(used))
+    tris = remap[tris]
+    merged = merged[used].astype(np.float32)
+    if merged_colors is not None:
+        merged_colors = np.clip(np.round(merged_colors[used]), 0, 255).astype(np.uint8)
+    return merged, tris, merged_colors
+
+def write_glb(path, positions, faces, colors=None, quantize=True):
+    """Write a single vertex-coloured mesh as GLB
+    
+    With quantize=True positions are stored as 16-bit integers over the
+    bounding box and dequantized by the node transform (KHR_mesh_quantization).
+    """
+    chunks = []
+    buffer_views = []
+    accessors = []
+    offset = 0
+    
+    def add_view(data, target, stride=None):
+        nonlocal offset
+        raw = data.tobytes()
+        view = {"buffer": 0, "byteOffset": offset, "byteLength": len(raw), "target": target}
+        if stride:
+            view["byteStride"] = stride
+        chunks.append(raw + b"\x00" * (-len(raw) % 4))
+        offset += len(chunks[-1])
+        buffer_views.append(view)
+        return len(buffer_views) - 1
+    
+    def add_accessor(view, component, count, kind, normalized=False, low=None, high=None):
+        accessor = {"bufferView": view, "componentType": component, "count": int(count), "type": kind}
+        if normalized:
+            accessor["normalized"] = True
+        if low is not None:
+            accessor["min"], accessor["max"] = low, high
+        accessors.append(accessor)
+        return len(accessors) - 1
+    
+    node = {"mesh": 0}
+    low = positions.min(axis=0)
+    high = positions.max(axis=0)
+    if quantize:
+        scale = np.maximum(high - low, 1e-12) / 65535.0
+        quantized = np.zeros((len(positions), 4), dtype=np.uint16)  # padded to 8 bytes per vertex
+        quantized[:, :3] = np.clip(np.round((positions - low) / scale), 0, 65535)
+        view = add_view(quantized, ARRAY_BUFFER, stride=8)
+        q_low = quantized[:, :3].min(axis=0).tolist()
+        q_high = quantized[:, :3].max(axis=0).tolist()
+        attributes = {"POSITION": add_accessor(view, UNSIGNED_SHORT, len(positions), "VEC3", low=q_low, high=q_high)}
+        node.update(translation=low.tolist(), scale=scale.tolist())
+    else:
+        view = add_view(positions.astype(np.float32), ARRAY_BUFFER)
+        attributes = {"POSITION": add_accessor(view, FLOAT, len(positions), "VEC3",
+                                               low=low.tolist(), high=high.tolist())}
+    
+    if colors is not None:
+        rgba = np.full((len(positions), 4), 255, dtype=np.uint8)
+        rgba[:, :colors.shape[1]] = colors
+        view = add_view(rgba, ARRAY_BUFFER)
+        attributes["COLOR_0"] = add_accessor(view, UNSIGNED_BYTE, len(positions), "VEC4", normalized=True)
+    
+    index_type = (np.uint16, UNSIGNED_SHORT) if len(positions) < 65536 else (np.uint32, UNSIGNED_INT)
+    view = add_view(faces.astype(index_type[0]).reshape(-1), ELEMENT_ARRAY_BUFFER)
+    indices = add_accessor(view, index_type[1], faces.size, "SCALAR")
+    
+    gltf = {
+        "asset": {"version": "2.0", "generator": "world3d mesh_lod"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [node],
+        "materials": [{"pbrMetallicRoughness": {"metallicFactor": 0.0, "roughnessFactor": 1.0}, "doubleSided": True}],
+        "meshes": [{"primitives": [{"attributes": attributes, "indices": indices, "material": 0}]}],
+        "buffers": [{"byteLength": offset}],
+        "bufferViews": buffer_views,
+        "accessors": accessors,
+    }
+    if quantize:
+        gltf["extensionsUsed"] = gltf["extensionsRequired"] = ["KHR_mesh_quantization"]
+    
+    text = json.dumps(gltf, separators=(",", ":")).encode()
+    text += b" " * (-len(text) % 4)
+    binary = b"".join(chunks)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<4sII", b"glTF", 2, 12 + 8 + len(text) + 8 + len(binary)))
+        f.write(struct.pack("<I4s", len(text), b"JSON") + text)
+        f.write(struct.pack("<I4s", len(binary), b"BIN\x00") + binary)
+
+def build_lods(mesh_path, output_dir=None, resolutions=(64, 256)):
+    """Write decimated LODs and a full resolution quantized copy of mesh_path
+    
+    Returns one dict per level, coarsest first and ending with the original
+    file: name, path, vertices, faces, bytes and encode_seconds. Levels that
+    do not at least halve the face count of the next finer level are skipped.
+    """
+    mesh_path = Path(mesh_path)
+    output_dir = Path(output_dir or mesh_path.parent)
+    stem = mesh_path.stem
+    
+    start = time.perf_counter()
+    positions, faces, colors = load_mesh(mesh_path)
+    load_seconds = time.perf_counter() - start
+    
+    finer = [{
+        "name": "original",
+        "path": mesh_path,
+        "vertices": len(positions),
+        "faces": len(faces),
+        "bytes": mesh_path.stat().st_size,
+        "encode_seconds": load_seconds,
+    }]
+    if not len(faces):
+        return finer
+    
+    start = time.perf_counter()
+    full = output_dir / f"{stem}_quantized.glb"
+    write_glb(full, positions, faces, colors)
+    finer.insert(0, {
+        "name": "quantized",
+        "path": full,
+        "vertices": len(positions),
+        "faces": len(faces),
+        "bytes": full.stat().st_size,
+        "encode_seconds": time.perf_counter() - start,
+    })
+    
+    for resolution in sorted(resolutions, reverse=True):
+        start = time.perf_counter()
+        lod_positions, lod_faces, lod_colors = decimate(positions, faces, colors, resolution)
+        if not len(lod_faces) or len(lod_faces) * 2 > finer[0]["faces"]:
+            continue
+        path = output_dir / f"{stem}_lod{resolution}.glb"
+        write_glb(path, lod_positions, lod_faces, lod_colors)
+        finer.insert(0, {
+            "name": f"lod{resolution}",
+            "path": path,
+            "vertices": len(lod_positions),
+            "faces": len(lod_faces),
+            "bytes": path.stat().st_size,
+            "encode_seconds": time.perf_counter() - start,
+        })
+    return finer
+
+def parse_resolutions(value):
+    """Parse a WORLD3D_MESH_LODS value ("64,256"); empty disables LODs"""
+    return tuple(int(part) for part in value.replace(" ", "").split(",") if part)
\ No newline at end of file
@@ -0,0 +1,302 @@
+"""
+Request metrics in the Prometheus text format
+Off unless WORLD3D_METRICS=1: then every recording call returns at once and
+stage() hands out a shared no-op context, so the instrumented handlers cost
+nothing measurable. When on, the apps serve GET /metrics for Prometheus to
+scrape.
+
+Recorded per mode (e.g. hunyuan_text2world) and stage (panogen, scenegen,
+postprocess, ...): stage latency histograms, queue wait, model load time,
+peak device/host memory per request, artifact sizes, and request outcomes
+including errors. Samples are kept per process; the worker pool's samples are
+collected on each scrape (see merge()).
+"""
+
+import functools
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+ENABLED = os.environ.get("WORLD3D_METRICS", "0") == "1"
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+BYTES_BUCKETS = tuple(2 ** i for i in range(20, 38, 2))  # 1 MB .. 64 GB
+
+# name -> (type, help, buckets)
+METRICS = {
+    "world3d_stage_seconds": ("histogram", "Time spent in one stage of a generation", LATENCY_BUCKETS),
+    "world3d_request_seconds": ("histogram", "Time a generation ran, from its first stage to its result", LATENCY_BUCKETS),
+    "world3d_queue_wait_seconds": ("histogram", "Time a job waited in the scheduler queue", LATENCY_BUCKETS),
+    "world3d_model_load_seconds": ("histogram", "Time to load (or restore) a model", LATENCY_BUCKETS),
+    "world3d_request_peak_device_bytes": ("histogram", "Peak device memory allocated during a generation", BYTES_BUCKETS),
+    "world3d_request_peak_host_bytes": ("histogram", "Peak resident host memory during a generation", BYTES_BUCKETS),
+    "world3d_artifact_bytes": ("histogram", "Size of a generated file", BYTES_BUCKETS),
+    "world3d_requests_total": ("counter", "Generations by mode and outcome (ok, cached, error)", None),
+    "world3d_errors_total": ("counter", "Failed generations by mode", None),
+    "world3d_slow_requests_total": ("counter", "Generations slower than WORLD3D_PROFILE_SLOW_S", None),
+    "world3d_coalesced_requests_total": ("counter", "Requests attached to an identical job already in flight", None),
+    "world3d_coalesced_seconds_total": ("counter", "Run time the coalesced requests would have cost on their own", None),
+    "world3d_deadline_rejections_total": ("counter", "Jobs rejected because they would finish after their deadline", None),
+    "world3d_queue_depth": ("gauge", "Jobs waiting per backend", None),
+    "world3d_jobs_running": ("gauge", "Jobs running per backend", None),
+    "world3d_cache_bytes": ("gauge", "Size of the result cache", None),
+    "world3d_artifact_store_bytes": ("gauge", "Size of the artifact store", None),
+    "world3d_artifact_store_max_bytes": ("gauge", "Size limit of the artifact store (WORLD3D_ARTIFACT_MAX_GB)", None),
+    "world3d_artifact_store_dirs": ("gauge", "Output directories in the artifact store", None),
+    "world3d_artifact_store_disk_free_bytes": ("gauge", "Free space on the artifact store's disk", None),
+    "world3d_artifact_dirs_removed_total": ("counter", "Output directories removed, by reason (expired: TTL, evicted: size)", None),
+    "world3d_device_memory_allocated_bytes": ("gauge", "Device memory allocated right now", None),
+}
+
+_lock = threading.Lock()
+_samples = {}  # (name, labels as sorted tuple) -> [value] or [bucket counts..., sum, count]
+_collectors = []
+_NULL = nullcontext()
+_host_peaks = {}  # running request -> highest resident host memory seen since it started
+_host_watcher = None
+_in_flight = 0  # running requests; the device peak is only reset when there are none
+HOST_SAMPLE_INTERVAL = 0.1
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def inc(name, amount=1, **labels):
+    """Add to a counter"""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        sample = _samples.setdefault(key, [0])
+        sample[0] += amount
+
+def set_gauge(name, value, **labels):
+    if not ENABLED:
+        return
+    with _lock:
+        _samples[_key(name, labels)] = [value]
+
+def observe(name, value, **labels):
+    """Record one value in a histogram"""
+    if not ENABLED:
+        return
+    buckets = METRICS[name][2]
+    key = _key(name, labels)
+    with _lock:
+        sample = _samples.get(key)
+        if sample is None:
+            sample = _samples[key] = [0] * (len(buckets) + 2)
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                sample[i] += 1
+        sample[-2] += value
+        sample[-1] += 1
+
+@contextmanager
+def _timed(name, labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def stage(mode, name):
+    """Context manager timing one stage of a generation"""
+    if not ENABLED:
+        return _NULL
+    return _timed("world3d_stage_seconds", {"mode": mode, "stage": name})
+
+def timed(name, **labels):
+    """Context manager recording the duration of its block in histogram name"""
+    if not ENABLED:
+        return _NULL
+    return _timed(name, labels)
+
+def artifacts(mode, paths):
+    """Record the sizes of the files a generation produced"""
+    if not ENABLED:
+        return
+    for path in paths:
+        try:
+            size = os.path.getsize(path)
+        except (OSError, TypeError):
+            continue
+        observe("world3d_artifact_bytes", size, mode=mode, kind=os.path.splitext(str(path))[1].lstrip(".") or "file")
+
+def _device_peak(reset=False):
+    try:
+        import torch
+    except ImportError:
+        return None
+    if not torch.cuda.is_available():
+        return None
+    if reset:
+        torch.cuda.reset_peak_memory_stats()
+        return None
+    return torch.cuda.max_memory_allocated()
+
+def _watch_host():
+    """Raise the host memory peak of every running request, every HOST_SAMPLE_INTERVAL seconds"""
+    from model_registry import host_memory_resident
+    
+    while True:
+        time.sleep(HOST_SAMPLE_INTERVAL)
+        if not _host_peaks:
+            continue
+        resident = host_memory_resident()
+        with _lock:
+            for token, peak in _host_peaks.items():
+                _host_peaks[token] = max(peak, resident)
+
+@contextmanager
+def _request(mode):
+    global _host_watcher, _in_flight
+    from model_registry import host_memory_resident
+    
+    token = object()
+    with _lock:
+        _host_peaks[token] = host_memory_resident()
+        if _host_watcher is None:
+            _host_watcher = threading.Thread(target=_watch_host, name="metrics-host-memory", daemon=True)
+            _host_watcher.start()
+        # Resetting while another request runs would lose that request's peak
+        if not _in_flight:
+            _device_peak(reset=True)
+        _in_flight += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("world3d_request_seconds", time.perf_counter() - start, mode=mode)
+        with _lock:
+            _in_flight -= 1
+        peak = _device_peak()
+        if peak is not None:
+            # Peak of the whole device since it was last idle, so overlapping requests share it
+            observe("world3d_request_peak_device_bytes", peak, mode=mode)
+        resident = host_memory_resident()
+        with _lock:
+            host_peak = max(_host_peaks.pop(token), resident)
+        # Sampled, and of the whole process, like the device peak
+        observe("world3d_request_peak_host_bytes", host_peak, mode=mode)
+
+def request(mode):
+    """Context manager around one generation: its duration and peak memory"""
+    if not ENABLED:
+        return _NULL
+    return _request(mode)
+
+def outcome(mode, result):
+    """Count a finished generation from its result tuple (message last, the main file before it)"""
+    if not ENABLED:
+        return
+    *files, message = result
+    message = str(message or "")
+    if not files or not files[-1] or "Error" in message.split("\n", 1)[0]:
+        inc("world3d_requests_total", mode=mode, outcome="error")
+        inc("world3d_errors_total", mode=mode)
+    else:
+        inc("world3d_requests_total", mode=mode, outcome="cached" if "(cached)" in message else "ok")
+        artifacts(mode, [f for f in files if isinstance(f, str)])
+
+def instrumented(mode):
+    """Decorator recording request() and outcome() of a generate function (plain or streaming)"""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def streaming(*args, **kwargs):
+                result = None
+                with _request(mode):
+                    for result in fn(*args, **kwargs):
+                        yield result
+                if result is not None:
+                    outcome(mode, result)
+            return streaming
+        
+        @functools.wraps(fn)
+        def plain(*args, **kwargs):
+            with _request(mode):
+                result = fn(*args, **kwargs)
+            outcome(mode, result)
+            return result
+        return plain
+    return decorate
+
+def on_scrape(fn):
+    """Call fn() before every scrape, e.g. to set gauges from live state"""
+    _collectors.append(fn)
+    return fn
+
+def collect():
+    """Run the on_scrape() functions"""
+    for fn in _collectors:
+        try:
+            fn()
+        except Exception as e:
+            print(f"Metrics collector failed: {e}")
+
+def snapshot():
+    """Samples of this process as a picklable list of (name, labels, values)"""
+    with _lock:
+        return [(name, dict(labels), list(values)) for (name, labels), values in _samples.items()]
+
+def merge(samples, **labels):
+    """Samples of another process (snapshot()) with labels added, e.g. worker="1" """
+    return [(name, {**sample_labels, **labels}, values) for name, sample_labels, values in samples]
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels, extra=()):
+    items = sorted(labels.items()) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+def render(extra_samples=()):
+    """Text exposition of this process's samples plus extra_samples"""
+    collect()
+    by_name = {}
+    for name, labels, values in snapshot() + list(extra_samples):
+        by_name.setdefault(name, []).append((labels, values))
+    
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        if name not in by_name:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, values in by_name[name]:
+            if kind != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {values[0]}")
+                continue
+            for bound, count in zip(buckets, values):
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {values[-1]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {values[-2]}")
+            lines.append(f"{name}_count{_format_labels(labels)} {values[-1]}")
+    return "\n".join(lines) + "\n"
+
+def add_metrics_route(app, extra_samples=None, path="/metrics"):
+    """Serve render() at path on a Starlette/FastAPI app; does nothing when metrics are off
+    
+    extra_samples() may return the samples of other processes (see merge()).
+    """
+    if not ENABLED:
+        return
+    import asyncio
+    
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+    
+    def text():
+        return render(extra_samples() if extra_samples else ())
+    
+    async def metrics(request):
+        # Collecting may ask the worker processes, so keep it off the event loop
+        return PlainTextResponse(await asyncio.to_thread(text), media_type="text/plain; version=0.0.4")
+    
+    app.router.routes[:0] = [Route(path, metrics, methods=["GET"])]
\ No newline at end of file
@@ -0,0 +1,374 @@
+"""
+Model registry shared by the Gradio apps
+Loads each model once, keeps it warm and shares it across requests.
+
+Models are kept resident on the device while they fit in the device memory
+budget. When a model needs room, the least recently used idle model is
+offloaded to host memory, and it is moved back on its next use. Models that
+no longer fit in the host budget are dropped and reloaded on demand.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import metrics
+
+GB = 1024 ** 3
+
+def device_memory_allocated():
+    """Bytes currently allocated on the CUDA device (0 without CUDA)"""
+    try:
+        import torch
+    except ImportError:
+        return 0
+    
+    if not torch.cuda.is_available():
+        return 0
+    
+    torch.cuda.synchronize()
+    return torch.cuda.memory_allocated()
+
+def device_memory_total():
+    """Total memory of the CUDA device in bytes (None without CUDA)"""
+    try:
+        import torch
+    except ImportError:
+        return None
+    
+    if not torch.cuda.is_available():
+        return None
+    
+    return torch.cuda.get_device_properties(torch.cuda.current_device()).total_memory
+
+def host_memory_resident():
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def format_bytes(num_bytes):
+    """Human readable byte count"""
+    size = float(num_bytes)
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+def budget_from_env(name, default=None):
+    """Read a memory budget in GB from the environment, returned in bytes"""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    return int(float(value) * GB)
+
+def move_model(model, device):
+    """Move a model (or the torch modules/pipelines it holds) to device"""
+    if hasattr(model, "to"):
+        moved = model.to(device)
+        return moved if moved is not None else model
+    
+    # Wrappers such as PanoGen/SceneGen keep their pipelines as attributes
+    for name, value in list(vars(model).items()):
+        if hasattr(value, "to") and callable(value.to) and not isinstance(value, (str, bytes)):
+            try:
+                moved = value.to(device)
+            except (TypeError, ValueError):
+                continue
+            if moved is not None:
+                setattr(model, name, moved)
+    return model
+
+def _is_out_of_memory(error):
+    return "out of memory" in str(error).lower()
+
+def _empty_device_cache():
+    """Return cached CUDA blocks to the driver after a model is moved or dropped"""
+    try:
+        import torch
+    except ImportError:
+        return
+    
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+class ModelRegistry:
+    """Named models that are loaded once and shared between requests"""
+    
+    def __init__(self, device="cuda", device_budget_bytes=None, host_budget_bytes=None):
+        self.device = device
+        self.device_budget_bytes = device_budget_bytes
+        self.host_budget_bytes = host_budget_bytes
+        
+        self._loaders = {}
+        self._models = {}
+        self._stats = {}
+        self._initialized = set()
+        self._pins = {}
+        self._sizes = {}
+        
+        # Resident model names, least recently used first
+        self._device_lru = OrderedDict()
+        self._host_lru = OrderedDict()
+        
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "restores": 0,
+            "evictions": 0,
+            "drops": 0,
+        }
+        
+        # _lock guards the bookkeeping; _transition_lock serializes slow
+        # loads/offloads so a hit never waits behind another model's load
+        self._lock = threading.Lock()
+        self._transition_lock = threading.RLock()
+    
+    def register(self, name, loader):
+        """Register a zero-argument loader that builds the model called name"""
+        with self._lock:
+            self._loaders[name] = loader
+            self._pins.setdefault(name, 0)
+    
+    def load(self, name):
+        """Return the model called name, loading it on first use"""
+        with self.use(name) as model:
+            return model
+    
+    @contextmanager
+    def use(self, name):
+        """Context manager that makes name resident on the device for the block
+        
+        The model is pinned while the block runs so it is never offloaded
+        from under a running generation.
+        """
+        model = self._acquire(name)
+        try:
+            yield model
+        finally:
+            with self._lock:
+                self._pins[name] -= 1
+    
+    def _acquire(self, name):
+        with self._lock:
+            if name in self._device_lru:
+                self.counters["hits"] += 1
+                self._device_lru.move_to_end(name)
+                self._pins[name] += 1
+                return self._models[name]
+        
+        with self._transition_lock:
+            with self._lock:
+                # Another request may have brought it in while we waited
+                if name in self._device_lru:
+                    self.counters["hits"] += 1
+                    self._device_lru.move_to_end(name)
+                    self._pins[name] += 1
+                    return self._models[name]
+                self.counters["misses"] += 1
+            
+            if name in self._host_lru:
+                model = self._restore(name)
+            else:
+                model = self._load(name)
+            
+            with self._lock:
+                self._device_lru[name] = True
+                self._device_lru.move_to_end(name)
+                self._pins[name] += 1
+            return model
+    
+    def _restore(self, name):
+        """Move an offloaded model from host memory back to the device"""
+        self._make_room(self._size(name), exclude=name)
+        
+        start = time.perf_counter()
+        model = move_model(self._models[name], self.device)
+        
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self._models[name] = model
+            self._host_lru.pop(name, None)
+            self.counters["restores"] += 1
+            self._stats[name]["restore_seconds"] = seconds
+            self._stats[name]["location"] = "device"
+        metrics.observe("world3d_model_load_seconds", seconds, model=name, kind="restore")
+        return model
+    
+    def _load(self, name):
+        """Build the model from its loader, making room for it first"""
+        self._make_room(self._size(name), exclude=name)
+        
+        device_before = device_memory_allocated()
+        host_before = host_memory_resident()
+        start = time.perf_counter()
+        
+        try:
+            model = self._loaders[name]()
+        except Exception as e:
+            if not _is_out_of_memory(e):
+                raise
+            # The size of a never-loaded model is unknown; offload everything idle and retry
+            self._make_room(None, exclude=name)
+            device_before = device_memory_allocated()
+            start = time.perf_counter()
+            model = self._loaders[name]()
+        
+        device_bytes = max(device_memory_allocated() - device_before, 0)
+        if not device_bytes:
+            # Fake models and CPU runs report their own footprint
+            device_bytes = getattr(model, "memory_bytes", 0)
+        
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self._models[name] = model
+            self._initialized.add(name)
+            self._sizes[name] = device_bytes
+            self.counters["loads"] += 1
+            self._stats[name] = {
+                "load_seconds": seconds,
+                "device_bytes": device_bytes,
+                "host_bytes": max(host_memory_resident() - host_before, 0),
+                "loaded_at": time.time(),
+                "location": "device",
+            }
+        metrics.observe("world3d_model_load_seconds", seconds, model=name, kind="load")
+        
+        # Now that the real size is known, enforce the budget for everyone else
+        self._make_room(0, exclude=name)
+        return model
+    
+    def footprint(self, name):
+        """Device bytes of name when last loaded (0 if it never was)"""
+        return self._size(name)
+    
+    def _size(self, name):
+        # Sizes outlive drops so a reload can make room before it starts
+        return self._sizes.get(name, 0)
+    
+    def _device_used(self, exclude=None):
+        return sum(self._size(n) for n in self._device_lru if n != exclude)
+    
+    def _host_used(self):
+        return sum(self._size(n) for n in self._host_lru)
+    
+    def _make_room(self, needed, exclude=None):
+        """Offload least recently used idle models until needed bytes fit
+        
+        needed=None offloads every idle model.
+        """
+        if needed is not None and self.device_budget_bytes is None:
+            return
+        
+        while True:
+            with self._lock:
+                if needed is not None and self._device_used(exclude) + needed <= self.device_budget_bytes:
+                    return
+                victim = next(
+                    (n for n in self._device_lru if n != exclude and self._pins[n] == 0),
+                    None
+                )
+                if victim is None:
+                    # Everything left is in use; run over budget rather than block
+                    return
+                del self._device_lru[victim]
+            self._offload(victim, keep=exclude)
+    
+    def _offload(self, name, keep=None):
+        """Move a model to host memory, or drop it if the host budget is full
+        
+        keep is never dropped from host memory (it is being restored).
+        """
+        size = self._size(name)
+        if self.host_budget_bytes is not None:
+            while self._host_used() + size > self.host_budget_bytes:
+                oldest = next((n for n in self._host_lru if n != keep), None)
+                if oldest is None:
+                    break
+                self._drop(oldest)
+            if size > self.host_budget_bytes:
+                self._drop(name)
+                return
+        
+        model = move_model(self._models[name], "cpu")
+        _empty_device_cache()
+        
+        with self._lock:
+            self._models[name] = model
+            self._host_lru[name] = True
+            self.counters["evictions"] += 1
+            self._stats[name]["location"] = "host"
+    
+    def _drop(self, name, evicted=True):
+        with self._lock:
+            model = self._models.pop(name, None)
+            self._stats.pop(name, None)
+            self._host_lru.pop(name, None)
+            self._device_lru.pop(name, None)
+            if evicted:
+                self.counters["drops"] += 1
+        del model
+        _empty_device_cache()
+    
+    def get(self, name):
+        """Return the model called name if it is loaded, otherwise None"""
+        return self._models.get(name)
+    
+    def is_loaded(self, name):
+        return self._models.get(name) is not None
+    
+    def is_initialized(self, name):
+        """True once name has been loaded, even if it was dropped since"""
+        return name in self._initialized
+    
+    def unload(self, name):
+        """Drop the model called name and release its memory"""
+        with self._transition_lock:
+            if name in self._models:
+                self._drop(name, evicted=False)
+            self._initialized.discard(name)
+    
+    def stats(self):
+        """Load time, resident memory and location for every loaded model"""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+    
+    def summary(self, names=None):
+        """One line per loaded model, suitable for a status box"""
+        lines = []
+        for name, stats in self.stats().items():
+            if names is not None and name not in names:
+                continue
+            lines.append(
+                f"{name}: loaded in {stats['load_seconds']:.1f}s, "
+                f"device {format_bytes(stats['device_bytes'])}, "
+                f"host RSS +{format_bytes(stats['host_bytes'])}, "
+                f"on {stats['location']}"
+            )
+        return "\n".join(lines)
+    
+    def residency_report(self):
+        """Summary of every model plus the hit/miss/eviction counters"""
+        counters = ", ".join(f"{k}={v}" for k, v in self.counters.items())
+        with self._lock:
+            device_used = self._device_used()
+            host_used = self._host_used()
+        
+        budget = self.device_budget_bytes
+        lines = [
+            f"Device: {format_bytes(device_used)} used of "
+            f"{format_bytes(budget) if budget is not None else 'unlimited'}",
+            f"Host (offloaded): {format_bytes(host_used)}",
+            f"Counters: {counters}",
+        ]
+        summary = self.summary()
+        if summary:
+            lines.append(summary)
+        return "\n".join(lines)
\ No newline at end of file
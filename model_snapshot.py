@@ -0,0 +1,207 @@
+"""
+Snapshots of loaded, quantized models
+Building PanoGen/SceneGen with fp8_gemm/fp8_attention reads the checkpoints
+from the Hugging Face cache and quantizes them again on every load. A snapshot
+saves the finished model once (torch.save of the whole object, weights
+included) and later loads memory-map it instead, so a restart only pays for
+reading the file and moving it to the device.
+
+A snapshot is only used while its fingerprint still matches: the source
+checkpoints (file names, sizes and the content hashes Hugging Face stores its
+files under), the model code version, the load options and the torch version.
+Anything else is rebuilt from the checkpoints and saved again.
+    
+    WORLD3D_SNAPSHOT_DIR=models/snapshots python app.py
+"""
+
+import hashlib
+import importlib.metadata
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from model_registry import move_model
+
+def hf_hub_dir():
+    """Root of the Hugging Face hub cache"""
+    if os.environ.get("HF_HUB_CACHE"):
+        return Path(os.environ["HF_HUB_CACHE"])
+    home = os.environ.get("HF_HOME", os.path.join(os.path.expanduser("~"), ".cache", "huggingface"))
+    return Path(home) / "hub"
+
+def hf_repo_dirs(repo_ids=None):
+    """Cache directories of the given model repos (None: the whole hub cache)"""
+    hub = hf_hub_dir()
+    if repo_ids is None:
+        return [hub]
+    return [hub / f"models--{repo_id.replace('/', '--')}" for repo_id in repo_ids]
+
+def package_version(name):
+    """Installed version of a distribution, or None"""
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+def source_fingerprint(paths, extra=None):
+    """Hash of the files under paths plus extra (e.g. code version, load options)
+    
+    Files are identified by path, size and mtime, or by their link target for
+    the symlinks of the Hugging Face cache, which point at blobs named after
+    their content hash. No file is read, so this stays cheap for large
+    checkpoints. Missing paths count as part of the fingerprint too.
+    """
+    digest = hashlib.sha256(json.dumps(extra, sort_keys=True, default=str).encode())
+    for root in sorted(str(p) for p in paths):
+        if not os.path.exists(root):
+            digest.update(f"missing {root}\n".encode())
+            continue
+        for directory, dirs, files in os.walk(root):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, root)
+                if os.path.islink(path):
+                    identity = os.readlink(path)
+                else:
+                    stat = os.stat(path)
+                    identity = f"{stat.st_size}:{stat.st_mtime_ns}"
+                digest.update(f"{relative} {identity}\n".encode())
+    return digest.hexdigest()
+
+class SnapshotStore:
+    """One snapshot file per model name under root, with its fingerprint"""
+    
+    META = "meta.json"
+    
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.counters = {"hits": 0, "misses": 0, "stale": 0, "saves": 0, "save_errors": 0}
+        self.loads = {}  # name -> {"source", "seconds", "checkpoint_seconds"} of its last load
+        self._lock = threading.Lock()
+    
+    def _dir(self, name):
+        return self.root / name
+    
+    def _meta(self, name):
+        try:
+            return json.loads((self._dir(name) / self.META).read_text())
+        except (OSError, ValueError):
+            return None
+    
+    def load(self, name, fingerprint, device):
+        """The snapshot of name moved to device, or None if there is no valid one"""
+        import torch
+        
+        meta = self._meta(name)
+        path = self._dir(name) / "model.pt"
+        if meta is None or not path.exists():
+            with self._lock:
+                self.counters["misses"] += 1
+            return None
+        if meta["fingerprint"] != fingerprint or path.stat().st_size != meta["bytes"]:
+            # Source checkpoints, code or options changed (or a torn write): rebuild
+            with self._lock:
+                self.counters["stale"] += 1
+            shutil.rmtree(self._dir(name), ignore_errors=True)
+            return None
+        
+        start = time.perf_counter()
+        # mmap: tensors are read from the page cache as they are moved, not copied into the heap first
+        model = torch.load(path, map_location="cpu", mmap=True, weights_only=False)
+        model = move_model(model, device)
+        with self._lock:
+            self.counters["hits"] += 1
+            self.loads[name] = {
+                "source": "snapshot",
+                "seconds": time.perf_counter() - start,
+                "checkpoint_seconds": meta.get("checkpoint_seconds"),
+            }
+        return model
+    
+    def save(self, name, fingerprint, model, checkpoint_seconds=None):
+        """Write model as the snapshot of name; returns False if it cannot be pickled"""
+        import torch
+        
+        target = self._dir(name)
+        tmp = self.root / f".tmp-{name}-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        start = time.perf_counter()
+        try:
+            torch.save(model, tmp / "model.pt")
+        except Exception as e:
+            # e.g. a model holding handles or compiled kernels that do not pickle
+            shutil.rmtree(tmp, ignore_errors=True)
+            with self._lock:
+                self.counters["save_errors"] += 1
+            print(f"Snapshot of {name} skipped: {e}")
+            return False
+        (tmp / self.META).write_text(json.dumps({
+            "fingerprint": fingerprint,
+            "bytes": (tmp / "model.pt").stat().st_size,
+            "created_at": time.time(),
+            "save_seconds": time.perf_counter() - start,
+            "checkpoint_seconds": checkpoint_seconds,
+        }))
+        shutil.rmtree(target, ignore_errors=True)
+        try:
+            os.replace(tmp, target)
+        except OSError:
+            # Another process (e.g. a pool worker) saved the same model first
+            shutil.rmtree(tmp, ignore_errors=True)
+            return False
+        with self._lock:
+            self.counters["saves"] += 1
+        return True
+    
+    def loader(self, name, build, fingerprint, device):
+        """Wrap a registry loader: use the snapshot of name when valid, else build and save one
+        
+        fingerprint and device are called at load time, so they can depend on
+        state (downloads, the probed device) that only exists by then.
+        """
+        def load():
+            expected = fingerprint()
+            model = self.load(name, expected, device())
+            if model is not None:
+                return model
+            
+            start = time.perf_counter()
+            model = build()
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.loads[name] = {"source": "checkpoint", "seconds": seconds, "checkpoint_seconds": seconds}
+            # Fingerprint again: the build may have downloaded the checkpoints
+            self.save(name, fingerprint(), model, checkpoint_seconds=seconds)
+            return model
+        return load
+    
+    def stats(self):
+        """Counters, the last load of every model and the snapshots on disk"""
+        snapshots = {}
+        for meta_file in self.root.glob(f"*/{self.META}"):
+            meta = self._meta(meta_file.parent.name)
+            if meta is not None:
+                snapshots[meta_file.parent.name] = {"bytes": meta["bytes"], "created_at": meta["created_at"]}
+        with self._lock:
+            return {**self.counters, "loads": {k: dict(v) for k, v in self.loads.items()}, "snapshots": snapshots}
+    
+    def report(self):
+        """One line per loaded model: where it came from and how long it took"""
+        lines = []
+        for name, info in self.stats()["loads"].items():
+            line = f"{name}: {info['seconds']:.1f}s from {info['source']}"
+            if info["source"] == "snapshot" and info["checkpoint_seconds"]:
+                line += f" (vs {info['checkpoint_seconds']:.1f}s from checkpoint)"
+            lines.append(line)
+        return "\n".join(lines)
+
+def from_env():
+    """Store under WORLD3D_SNAPSHOT_DIR, or None when snapshots are off (the default)"""
+    root = os.environ.get("WORLD3D_SNAPSHOT_DIR")
+    return SnapshotStore(root) if root else None
\ No newline at end of file
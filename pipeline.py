@@ -0,0 +1,181 @@
+"""
+Staged pipeline executor
+Runs multi-stage work (PanoGen -> SceneGen) with one worker thread per stage,
+connected by bounded queues, so the first stage of the next job overlaps the
+second stage of the current one.
+
+A full queue blocks the stage in front of it (backpressure), and each stage
+reserves its memory footprint against a shared ceiling before it runs: when
+two stages do not fit together they simply take turns.
+"""
+
+import itertools
+import queue
+import threading
+import time
+
+class PipelineItem:
+    """One piece of work travelling through the stages"""
+    
+    _ids = itertools.count(1)
+    
+    def __init__(self, state):
+        self.id = next(self._ids)
+        self.state = state
+        self.stage = None
+        self.stage_seconds = {}
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._cond = threading.Condition()
+    
+    def done(self):
+        return self.finished_at is not None
+    
+    def wait(self, timeout=None):
+        """Block until every stage has run (or one failed); False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(self.done, timeout)
+    
+    def wait_stage(self, name, timeout=None):
+        """Block until stage name has finished; False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: name in self.stage_seconds or self.done(), timeout)
+    
+    def _update(self, stage=None, seconds=None, error=None, finished=False):
+        with self._cond:
+            if seconds is not None:
+                self.stage_seconds[self.stage] = seconds
+            self.stage = stage
+            if error is not None:
+                self.error = error
+            if finished:
+                self.finished_at = time.time()
+            self._cond.notify_all()
+
+class StagedPipeline:
+    """Stages [(name, fn, memory)] run in order, each on its own worker thread
+    
+    fn(state) returns the state handed to the next stage. memory is the
+    stage's footprint in bytes, or a zero-argument callable returning it
+    (e.g. the registry size of the model the stage uses).
+    """
+    
+    def __init__(self, stages, queue_size=1, memory_ceiling_bytes=None):
+        self.stages = list(stages)
+        self.memory_ceiling_bytes = memory_ceiling_bytes
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "memory_waits": 0}
+        self._busy = {name: 0.0 for name, _, _ in self.stages}
+        self._reserved = {}
+        self._peak_reserved = 0
+        self._memory_cond = threading.Condition()
+        
+        # The first queue is unbounded: callers are already bounded by the scheduler
+        self._queues = [queue.Queue()] + [queue.Queue(maxsize=queue_size) for _ in self.stages[1:]]
+        self._threads = []
+        for index, (name, _, _) in enumerate(self.stages):
+            thread = threading.Thread(
+                target=self._worker,
+                args=(index,),
+                name=f"pipeline-{name}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+    
+    def submit(self, state):
+        """Queue state for the first stage and return its PipelineItem"""
+        item = PipelineItem(state)
+        with self._memory_cond:
+            self.counters["submitted"] += 1
+        self._queues[0].put(item)
+        return item
+    
+    def run(self, state):
+        """Submit state and wait for it; returns the final state"""
+        item = self.submit(state)
+        item.wait()
+        if item.error is not None:
+            raise item.error
+        return item.state
+    
+    def close(self):
+        """Stop the workers once the queued items have drained"""
+        self._queues[0].put(None)
+        for thread in self._threads:
+            thread.join()
+    
+    def _footprint(self, memory):
+        return memory() if callable(memory) else (memory or 0)
+    
+    def _reserve(self, name, needed):
+        """Wait until needed bytes fit under the ceiling next to the other stages"""
+        with self._memory_cond:
+            if self.memory_ceiling_bytes is not None:
+                waited = False
+                # A stage that does not fit even alone runs once nothing else holds memory
+                while self._reserved and sum(self._reserved.values()) + needed > self.memory_ceiling_bytes:
+                    waited = True
+                    self._memory_cond.wait()
+                self.counters["memory_waits"] += waited
+            self._reserved[name] = needed
+            self._peak_reserved = max(self._peak_reserved, sum(self._reserved.values()))
+    
+    def _release(self, name):
+        with self._memory_cond:
+            self._reserved.pop(name, None)
+            self._memory_cond.notify_all()
+    
+    def _worker(self, index):
+        name, fn, memory = self.stages[index]
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(self.stages) else None
+        
+        while True:
+            item = inbox.get()
+            if item is None:
+                if outbox is not None:
+                    outbox.put(None)
+                return
+            
+            self._reserve(name, self._footprint(memory))
+            item._update(stage=name)
+            start = time.perf_counter()
+            try:
+                item.state = fn(item.state)
+            except Exception as e:
+                error = e
+            else:
+                error = None
+            finally:
+                self._release(name)
+            seconds = time.perf_counter() - start
+            
+            with self._memory_cond:
+                self._busy[name] += seconds
+            
+            if error is not None:
+                with self._memory_cond:
+                    self.counters["failed"] += 1
+                item._update(seconds=seconds, error=error, finished=True)
+            elif outbox is None:
+                with self._memory_cond:
+                    self.counters["completed"] += 1
+                item._update(seconds=seconds, finished=True)
+            else:
+                item._update(seconds=seconds)
+                outbox.put(item)  # blocks while the next stage is backed up
+    
+    def stats(self):
+        """Queue lengths and busy seconds per stage plus global counters"""
+        with self._memory_cond:
+            return {
+                "stages": {
+                    name: {"queued": self._queues[i].qsize(), "busy_seconds": self._busy[name]}
+                    for i, (name, _, _) in enumerate(self.stages)
+                },
+                "reserved_bytes": sum(self._reserved.values()),
+                "peak_reserved_bytes": self._peak_reserved,
+                "memory_ceiling_bytes": self.memory_ceiling_bytes,
+                "counters": dict(self.counters),
+            }
\ No newline at end of file
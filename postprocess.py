@@ -0,0 +1,301 @@
+"""
+Vectorized clean-up of generated meshes and splats
+Runs on every SceneGen / WorldGen output before it is cached and served.
+Each step can be switched on or off (WORLD3D_POSTPROCESS):
+
+- dedup: weld mesh vertices closer than a tolerance (keeping UV seams) and drop
+  degenerate / duplicate faces; for splats, keep the most opaque splat per cell
+- floaters: drop small disconnected mesh pieces, and splats with fewer
+  neighbours in the surrounding 3x3x3 grid cells than a minimum (capped at the
+  median count)
+- crop: drop everything outside a radius around the camera origin
+- normals: area-weighted vertex normals for meshes, the shortest Gaussian axis
+  as the normal of each splat
+
+Everything works on whole numpy arrays: spatial hashing packs grid cells into
+int64 keys, so dedup and neighbour counts are sorts and searchsorted calls, and
+connected components use vectorized label propagation.
+"""
+
+import itertools
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+import splat_io
+
+STEPS = ("dedup", "floaters", "crop", "normals")
+
+def from_env():
+    """Settings from the WORLD3D_POSTPROCESS* environment variables"""
+    radius = float(os.environ.get("WORLD3D_POSTPROCESS_RADIUS", "0"))
+    return {
+        "steps": parse_steps(os.environ.get("WORLD3D_POSTPROCESS", "")),
+        "weld_tolerance": float(os.environ.get("WORLD3D_POSTPROCESS_WELD", "1e-6")),
+        "floater_fraction": float(os.environ.get("WORLD3D_POSTPROCESS_FLOATER_FRACTION", "0.001")),
+        "outlier_cell": float(os.environ.get("WORLD3D_POSTPROCESS_OUTLIER_CELL", "0.005")),
+        "min_neighbors": int(os.environ.get("WORLD3D_POSTPROCESS_MIN_NEIGHBORS", "8")),
+        "radius": radius if radius > 0 else None,
+        "center": (0.0, 0.0, 0.0),
+    }
+
+def parse_steps(value):
+    """Parse a WORLD3D_POSTPROCESS value ("dedup,floaters"); "all" enables every step"""
+    if value.strip() == "all":
+        return STEPS
+    steps = tuple(part for part in value.replace(" ", "").split(",") if part)
+    unknown = set(steps) - set(STEPS)
+    if unknown:
+        raise ValueError(f"Unknown post-processing steps: {', '.join(sorted(unknown))}")
+    return steps
+
+def signature(settings):
+    """Settings that change the output, for cache keys; None when nothing runs"""
+    if not settings["steps"]:
+        return None
+    return {key: list(value) if isinstance(value, tuple) else value for key, value in settings.items()}
+
+def _extent(positions):
+    """Diagonal of the 1st-99th percentile box, so a few far floaters do not inflate it"""
+    low, high = np.percentile(positions, [1, 99], axis=0)
+    return float(np.linalg.norm(high - low)) or 1.0
+
+def _cells(positions, cell):
+    """Integer grid coordinates, offset by one so neighbour offsets stay non-negative"""
+    low = positions.min(axis=0)
+    cell = max(cell, float((positions.max(axis=0) - low).max()) / 2 ** 20)
+    return np.floor((positions - low) / cell).astype(np.int64) + 1
+
+def _pack(coords):
+    """One int64 key per grid cell (21 bits per axis)"""
+    return (coords[:, 0] << 42) | (coords[:, 1] << 21) | coords[:, 2]
+
+def _group(keys):
+    """np.unique(keys, return_index, return_inverse, return_counts) for int64 keys, via one argsort"""
+    order = np.argsort(keys, kind="stable")
+    ordered = keys[order]
+    starts = np.ones(len(keys), dtype=bool)
+    starts[1:] = ordered[1:] != ordered[:-1]
+    inverse = np.empty(len(keys), dtype=np.int64)
+    inverse[order] = np.cumsum(starts) - 1
+    counts = np.diff(np.append(np.flatnonzero(starts), len(keys)))
+    return ordered[starts], order[starts], inverse, counts
+
+def weld(positions, tolerance, attributes=None):
+    """Group vertices sharing a tolerance cell (and equal attributes, e.g. UVs)
+    
+    Returns (index, inverse) like np.unique: index holds one vertex per group,
+    inverse maps every vertex to its group.
+    """
+    keys = _pack(_cells(positions, tolerance))
+    if attributes is None:
+        _, index, inverse, _ = _group(keys)
+    else:
+        quantized = np.round(np.asarray(attributes, dtype=np.float64) * 1e6).astype(np.int64)
+        rows = np.column_stack([keys, quantized.reshape(len(keys), -1)])
+        _, index, inverse = np.unique(rows, axis=0, return_index=True, return_inverse=True)
+    return index, inverse.reshape(-1)
+
+def valid_faces(faces):
+    """Mask of faces that are neither degenerate nor a repeat of an earlier face"""
+    ok = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+    ordered = np.sort(faces, axis=1).astype(np.int64)
+    if len(faces) and ordered.max() < 2 ** 21:
+        _, first, _, _ = _group(_pack(ordered))
+    else:
+        _, first = np.unique(ordered, axis=0, return_index=True)
+    unique = np.zeros(len(faces), dtype=bool)
+    unique[first] = True
+    return ok & unique
+
+def component_labels(num_vertices, faces):
+    """Connected component of every vertex (the smallest vertex index in it)"""
+    labels = np.arange(num_vertices)
+    edges = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]]])
+    while len(edges):
+        low = np.minimum(labels[edges[:, 0]], labels[edges[:, 1]])
+        high = np.maximum(labels[edges[:, 0]], labels[edges[:, 1]])
+        linked = low != high
+        if not linked.any():
+            break
+        edges = edges[linked]
+        np.minimum.at(labels, high[linked], low[linked])
+        # Pointer jumping until every vertex points at its root again
+        while True:
+            parents = labels[labels]
+            if np.array_equal(parents, labels):
+                break
+            labels = parents
+    return labels
+
+def large_components(num_vertices, faces, min_fraction):
+    """Mask of faces in components holding at least min_fraction of all faces"""
+    face_labels = component_labels(num_vertices, faces)[faces[:, 0]]
+    sizes = np.bincount(face_labels, minlength=num_vertices)
+    return sizes[face_labels] >= min_fraction * len(faces)
+
+def neighbor_counts(positions, cell):
+    """Number of points in the 3x3x3 grid cells around every point (itself included)"""
+    unique, _, inverse, counts = _group(_pack(_cells(positions, cell)))
+    cumulative = np.concatenate([[0], np.cumsum(counts)])
+    totals = np.zeros(len(unique), dtype=np.int64)
+    for dx, dy in itertools.product((-1, 0, 1), repeat=2):
+        # The cells z-1..z+1 of a column are one contiguous key range, and packing
+        # is linear, so every shifted key array is still sorted
+        center = unique + ((dx << 42) + (dy << 21))
+        low = np.searchsorted(unique, center - 1, side="left")
+        high = np.searchsorted(unique, center + 1, side="right")
+        totals += cumulative[high] - cumulative[low]
+    return totals[inverse]
+
+def within_radius(positions, radius, center=(0.0, 0.0, 0.0)):
+    return ((positions - np.asarray(center)) ** 2).sum(axis=1) <= radius * radius
+
+def vertex_normals(positions, faces):
+    """Area-weighted vertex normals"""
+    tris = positions[faces].astype(np.float64)
+    face_normals = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])  # length is twice the area
+    flat = faces.reshape(-1)
+    normals = np.stack([
+        np.bincount(flat, weights=np.repeat(face_normals[:, axis], 3), minlength=len(positions)) for axis in range(3)
+    ], axis=1)
+    length = np.linalg.norm(normals, axis=1, keepdims=True)
+    return (normals / np.where(length > 0, length, 1.0)).astype(np.float32)
+
+def splat_normals(data):
+    """Unit normal of every splat: the axis of its smallest scale, rotated to world space"""
+    quat = np.stack([data[f"rot_{i}"] for i in range(4)], axis=1).astype(np.float64)
+    quat /= np.maximum(np.linalg.norm(quat, axis=1, keepdims=True), 1e-12)
+    w, x, y, z = quat.T
+    rotation = np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)], axis=1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)], axis=1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], axis=1),
+    ], axis=1)
+    scales = np.stack([data[f"scale_{i}"] for i in range(3)], axis=1)
+    axis = np.argmin(scales, axis=1)
+    return rotation[np.arange(len(axis)), :, axis].astype(np.float32)
+
+def process_splat(data, settings):
+    """Apply the enabled steps to {property: array}; returns (data, stats)"""
+    steps = settings["steps"]
+    positions = np.stack([data["x"], data["y"], data["z"]], axis=1).astype(np.float64)
+    scale = _extent(positions)
+    keep = np.arange(len(positions))
+    
+    if "crop" in steps and settings["radius"]:
+        keep = keep[within_radius(positions[keep], settings["radius"], settings["center"])]
+    if "dedup" in steps and len(keep):
+        # Most opaque splat first within each cell, then the first of every cell
+        keys = _pack(_cells(positions[keep], settings["weld_tolerance"] * scale))
+        order = np.lexsort((-data["opacity"][keep], keys))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = keys[order][1:] != keys[order][:-1]
+        keep = np.sort(keep[order[first]])
+    if "floaters" in steps and len(keep):
+        counts = neighbor_counts(positions[keep], settings["outlier_cell"] * scale)
+        # Capped by the typical density, so a uniformly sparse cloud is not wiped out
+        keep = keep[counts >= min(settings["min_neighbors"], np.median(counts))]
+    
+    stats = {"splats": (len(positions), len(keep))}
+    if len(keep) < len(positions):
+        data = {name: values[keep] for name, values in data.items()}
+    if "normals" in steps:
+        normals = splat_normals(data)
+        for i, name in enumerate(("nx", "ny", "nz")):
+            data[name] = normals[:, i]
+    return data, stats
+
+def process_mesh(mesh, settings, transform=None):
+    """Apply the enabled steps to a trimesh.Trimesh in place; returns stats
+    
+    transform maps the mesh into scene space, where the crop radius applies.
+    """
+    steps = settings["steps"]
+    stats = {"vertices": [len(mesh.vertices)], "faces": [len(mesh.faces)]}
+    world = np.asarray(mesh.vertices, dtype=np.float64)
+    if transform is not None:
+        world = world @ transform[:3, :3].T + transform[:3, 3]
+    scale = _extent(world) if len(world) else 1.0
+    
+    if "dedup" in steps and len(world):
+        uv = getattr(mesh.visual, "uv", None)
+        attributes = uv if uv is not None and len(uv) == len(world) else None
+        index, inverse = weld(world, settings["weld_tolerance"] * scale, attributes)
+        if len(index) < len(world):
+            mesh.update_vertices(index, inverse)
+            world = world[index]
+        mesh.update_faces(valid_faces(np.asarray(mesh.faces)))
+    
+    faces = np.asarray(mesh.faces)
+    keep = np.ones(len(faces), dtype=bool)
+    if "crop" in steps and settings["radius"]:
+        inside = within_radius(world, settings["radius"], settings["center"])
+        keep &= inside[faces].all(axis=1)
+    if "floaters" in steps and len(faces):
+        keep &= large_components(len(world), faces, settings["floater_fraction"])
+    if not keep.all():
+        mesh.update_faces(keep)
+        mesh.remove_unreferenced_vertices()
+    
+    if "normals" in steps and len(mesh.faces):
+        mesh.vertex_normals = vertex_normals(np.asarray(mesh.vertices), np.asarray(mesh.faces))
+    
+    stats["vertices"].append(len(mesh.vertices))
+    stats["faces"].append(len(mesh.faces))
+    return stats
+
+def _is_splat(path):
+    if Path(path).suffix.lower() != ".ply":
+        return False
+    # Only the header decides; mapping the file (mapped_io.map_ply) would also fail on
+    # meshes whose faces have varying vertex counts
+    with open(path, "rb") as f:
+        for line in f:
+            words = line.split()
+            if words == [b"end_header"]:
+                return False
+            if words[:1] == [b"property"] and words[-1:] == [b"opacity"]:
+                return True
+    return False
+
+def process_file(path, settings):
+    """Post-process a generated splat PLY, mesh PLY or GLB in place; returns stats"""
+    start = time.perf_counter()
+    path = Path(path)
+    if _is_splat(path):
+        data, stats = process_splat(splat_io.read_splat(path), settings)
+        splat_io.write_splat(path, data)
+    else:
+        import trimesh
+        
+        stats = {"vertices": [0, 0], "faces": [0, 0]}
+        if path.suffix.lower() in (".glb", ".gltf"):
+            # Keep the scene graph (SceneGen writes one mesh per layer)
+            scene = trimesh.load(str(path), force="scene", process=False)
+            done = set()
+            for node in scene.graph.nodes_geometry:
+                transform, name = scene.graph[node]
+                mesh = scene.geometry.get(name)
+                if name in done or not isinstance(mesh, trimesh.Trimesh):
+                    continue
+                done.add(name)
+                mesh_stats = process_mesh(mesh, settings, transform)
+                for key in stats:
+                    stats[key] = [a + b for a, b in zip(stats[key], mesh_stats[key])]
+            scene.export(str(path))
+        else:
+            mesh = trimesh.load(str(path), process=False)
+            if isinstance(mesh, trimesh.Trimesh) and len(mesh.faces):
+                stats = process_mesh(mesh, settings)
+                mesh.export(str(path))
+    stats = {key: tuple(value) for key, value in stats.items()}
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+def describe(stats):
+    """One line summary of process_file stats"""
+    counts = ", ".join(f"{name} {value[0]} -> {value[1]}" for name, value in stats.items() if name != "seconds")
+    return f"{counts} in {stats['seconds']:.2f}s"
\ No newline at end of file
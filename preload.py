@@ -0,0 +1,148 @@
+"""
+Background warm-up of heavy imports and start-up work
+The apps import only what the UI needs, bind their port, and then run the
+slow parts of start-up (importing torch and probing CUDA, open3d, the model
+packages, scanning the result cache) as steps on a background thread, so the
+UI serves while they run.
+
+Each step runs once. wait(name) returns its result, running the step in the
+calling thread if the background thread has not reached it yet, so code that
+needs e.g. torch before the warm-up got there simply waits for it.
+"""
+
+import os
+import threading
+import time
+
+# WORLD3D_PRELOAD=0 runs the steps in the foreground instead, as a plain start-up would
+BACKGROUND = os.environ.get("WORLD3D_PRELOAD", "1") != "0"
+
+# After a model is loaded at start-up, one throwaway generation compiles its
+# kernels and fills the allocator caches before the first real request
+WARMUP_INFERENCE = os.environ.get("WORLD3D_WARMUP_INFERENCE", "1") != "0"
+WARMUP_PROMPT = "a quiet lake between pine-covered mountains"
+
+def autoload_from_env(backends):
+    """Backends to load at start-up from WORLD3D_AUTOLOAD ("all" by default, "none" for manual Initialize)"""
+    value = os.environ.get("WORLD3D_AUTOLOAD", "all").strip().lower()
+    if value in ("", "none", "0"):
+        return []
+    if value == "all":
+        return list(backends)
+    return [name.strip() for name in value.split(",") if name.strip() in backends]
+
+class Step:
+    """One named start-up step and its outcome"""
+    
+    def __init__(self, name, fn, optional=False):
+        self.name = name
+        self.fn = fn
+        self.optional = optional  # an ImportError means "not installed", not a failure
+        self.state = "pending"
+        self.result = None
+        self.error = None
+        self.started_at = None
+        self.seconds = None
+        self.lock = threading.Lock()
+
+class Preloader:
+    """Runs start-up steps in order on a background thread"""
+    
+    def __init__(self, steps):
+        self.steps = {}
+        for step in steps:
+            step = step if isinstance(step, Step) else Step(*step)
+            self.steps[step.name] = step
+        self.started_at = time.time()
+        self._thread = None
+    
+    def start(self, background=None):
+        """Run every step, on a daemon thread unless background is False (default: BACKGROUND)"""
+        if self._thread is not None:
+            return self
+        background = BACKGROUND if background is None else background
+        self._thread = threading.Thread(target=self._run_all, name="preload", daemon=True)
+        if background:
+            self._thread.start()
+        else:
+            self._thread.run()
+        return self
+    
+    def started(self):
+        return self._thread is not None
+    
+    def _run_all(self):
+        for step in self.steps.values():
+            try:
+                self._run(step)
+            except Exception as e:
+                print(f"Warm-up step {step.name} failed: {e}")
+    
+    def _run(self, step):
+        with step.lock:
+            if step.state == "pending":
+                step.state = "running"
+                step.started_at = time.time()
+                try:
+                    step.result = step.fn()
+                    step.state = "done"
+                except ImportError as e:
+                    step.error = e
+                    step.state = "missing" if step.optional else "failed"
+                except Exception as e:
+                    step.error = e
+                    step.state = "failed"
+                step.seconds = time.time() - step.started_at
+        if step.state == "failed":
+            raise step.error
+        return step.result
+    
+    def wait(self, name):
+        """Result of step name, running it now if it has not started"""
+        return self._run(self.steps[name])
+    
+    def settle(self, name):
+        """Wait for step name if there is one; its failure is left to the caller to report"""
+        if name in self.steps:
+            try:
+                self._run(self.steps[name])
+            except Exception:
+                pass
+    
+    def done(self):
+        return all(step.state not in ("pending", "running") for step in self.steps.values())
+    
+    def ready(self):
+        """Every step finished without failing (optional packages may be missing)"""
+        return all(step.state in ("done", "missing") for step in self.steps.values())
+    
+    def stats(self):
+        return {
+            name: {"state": step.state, "seconds": step.seconds, "error": str(step.error) if step.error else None}
+            for name, step in self.steps.items()
+        }
+    
+    def report(self, names=None):
+        """Short status text, e.g. "torch 4.1s ✓, hy3dworld importing (3s)..." """
+        parts = []
+        for name in names or self.steps:
+            step = self.steps[name]
+            if step.state == "done":
+                parts.append(f"{name} {step.seconds:.1f}s ✓")
+            elif step.state == "running":
+                parts.append(f"{name} loading ({time.time() - step.started_at:.0f}s)...")
+            elif step.state == "pending":
+                parts.append(f"{name} pending")
+            elif step.state == "missing":
+                parts.append(f"{name} not installed")
+            else:
+                parts.append(f"{name} failed: {step.error}")
+        return ", ".join(parts)
+
+def progress(preloader, names=None, done="Warm-up done", poll_seconds=0.5, timeout=600):
+    """Yield warm-up status text for a status box (demo.load) until the steps are done"""
+    deadline = time.time() + timeout
+    while preloader.started() and not preloader.done() and time.time() < deadline:
+        yield f"Warming up: {preloader.report(names)}"
+        time.sleep(poll_seconds)
+    yield f"{done} ({preloader.report(names)})"
\ No newline at end of file
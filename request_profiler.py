@@ -0,0 +1,298 @@
+"""
+Per-request profiles of slow or selected generations
+A profiled request runs with a Python stack sampler and, when torch is
+there, the torch profiler (CPU ops and CUDA kernels). Its traces are saved in
+a profile/ directory next to the request's outputs:
+    
+    profile.json     mode, duration, why it was kept, the hottest stacks
+    stacks.txt       sampled stacks in the folded format (flamegraph.pl, speedscope)
+    torch.json       Chrome trace of the torch profiler (chrome://tracing, Perfetto)
+    torch_ops.txt    torch ops sorted by time
+
+Requests are profiled when asked for (force(), e.g. POST /api/v1/<mode>?profile=1),
+sampled (WORLD3D_PROFILE_SAMPLE, a fraction of requests) or slower than
+WORLD3D_PROFILE_SLOW_S. The last one stack-samples every request and only
+keeps the traces of those over the threshold, which are also flagged in the
+log. Only the newest WORLD3D_PROFILE_KEEP traces of a process are kept.
+
+The sampler also records the pipeline threads, which may be working on
+other requests at the same time.
+"""
+
+import functools
+import inspect
+import json
+import os
+import random
+import shutil
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from pathlib import Path
+
+import metrics
+
+PROFILE_DIR = "profile"
+
+_local = threading.local()
+
+@contextmanager
+def force():
+    """Profile the requests run by this thread inside the block"""
+    previous = getattr(_local, "force", False)
+    _local.force = True
+    try:
+        yield
+    finally:
+        _local.force = previous
+
+def forced():
+    return getattr(_local, "force", False)
+
+def forcing(fn):
+    """fn with its profile forced, in whichever thread ends up running it"""
+    if inspect.isgeneratorfunction(fn):
+        @functools.wraps(fn)
+        def streaming(*args, **kwargs):
+            with force():
+                yield from fn(*args, **kwargs)
+        return streaming
+    
+    @functools.wraps(fn)
+    def plain(*args, **kwargs):
+        with force():
+            return fn(*args, **kwargs)
+    return plain
+
+class StackSampler:
+    """Samples the stacks of some threads every interval seconds on a thread of its own"""
+    
+    def __init__(self, threads, prefixes=(), interval=0.01):
+        self.threads = set(threads)  # thread idents
+        self.prefixes = tuple(prefixes)  # and threads whose name starts with one of these
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+    
+    def __enter__(self):
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, str(ident))
+                if ident not in self.threads and not name.startswith(self.prefixes):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if ident not in self.threads and any(f.startswith("get (queue.py") for f in stack):
+                    continue  # an idle stage thread waiting for work
+                self.counts[";".join([name] + stack[::-1])] += 1
+            self.samples += 1
+    
+    def folded(self):
+        """One "thread;outer;...;inner count" line per distinct stack"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common())
+    
+    def hottest(self, limit=10):
+        """Innermost frames that were on top of a sampled stack most often"""
+        leaves = Counter()
+        for stack, count in self.counts.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return [{"frame": frame, "samples": count} for frame, count in leaves.most_common(limit)]
+
+@contextmanager
+def _torch_profile():
+    """The torch profiler around the block (yields None without torch)"""
+    try:
+        import torch
+        from torch.profiler import ProfilerActivity, profile
+    except ImportError:
+        yield None
+        return
+    activities = [ProfilerActivity.CPU]
+    if torch.cuda.is_available():
+        activities.append(ProfilerActivity.CUDA)
+    with profile(activities=activities) as prof:
+        yield prof
+
+class RequestProfiler:
+    """Decides which requests to profile, captures them and keeps the newest keep traces
+    
+    new_dir(prefix) makes a directory for the traces of a request that
+    produced no files. thread_prefixes name the threads (besides the one
+    running the request) that do its work, e.g. the pipeline stages.
+    """
+    
+    def __init__(self, new_dir, sample_rate=0.0, slow_seconds=0.0, keep=20, interval=0.01,
+                 thread_prefixes=("pipeline-",)):
+        self.new_dir = new_dir
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.keep = keep
+        self.interval = interval
+        self.thread_prefixes = tuple(thread_prefixes)
+        self.counters = {"profiled": 0, "kept": 0, "flagged": 0, "removed": 0}
+        self.slow = deque(maxlen=20)  # recent slow requests: {"mode", "seconds", "trace"}
+        self._traces = deque()  # trace directories, oldest first
+        self._lock = threading.Lock()
+    
+    def _reason(self):
+        """Why the next request is fully profiled, or None"""
+        if forced():
+            return "requested"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+    
+    @contextmanager
+    def _capture(self, mode, reason, holder):
+        """Profile the block; holder["result"] is set by the caller before it ends"""
+        start = time.perf_counter()
+        with StackSampler([threading.get_ident()], self.thread_prefixes, self.interval) as sampler:
+            if reason is not None:
+                with _torch_profile() as prof:
+                    yield
+            else:
+                prof = None
+                yield
+        seconds = time.perf_counter() - start
+        
+        slow = bool(self.slow_seconds) and seconds > self.slow_seconds
+        result = holder.get("result")
+        if slow:
+            with self._lock:
+                self.counters["flagged"] += 1
+            metrics.inc("world3d_slow_requests_total", mode=mode)
+            reason = reason or "slow"
+        with self._lock:
+            self.counters["profiled"] += 1
+        if reason is None or _cached(result):
+            return  # fast, or answered from the cache: nothing worth keeping
+        
+        trace_dir = self._save(mode, reason, seconds, result, sampler, prof)
+        if slow:
+            print(f"Slow request: {mode} took {seconds:.1f}s (threshold {self.slow_seconds:g}s), profile in {trace_dir}")
+            with self._lock:
+                self.slow.append({"mode": mode, "seconds": seconds, "trace": str(trace_dir)})
+        holder["trace"] = trace_dir
+    
+    def _save(self, mode, reason, seconds, result, sampler, prof):
+        output = _main_output(result)
+        trace_dir = (Path(output).parent if output else self.new_dir("profile_")) / PROFILE_DIR
+        trace_dir.mkdir(parents=True, exist_ok=True)
+        (trace_dir / "stacks.txt").write_text(sampler.folded())
+        summary = {
+            "mode": mode,
+            "reason": reason,
+            "seconds": seconds,
+            "finished_at": time.time(),
+            "pid": os.getpid(),
+            "stack_samples": sampler.samples,
+            "sample_interval_seconds": self.interval,
+            "hottest_frames": sampler.hottest(),
+        }
+        if prof is not None:
+            try:
+                prof.export_chrome_trace(str(trace_dir / "torch.json"))
+                sort_by = "self_cuda_time_total" if "CUDA" in str(prof.activities) else "self_cpu_time_total"
+                (trace_dir / "torch_ops.txt").write_text(prof.key_averages().table(sort_by=sort_by, row_limit=50))
+            except Exception as e:
+                summary["torch_error"] = str(e)
+        (trace_dir / "profile.json").write_text(json.dumps(summary, indent=2))
+        
+        with self._lock:
+            self.counters["kept"] += 1
+            self._traces.append(trace_dir)
+            expired = [self._traces.popleft() for _ in range(max(len(self._traces) - self.keep, 0))]
+            self.counters["removed"] += len(expired)
+        for old in expired:
+            shutil.rmtree(old, ignore_errors=True)
+        return trace_dir
+    
+    def profiled(self, mode):
+        """Decorator that profiles a generate function (plain or streaming) when its request is selected
+        
+        A kept profile is named in the status message of the result.
+        """
+        def decorate(fn):
+            if inspect.isgeneratorfunction(fn):
+                @functools.wraps(fn)
+                def streaming(*args, **kwargs):
+                    reason = self._reason()
+                    if reason is None and not self.slow_seconds:
+                        yield from fn(*args, **kwargs)
+                        return
+                    holder = {}
+                    with self._capture(mode, reason, holder):
+                        for holder["result"] in fn(*args, **kwargs):
+                            yield holder["result"]
+                    if holder.get("trace") is not None:
+                        # The final result again, now naming its profile
+                        yield _annotate(holder["result"], holder["trace"])
+                return streaming
+            
+            @functools.wraps(fn)
+            def plain(*args, **kwargs):
+                reason = self._reason()
+                if reason is None and not self.slow_seconds:
+                    return fn(*args, **kwargs)
+                holder = {}
+                with self._capture(mode, reason, holder):
+                    holder["result"] = fn(*args, **kwargs)
+                return _annotate(holder["result"], holder.get("trace"))
+            return plain
+        return decorate
+    
+    def stats(self):
+        with self._lock:
+            return {**self.counters, "traces": len(self._traces), "slow": list(self.slow)}
+    
+    def report(self):
+        """One line for the status panel"""
+        stats = self.stats()
+        line = (f"{stats['profiled']} profiled, {stats['kept']} kept ({stats['traces']} on disk), "
+                f"{stats['flagged']} slow")
+        if stats["slow"]:
+            last = stats["slow"][-1]
+            line += f"; last slow: {last['mode']} {last['seconds']:.1f}s in {last['trace']}"
+        return line
+
+def _main_output(result):
+    """Path of the main output file of a (..., file, message) result, or None"""
+    if not result or len(result) < 2 or not isinstance(result[-2], (str, Path)):
+        return None
+    return result[-2]
+
+def _cached(result):
+    return bool(result) and "(cached)" in str(result[-1] or "")
+
+def _annotate(result, trace_dir):
+    """result with the trace directory added to its status message"""
+    if trace_dir is None:
+        return result
+    return (*result[:-1], f"{result[-1]}\nProfile: {trace_dir}")
+
+def from_env(new_dir, thread_prefixes=("pipeline-",)):
+    """Profiler configured by WORLD3D_PROFILE_SAMPLE, WORLD3D_PROFILE_SLOW_S and WORLD3D_PROFILE_KEEP"""
+    return RequestProfiler(
+        new_dir,
+        sample_rate=float(os.environ.get("WORLD3D_PROFILE_SAMPLE", "0")),
+        slow_seconds=float(os.environ.get("WORLD3D_PROFILE_SLOW_S", "0")),
+        keep=int(os.environ.get("WORLD3D_PROFILE_KEEP", "20")),
+        interval=float(os.environ.get("WORLD3D_PROFILE_INTERVAL_MS", "10")) / 1000,
+        thread_prefixes=thread_prefixes
+    )
\ No newline at end of file
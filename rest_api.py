@@ -0,0 +1,303 @@
+"""
+JSON API next to the Gradio UI
+Integrations submit generations and poll for them without going through
+Gradio's queue protocol. Handlers are async and only touch in-memory job
+state; generations run on the app's job scheduler (worker pool) and the
+blocking parts of a submission (input hashing, saving an uploaded image) run
+in a thread, so the event loop never waits on the GPU or the disk.
+    
+    GET    /api/v1/modes                  modes and their parameters
+    POST   /api/v1/{mode}                 submit a job (JSON body) -> 202 {"job_id", ...}
+                                          ?profile=1 profiles it (see request_profiler)
+                                          ?deadline=<seconds> rejects it (503) if it would finish later
+    GET    /api/v1/jobs/{job_id}          status, queue position, progress
+    GET    /api/v1/jobs/{job_id}/result   artifact URLs once done (202 while pending)
+    DELETE /api/v1/jobs/{job_id}          cancel a job that has not started
+                                          (identical requests share a job: this only detaches)
+    
+    GET    /healthz                       liveness: the server answers
+    GET    /readyz                        readiness: 200 once the models are warm, 503 before
+
+Status and result accept ?wait=<seconds> (up to 30) to hold the request until
+the job finishes. Image modes take the input image as base64 ("image").
+Artifact URLs point at the /files/<root>/<path> range route of mapped_io.
+Jobs share the scheduler fairly per user: the X-User header, else the client
+address.
+"""
+
+import asyncio
+import base64
+import binascii
+import itertools
+import secrets
+import time
+from pathlib import Path
+
+from batch_runner import APPS, DEFAULTS, MODES
+from job_queue import QueueFullError
+from request_profiler import PROFILE_DIR
+
+# Names of the file outputs of each backend's generate functions (the last output is the status message)
+OUTPUTS = {"hunyuan": ["panorama", "mesh"], "worldgen": ["scene"]}
+MAX_WAIT_SECONDS = 30.0
+
+def functions_for(module, app_name):
+    """{mode: generate function} served by an app module (see batch_runner.APPS)"""
+    functions = {}
+    for _, (_, names) in APPS[app_name].items():
+        for mode, name in names.items():
+            functions[mode] = getattr(module, name)
+    return functions
+
+def add_health_routes(app, readiness):
+    """Liveness (GET /healthz) and readiness (GET /readyz) routes for load balancers and Docker
+    
+    readiness() returns (ready, details); /readyz answers 200 when ready and
+    503 otherwise, with the details (e.g. warm-up steps) as JSON. /healthz
+    only shows that the server's event loop still answers.
+    """
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+    
+    started_at = time.time()
+    
+    async def healthz(request):
+        return JSONResponse({"status": "alive", "uptime_seconds": round(time.time() - started_at, 1)})
+    
+    async def readyz(request):
+        ready, details = readiness()
+        return JSONResponse({"status": "ready" if ready else "starting", **details},
+                            status_code=200 if ready else 503)
+    
+    app.router.routes[:0] = [
+        Route("/healthz", healthz, methods=["GET"]),
+        Route("/readyz", readyz, methods=["GET"]),
+    ]
+
+class JobApi:
+    """Job submission and polling routes for a set of generate functions
+    
+    submit(backend, mode, fn, args) must return a job_queue.Job without
+    blocking on the generation, and accept profile=True for ?profile=1,
+    deadline= (seconds) and user=; roots ({name: directory}) are the directories
+    served by the file route, used to turn output paths into URLs.
+    """
+    
+    def __init__(self, functions, submit, roots, new_dir, prefix="/api/v1", files_prefix="/files",
+                 max_jobs=1000, ttl_seconds=3600):
+        self.functions = dict(functions)
+        self.submit_job = submit
+        self.roots = {name: Path(root).resolve() for name, root in roots.items()}
+        self.new_dir = new_dir
+        self.prefix = prefix
+        self.files_prefix = files_prefix
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self.counters = {"submitted": 0, "rejected": 0, "status_requests": 0, "result_requests": 0}
+        self._jobs = {}  # job id -> (job, mode), oldest first
+        self._left = set()  # job ids whose caller cancelled (or detached from a shared job)
+        self._sequence = itertools.count(1)
+    
+    def mount(self, app):
+        """Add the routes to a Starlette/FastAPI app, ahead of its own routes"""
+        from starlette.routing import Route
+        
+        routes = [
+            Route(f"{self.prefix}/modes", self.modes, methods=["GET"]),
+            Route(f"{self.prefix}/jobs/{{job_id}}/result", self.result, methods=["GET"]),
+            Route(f"{self.prefix}/jobs/{{job_id}}", self.status, methods=["GET"]),
+            Route(f"{self.prefix}/jobs/{{job_id}}", self.cancel, methods=["DELETE"]),
+            Route(f"{self.prefix}/{{mode}}", self.submit, methods=["POST"]),
+        ]
+        app.router.routes[:0] = routes
+    
+    # Helpers
+    
+    def _json(self, content, status_code=200, headers=None):
+        from starlette.responses import JSONResponse
+        return JSONResponse(content, status_code=status_code, headers=headers)
+    
+    def _error(self, status_code, message, headers=None):
+        return self._json({"error": message}, status_code=status_code, headers=headers)
+    
+    def _arguments(self, mode, body):
+        """Positional arguments of the generate function from a JSON body; may save an upload"""
+        _, names = MODES[mode]
+        unknown = set(body) - set(names)
+        if unknown:
+            raise ValueError(f"unknown parameters: {', '.join(sorted(unknown))}")
+        args = [body.get(name, DEFAULTS[name]) for name in names]
+        if "image" in names:
+            image = body.get("image")
+            if not image:
+                raise ValueError("image is required (base64 encoded)")
+            args[names.index("image")] = self._save_image(image)
+        return args
+    
+    def _save_image(self, encoded):
+        if encoded.startswith("data:"):
+            encoded = encoded.partition(",")[2]
+        try:
+            data = base64.b64decode(encoded, validate=True)
+        except (binascii.Error, ValueError):
+            raise ValueError("image is not valid base64")
+        path = self.new_dir("upload_") / "input.png"
+        path.write_bytes(data)
+        return str(path)
+    
+    def _url(self, request, path):
+        """URL of an output file under one of the served roots, or None"""
+        if not path:
+            return None
+        resolved = Path(path).resolve()
+        for name, root in self.roots.items():
+            if root in resolved.parents:
+                relative = resolved.relative_to(root).as_posix()
+                return f"{str(request.base_url).rstrip('/')}{self.files_prefix}/{name}/{relative}"
+        return None
+    
+    def _prune(self):
+        """Forget finished jobs past the TTL, and the oldest finished ones over max_jobs"""
+        now = time.time()
+        finished = [key for key, (job, _) in self._jobs.items() if job.done()]
+        for key in finished:
+            job, _ = self._jobs[key]
+            if now - job.finished_at > self.ttl_seconds or len(self._jobs) > self.max_jobs:
+                del self._jobs[key]
+                self._left.discard(key)
+    
+    async def _lookup(self, request):
+        """(job id, job, mode) of the request, after an optional ?wait for it to finish"""
+        job_id = request.path_params["job_id"]
+        entry = self._jobs.get(job_id)
+        if entry is None:
+            return job_id, None, None
+        job, mode = entry
+        try:
+            wait = min(float(request.query_params.get("wait", 0)), MAX_WAIT_SECONDS)
+        except ValueError:
+            wait = 0.0
+        # Poll instead of blocking a thread per waiting client
+        deadline = time.monotonic() + wait
+        while not job.done() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return job_id, job, mode
+    
+    def _describe(self, job_id, job, mode):
+        if job.status == "done" and job.result:
+            message = job.result[-1]
+        elif job.latest is not None:
+            message = job.latest[-1]
+        else:
+            message = job.describe()
+        return {
+            "job_id": job_id,
+            "mode": mode,
+            "status": job.status,
+            "position": job.position(),
+            "message": message,
+            "queue_seconds": round(job.queue_seconds(), 3),
+            "run_seconds": round(job.run_seconds(), 3),
+        }
+    
+    # Routes
+    
+    async def modes(self, request):
+        return self._json({
+            mode: {"backend": MODES[mode][0], "parameters": {name: DEFAULTS[name] for name in MODES[mode][1]}}
+            for mode in self.functions
+        })
+    
+    async def submit(self, request):
+        mode = request.path_params["mode"]
+        if mode not in self.functions:
+            return self._error(404, f"unknown mode {mode!r}; see {self.prefix}/modes")
+        try:
+            body = await request.json()
+        except ValueError:
+            return self._error(400, "request body must be a JSON object")
+        if not isinstance(body, dict):
+            return self._error(400, "request body must be a JSON object")
+        
+        backend = MODES[mode][0]
+        options = {"user": request.headers.get("x-user") or (request.client.host if request.client else None)}
+        if request.query_params.get("profile") in ("1", "true"):
+            options["profile"] = True
+        if "deadline" in request.query_params:
+            try:
+                options["deadline"] = float(request.query_params["deadline"])
+            except ValueError:
+                return self._error(400, "deadline must be a number of seconds")
+        
+        def submit():
+            return self.submit_job(backend, mode, self.functions[mode], self._arguments(mode, body), **options)
+        
+        try:
+            job = await asyncio.to_thread(submit)
+        except ValueError as e:
+            return self._error(400, str(e))
+        except QueueFullError as e:
+            self.counters["rejected"] += 1
+            return self._error(503, str(e), headers={"Retry-After": "5"})
+        
+        self._prune()
+        job_id = f"{next(self._sequence)}-{secrets.token_hex(6)}"
+        self._jobs[job_id] = (job, mode)
+        self.counters["submitted"] += 1
+        base = f"{str(request.base_url).rstrip('/')}{self.prefix}/jobs/{job_id}"
+        return self._json(
+            {**self._describe(job_id, job, mode), "status_url": base, "result_url": f"{base}/result"},
+            status_code=202
+        )
+    
+    async def status(self, request):
+        self.counters["status_requests"] += 1
+        job_id, job, mode = await self._lookup(request)
+        if job is None:
+            return self._error(404, f"unknown job {job_id}")
+        return self._json(self._describe(job_id, job, mode))
+    
+    async def result(self, request):
+        self.counters["result_requests"] += 1
+        job_id, job, mode = await self._lookup(request)
+        if job is None:
+            return self._error(404, f"unknown job {job_id}")
+        info = self._describe(job_id, job, mode)
+        if not job.done():
+            return self._json(info, status_code=202)
+        if job.status == "cancelled":
+            return self._json(info, status_code=409)
+        if job.status == "failed":
+            return self._json({**info, "error": str(job.error)}, status_code=500)
+        
+        # The generate functions report their own errors as a message with no files
+        *files, message = job.result
+        outputs = {name: self._url(request, path) for name, path in zip(OUTPUTS[MODES[mode][0]], files)}
+        if not any(files):
+            return self._json({**info, "status": "failed", "error": message}, status_code=500)
+        profile = Path(files[-1]).parent / PROFILE_DIR if files[-1] else None
+        if profile is not None and profile.is_dir():
+            outputs["profile"] = {path.name: self._url(request, path) for path in sorted(profile.iterdir())}
+        return self._json({**info, "message": message, "outputs": outputs})
+    
+    async def cancel(self, request):
+        job_id = request.path_params["job_id"]
+        entry = self._jobs.get(job_id)
+        if entry is None:
+            return self._error(404, f"unknown job {job_id}")
+        job, mode = entry
+        if job_id in self._left:
+            return self._json({**self._describe(job_id, job, mode), "cancelled": False, "detached": True},
+                              status_code=409)
+        cancelled = job.cancel()
+        # A job shared with identical requests keeps running for the others
+        detached = getattr(job, "detached", False) and not cancelled
+        if cancelled or detached:
+            self._left.add(job_id)
+        return self._json({**self._describe(job_id, job, mode), "cancelled": cancelled, "detached": detached},
+                          status_code=200 if cancelled or detached else 409)
+    
+    def stats(self):
+        """Counters plus the number of jobs the API still tracks"""
+        pending = sum(not job.done() for job, _ in list(self._jobs.values()))
+        return {**self.counters, "tracked": len(self._jobs), "pending": pending}
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+Content-addressed cache for generation results
+Entries are keyed on the generation mode, model version, normalized
+parameters and the hash of any input image, and hold copies of the output
+files (panoramas, GLB meshes, PLY splats). The cache is bounded in size and
+evicts the least recently used entries first.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def model_version(repo_path, suffix=""):
+    """Version string for a cloned model repo: its git commit, or 'unknown'"""
+    git_dir = Path(repo_path) / ".git"
+    commit = "unknown"
+    try:
+        head = (git_dir / "HEAD").read_text().strip()
+        if head.startswith("ref: "):
+            ref = head[5:]
+            ref_file = git_dir / ref
+            if ref_file.exists():
+                commit = ref_file.read_text().strip()
+            else:
+                for line in (git_dir / "packed-refs").read_text().splitlines():
+                    if line.endswith(" " + ref):
+                        commit = line.split()[0]
+        else:
+            commit = head
+    except OSError:
+        pass
+    return f"{Path(repo_path).name}@{commit[:12]}{suffix}"
+
+def cache_key(mode, version, params, image_path=None):
+    """Stable key for a request: mode, model version, params and image bytes"""
+    payload = {
+        "mode": mode,
+        "version": version,
+        "params": params,
+        "image": file_sha256(image_path) if image_path else None,
+    }
+    text = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def _dir_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+class ResultCache:
+    """Disk-backed, size-bounded LRU cache of output files"""
+    
+    META = "meta.json"
+    
+    def __init__(self, root, max_bytes, scan=True):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, least recent first
+        self.root.mkdir(parents=True, exist_ok=True)
+        if scan:
+            self.scan()
+    
+    def scan(self):
+        """Index the entries on disk, ordered by last access time
+        
+        Can run after the cache is in use (e.g. in the background at
+        start-up): entries used in the meantime stay the most recent.
+        """
+        found = []
+        for meta in self.root.glob(f"*/*/{self.META}"):
+            entry = meta.parent
+            try:
+                found.append((meta.stat().st_mtime, entry.name, _dir_size(entry)))
+            except OSError:
+                continue  # evicted while scanning
+        
+        with self._lock:
+            entries = OrderedDict((key, size) for _, key, size in sorted(found) if key not in self._entries)
+            entries.update(self._entries)
+            self._entries = entries
+        
+        # Leftovers of interrupted stores (not the ones this process is writing)
+        for tmp in self.root.glob("*/.tmp-*"):
+            if f"-{os.getpid()}-" not in tmp.name:
+                shutil.rmtree(tmp, ignore_errors=True)
+    
+    def _entry_dir(self, key):
+        return self.root / key[:2] / key
+    
+    def get(self, key, record_miss=True):
+        """Return {file name: path} for a cached entry, or None on a miss
+        
+        record_miss=False is for fast-path lookups that are followed by a
+        second, counted lookup, so a miss is not counted twice.
+        """
+        with self._lock:
+            entry = self._entry_dir(key)
+            if key not in self._entries:
+                # Stored by another process sharing the root (e.g. a pool worker)?
+                if not (entry / self.META).exists():
+                    if record_miss:
+                        self.counters["misses"] += 1
+                    return None
+                self._entries[key] = _dir_size(entry)
+            
+            meta = entry / self.META
+            try:
+                files = json.loads(meta.read_text())["files"]
+                os.utime(meta)  # record the access for LRU order on restart
+            except (OSError, ValueError, KeyError):
+                # Entry deleted or corrupted behind our back
+                self._entries.pop(key, None)
+                if record_miss:
+                    self.counters["misses"] += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+        return {name: entry / name for name in files}
+    
+    def put(self, key, files, meta=None):
+        """Copy files ({name: source path}) into the cache under key
+        
+        Returns {name: cached path}. Files are linked when the source is on
+        the same filesystem and copied otherwise.
+        """
+        entry = self._entry_dir(key)
+        tmp = entry.parent / f".tmp-{key}-{os.getpid()}-{threading.get_ident()}"
+        tmp.mkdir(parents=True, exist_ok=True)
+        
+        for name, source in files.items():
+            target = tmp / name
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+        
+        (tmp / self.META).write_text(json.dumps({
+            "files": list(files),
+            "created_at": time.time(),
+            "meta": meta or {},
+        }))
+        size = _dir_size(tmp)
+        
+        with self._lock:
+            try:
+                tmp.rename(entry)
+                self.counters["stores"] += 1
+            except OSError:
+                # Another request (or process) stored the same result first
+                shutil.rmtree(tmp, ignore_errors=True)
+            self._entries.setdefault(key, size)
+            self._entries.move_to_end(key)
+            self._evict(keep=key)
+        
+        return {name: entry / name for name in files}
+    
+    def _evict(self, keep=None):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        while sum(self._entries.values()) > self.max_bytes:
+            victim = next((k for k in self._entries if k != keep), None)
+            if victim is None:
+                return
+            del self._entries[victim]
+            shutil.rmtree(self._entry_dir(victim), ignore_errors=True)
+            self.counters["evictions"] += 1
+    
+    def stats(self):
+        """Counters plus hit rate, entry count and total size"""
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": sum(self._entries.values()),
+                "max_bytes": self.max_bytes,
+            }
\ No newline at end of file
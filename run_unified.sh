@@ -0,0 +1,30 @@
+#!/bin/bash
+
+echo "🚀 Starting 3D World Generation Studio (unified)..."
+
+for env in hunyuan_env worldgen_env; do
+    if conda env list | grep -q "$env"; then
+        echo "✅ Environment found: $env"
+    else
+        echo "❌ Environment '$env' not found!"
+        echo "Please run ./setup_hunyuan.sh and ./setup_worldgen.sh first"
+        exit 1
+    fi
+done
+
+eval "$(conda shell.bash hook)"
+
+# Each backend runs in a worker process started with its own env's Python;
+# the UI process only serves requests and hands them to the workers
+export WORLD3D_HUNYUAN_PYTHON="$(conda run -n hunyuan_env python -c 'import sys; print(sys.executable)')"
+export WORLD3D_WORLDGEN_PYTHON="$(conda run -n worldgen_env python -c 'import sys; print(sys.executable)')"
+echo "🐍 HunyuanWorld worker: $WORLD3D_HUNYUAN_PYTHON"
+echo "🐍 WorldGen worker: $WORLD3D_WORLDGEN_PYTHON"
+
+conda activate worldgen_env
+
+echo "🌍 Launching unified app..."
+echo "📡 Port: 7860"
+echo ""
+
+python app.py
@@ -0,0 +1,349 @@
+"""
+Gaussian splat PLY reader/writer and compressed splat format
+WorldGen saves splats as float32 3DGS PLY files (position, SH colour,
+opacity, log scale, rotation quaternion). This module converts them to and
+from the chunked "compressed PLY" layout used by PlayCanvas and SuperSplat:
+
+- splats are sorted along a Morton curve and grouped in chunks of 256, so
+  each chunk covers a small region and a file can be drawn as it streams in
+- per chunk, positions and log scales are quantized to 11/10/11 bits inside
+  the chunk bounds and colours to 8 bits inside the chunk colour range
+- rotations use the "smallest three" encoding (2 + 3 x 10 bits)
+- higher order spherical harmonics are stored as 8-bit values
+- splats below an opacity threshold can be pruned
+
+The result is about 16 bytes per splat plus 1 byte per SH coefficient,
+against 4 bytes per property (248 bytes at SH degree 3) in the float file.
+    
+    python splat_io.py compress scene_splat.ply scene_splat.compressed.ply --prune 0.005
+    python splat_io.py decompress scene_splat.compressed.ply scene_splat.ply
+"""
+
+import argparse
+import math
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from mapped_io import map_ply, read_ply_header
+
+CHUNK_SIZE = 256
+SH_C0 = 0.28209479177387814
+ROTATION_NORM = math.sqrt(2) * 0.5
+
+TYPE_NAMES = {"<f4": "float", "<u4": "uint", "u1": "uchar"}
+
+CHUNK_PROPERTIES = [
+    "min_x", "min_y", "min_z", "max_x", "max_y", "max_z",
+    "min_scale_x", "min_scale_y", "min_scale_z", "max_scale_x", "max_scale_y", "max_scale_z",
+    "min_r", "min_g", "min_b", "max_r", "max_g", "max_b",
+]
+VERTEX_PROPERTIES = ["packed_position", "packed_rotation", "packed_scale", "packed_color"]
+
+def _write_elements(path, elements, comment=None):
+    """Write [(element, structured array)] as a binary little endian PLY"""
+    header = ["ply", "format binary_little_endian 1.0"]
+    if comment:
+        header.append(f"comment {comment}")
+    for name, array in elements:
+        header.append(f"element {name} {len(array)}")
+        for field in array.dtype.names:
+            header.append(f"property {TYPE_NAMES[array.dtype[field].str.replace('|', '')]} {field}")
+    header.append("end_header")
+    # Written next to the target and swapped in, so memory maps of the old file
+    # (e.g. the input of an in-place rewrite) stay valid
+    temp = Path(f"{path}.tmp")
+    with open(temp, "wb") as f:
+        f.write(("\n".join(header) + "\n").encode("ascii"))
+        for _, array in elements:
+            f.write(array.tobytes())
+    os.replace(temp, path)
+
+def _structured(columns, dtype):
+    """Structured array with one field per {name: column}"""
+    names = list(columns)
+    array = np.empty(len(columns[names[0]]) if names else 0, dtype=[(name, dtype) for name in names])
+    for name in names:
+        array[name] = columns[name]
+    return array
+
+def is_compressed(path):
+    with open(path, "rb") as f:
+        return any(name == "chunk" for name, _, _ in read_ply_header(f))
+
+def read_splat(path):
+    """Read a float or compressed splat PLY as {property: float32 array}"""
+    elements = map_ply(path)
+    if "chunk" in elements:
+        return decode(elements["chunk"], elements["vertex"], elements.get("sh"))
+    vertex = elements["vertex"]
+    # Float32 properties stay (strided, read-only) views of the mapped file
+    return {name: vertex[name].astype(np.float32, copy=False) for name in vertex.dtype.names}
+
+def write_splat(path, data):
+    """Write {property: array} as a float32 3DGS PLY"""
+    _write_elements(path, [("vertex", _structured(data, "<f4"))])
+
+def sh_rest_names(data):
+    return sorted((name for name in data if name.startswith("f_rest_")), key=lambda n: int(n[7:]))
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+def _pack_unorm(values, bits):
+    top = (1 << bits) - 1
+    return np.clip(np.floor(values * top + 0.5), 0, top).astype(np.uint32)
+
+def _unpack_unorm(values, bits):
+    top = (1 << bits) - 1
+    return (values & top).astype(np.float32) / top
+
+def _pack_111011(normalized):
+    return (
+        (_pack_unorm(normalized[:, 0], 11) << 21)
+        | (_pack_unorm(normalized[:, 1], 10) << 11)
+        | _pack_unorm(normalized[:, 2], 11)
+    )
+
+def _unpack_111011(packed):
+    return np.stack([
+        _unpack_unorm(packed >> 21, 11),
+        _unpack_unorm(packed >> 11, 10),
+        _unpack_unorm(packed, 11),
+    ], axis=1)
+
+def _spread_bits(v):
+    """Insert two zero bits between the low 10 bits of v (for Morton codes)"""
+    v = v.astype(np.uint64) & 0x3FF
+    v = (v | (v << 16)) & 0x030000FF
+    v = (v | (v << 8)) & 0x0300F00F
+    v = (v | (v << 4)) & 0x030C30C3
+    v = (v | (v << 2)) & 0x09249249
+    return v
+
+def morton_order(positions):
+    """Indices that sort positions along a 30-bit Morton (Z-order) curve"""
+    low = positions.min(axis=0)
+    extent = np.maximum(positions.max(axis=0) - low, 1e-12)
+    cells = np.clip((positions - low) / extent * 1023, 0, 1023).astype(np.uint32)
+    codes = _spread_bits(cells[:, 0]) << 2 | _spread_bits(cells[:, 1]) << 1 | _spread_bits(cells[:, 2])
+    return np.argsort(codes, kind="stable")
+
+def _chunk_bounds(values, num_chunks):
+    """Per-chunk (min, max) of an (N, K) array; the last chunk is padded with its last row"""
+    padded = np.pad(values, ((0, num_chunks * CHUNK_SIZE - len(values)), (0, 0)), mode="edge")
+    chunks = padded.reshape(num_chunks, CHUNK_SIZE, -1)
+    return chunks.min(axis=1), chunks.max(axis=1)
+
+def _normalize(values, low, high, chunk_index):
+    span = high - low
+    span = np.where(span > 0, span, 1.0)
+    return (values - low[chunk_index]) / span[chunk_index]
+
+def encode(data, prune_opacity=0.0):
+    """Quantize float splats into (chunk, vertex, sh, kept indices)
+    
+    kept holds the original index of every encoded splat, in file order.
+    """
+    positions = np.stack([data["x"], data["y"], data["z"]], axis=1).astype(np.float32)
+    kept = np.arange(len(positions))
+    if prune_opacity > 0:
+        kept = kept[_sigmoid(data["opacity"]) >= prune_opacity]
+    if not len(kept):
+        raise ValueError("no splats left after pruning")
+    kept = kept[morton_order(positions[kept])]
+    
+    positions = positions[kept]
+    scales = np.clip(np.stack([data[f"scale_{i}"][kept] for i in range(3)], axis=1), -20, 20)
+    colors = np.stack([data[f"f_dc_{i}"][kept] for i in range(3)], axis=1) * SH_C0 + 0.5
+    opacity = _sigmoid(data["opacity"][kept])
+    # 3DGS stores rot_0 = w; pack in x, y, z, w order
+    quats = np.stack([data["rot_1"], data["rot_2"], data["rot_3"], data["rot_0"]], axis=1)[kept]
+    
+    count = len(kept)
+    num_chunks = -(-count // CHUNK_SIZE)
+    chunk_index = np.arange(count) // CHUNK_SIZE
+    pos_low, pos_high = _chunk_bounds(positions, num_chunks)
+    scale_low, scale_high = _chunk_bounds(scales, num_chunks)
+    color_low, color_high = _chunk_bounds(colors, num_chunks)
+    chunk = np.concatenate([pos_low, pos_high, scale_low, scale_high, color_low, color_high], axis=1)
+    
+    # Smallest three: drop the largest component (made positive) and store the rest
+    norms = np.linalg.norm(quats, axis=1, keepdims=True)
+    quats = quats / np.where(norms > 0, norms, 1.0)
+    largest = np.argmax(np.abs(quats), axis=1)
+    quats *= np.where(quats[np.arange(count), largest] < 0, -1.0, 1.0)[:, None]
+    rest = quats[np.arange(4)[None, :] != largest[:, None]].reshape(count, 3) * ROTATION_NORM + 0.5
+    rotation = (
+        (largest.astype(np.uint32) << 30)
+        | (_pack_unorm(rest[:, 0], 10) << 20)
+        | (_pack_unorm(rest[:, 1], 10) << 10)
+        | _pack_unorm(rest[:, 2], 10)
+    )
+    
+    normalized_color = np.clip(_normalize(colors, color_low, color_high, chunk_index), 0, 1)
+    color = (
+        (_pack_unorm(normalized_color[:, 0], 8) << 24)
+        | (_pack_unorm(normalized_color[:, 1], 8) << 16)
+        | (_pack_unorm(normalized_color[:, 2], 8) << 8)
+        | _pack_unorm(opacity, 8)
+    )
+    
+    vertex = _structured({
+        "packed_position": _pack_111011(_normalize(positions, pos_low, pos_high, chunk_index)),
+        "packed_rotation": rotation,
+        "packed_scale": _pack_111011(_normalize(scales, scale_low, scale_high, chunk_index)),
+        "packed_color": color,
+    }, "<u4")
+    
+    sh = None
+    rest_names = sh_rest_names(data)
+    if rest_names:
+        sh = _structured({
+            name: np.clip(np.trunc((data[name][kept] / 8 + 0.5) * 256), 0, 255).astype(np.uint8)
+            for name in rest_names
+        }, "u1")
+    
+    return _structured(dict(zip(CHUNK_PROPERTIES, chunk.T)), "<f4"), vertex, sh, kept
+
+def decode(chunk, vertex, sh=None, start=0):
+    """Float splat properties of compressed vertices
+    
+    start is the index of the first vertex, for decoding a slice of a file.
+    """
+    count = len(vertex)
+    chunk_index = (start + np.arange(count)) // CHUNK_SIZE
+    bounds = np.stack([chunk[name] for name in CHUNK_PROPERTIES], axis=1)[chunk_index]
+    pos_low, pos_high = bounds[:, 0:3], bounds[:, 3:6]
+    scale_low, scale_high = bounds[:, 6:9], bounds[:, 9:12]
+    color_low, color_high = bounds[:, 12:15], bounds[:, 15:18]
+    
+    positions = pos_low + _unpack_111011(vertex["packed_position"]) * (pos_high - pos_low)
+    scales = scale_low + _unpack_111011(vertex["packed_scale"]) * (scale_high - scale_low)
+    
+    packed = vertex["packed_color"]
+    normalized = np.stack([_unpack_unorm(packed >> shift, 8) for shift in (24, 16, 8)], axis=1)
+    colors = color_low + normalized * (color_high - color_low)
+    opacity = np.clip(_unpack_unorm(packed, 8), 1e-6, 1 - 1e-6)
+    
+    packed = vertex["packed_rotation"]
+    rest = (np.stack([_unpack_unorm(packed >> shift, 10) for shift in (20, 10, 0)], axis=1) - 0.5) / ROTATION_NORM
+    largest = (packed >> 30).astype(np.int64)
+    quats = np.empty((count, 4), dtype=np.float32)
+    mask = np.arange(4)[None, :] == largest[:, None]
+    quats[mask] = np.sqrt(np.maximum(0.0, 1.0 - (rest ** 2).sum(axis=1)))
+    quats[~mask] = rest.reshape(-1)
+    
+    data = {"x": positions[:, 0], "y": positions[:, 1], "z": positions[:, 2]}
+    for i in range(3):
+        data[f"f_dc_{i}"] = (colors[:, i] - 0.5) / SH_C0
+    if sh is not None:
+        for name in sh.dtype.names:
+            data[name] = ((sh[name].astype(np.float32) + 0.5) / 256 - 0.5) * 8
+    data["opacity"] = -np.log(1.0 / opacity - 1.0)
+    for i in range(3):
+        data[f"scale_{i}"] = scales[:, i]
+    data["rot_0"] = quats[:, 3]
+    for i in range(3):
+        data[f"rot_{i + 1}"] = quats[:, i]
+    return {name: np.asarray(values, dtype=np.float32) for name, values in data.items()}
+
+def write_compressed(path, chunk, vertex, sh=None):
+    elements = [("chunk", chunk), ("vertex", vertex)]
+    if sh is not None:
+        elements.append(("sh", sh))
+    _write_elements(path, elements, comment="compressed splat (PlayCanvas layout)")
+
+def compress_file(source, target, prune_opacity=0.0):
+    """Convert a float splat PLY to the compressed format; returns size stats"""
+    start = time.perf_counter()
+    data = read_splat(source)
+    chunk, vertex, sh, kept = encode(data, prune_opacity)
+    write_compressed(target, chunk, vertex, sh)
+    source_bytes, target_bytes = Path(source).stat().st_size, Path(target).stat().st_size
+    return {
+        "splats": len(data["x"]),
+        "kept": len(kept),
+        "source_bytes": source_bytes,
+        "target_bytes": target_bytes,
+        "ratio": source_bytes / target_bytes,
+        "seconds": time.perf_counter() - start,
+    }
+
+def decompress_file(source, target):
+    """Convert a compressed splat PLY back to float32"""
+    write_splat(target, read_splat(source))
+
+def iter_compressed(path, chunks_per_step=64):
+    """Stream a compressed splat PLY: yield (start, {property: array}) per group of chunks
+    
+    Positions, colours, scales and rotations are available as soon as their
+    chunks are read; higher order SH (stored after all vertices) is left out.
+    """
+    with open(path, "rb") as f:
+        elements = {name: (count, np.dtype(properties)) for name, count, properties in read_ply_header(f)}
+        chunk_count, chunk_dtype = elements["chunk"]
+        chunk = np.frombuffer(f.read(chunk_count * chunk_dtype.itemsize), dtype=chunk_dtype)
+        count, vertex_dtype = elements["vertex"]
+        step = chunks_per_step * CHUNK_SIZE
+        for start in range(0, count, step):
+            size = min(step, count - start)
+            vertex = np.frombuffer(f.read(size * vertex_dtype.itemsize), dtype=vertex_dtype)
+            yield start, decode(chunk, vertex, start=start)
+
+def roundtrip_errors(data, prune_opacity=0.0):
+    """Encode and decode data in memory and measure what the quantization loses"""
+    chunk, vertex, sh, kept = encode(data, prune_opacity)
+    decoded = decode(chunk, vertex, sh)
+    
+    def stack(source, names, index=None):
+        columns = np.stack([source[name] for name in names], axis=1).astype(np.float64)
+        return columns[index] if index is not None else columns
+    
+    positions = stack(data, ["x", "y", "z"], kept)
+    diagonal = float(np.linalg.norm(positions.max(axis=0) - positions.min(axis=0))) or 1.0
+    position_error = np.linalg.norm(positions - stack(decoded, ["x", "y", "z"]), axis=1)
+    
+    rotation_names = ["rot_0", "rot_1", "rot_2", "rot_3"]
+    original = stack(data, rotation_names, kept)
+    original /= np.maximum(np.linalg.norm(original, axis=1, keepdims=True), 1e-12)
+    dot = np.abs((original * stack(decoded, rotation_names)).sum(axis=1)).clip(0, 1)
+    
+    colors = [f"f_dc_{i}" for i in range(3)]
+    scales = [f"scale_{i}" for i in range(3)]
+    errors = {
+        "splats": len(data["x"]),
+        "kept": len(kept),
+        "position_rmse_rel": float(np.sqrt((position_error ** 2).mean()) / diagonal),
+        "position_max_rel": float(position_error.max() / diagonal),
+        "log_scale_mae": float(np.abs(stack(data, scales, kept).clip(-20, 20) - stack(decoded, scales)).mean()),
+        "rotation_mean_deg": float(np.degrees(2 * np.arccos(dot)).mean()),
+        "color_mae": float(np.abs((stack(data, colors, kept) - stack(decoded, colors)) * SH_C0).mean()),
+        "opacity_mae": float(np.abs(_sigmoid(data["opacity"][kept]) - _sigmoid(decoded["opacity"])).mean()),
+    }
+    rest_names = sh_rest_names(data)
+    if rest_names:
+        errors["sh_rest_mae"] = float(np.abs(stack(data, rest_names, kept) - stack(decoded, rest_names)).mean())
+    return errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["compress", "decompress"])
+    parser.add_argument("source")
+    parser.add_argument("target")
+    parser.add_argument("--prune", type=float, default=0.0, help="drop splats below this opacity (compress)")
+    args = parser.parse_args()
+    
+    if args.command == "compress":
+        stats = compress_file(args.source, args.target, args.prune)
+        print(
+            f"{stats['kept']}/{stats['splats']} splats, {stats['source_bytes']} -> {stats['target_bytes']} bytes "
+            f"({stats['ratio']:.1f}x) in {stats['seconds']:.2f}s"
+        )
+    else:
+        decompress_file(args.source, args.target)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,38 @@
+"""
+Deadline admission of job_queue.JobScheduler
+    
+    python -m pytest tests
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from job_queue import CostModel, DeadlineError, JobScheduler
+
+def test_estimate_without_history_is_the_default():
+    model = CostModel(default=60.0)
+    assert model.estimate("worldgen", ("worldgen_text2scene", "fast")) == (60.0, False)
+    model.record("worldgen", ("worldgen_text2scene", "fast"), 2.0)
+    assert model.estimate("worldgen", ("worldgen_text2scene", "sharp")) == (2.0, True)
+
+def test_deadline_admits_jobs_without_history():
+    scheduler = JobScheduler(limits={"worldgen": 1})
+    # Well under the 60s default estimate: the job must still run and record its time
+    job = scheduler.submit("worldgen", lambda: "done", cost_key=("worldgen_text2scene",), deadline=5)
+    assert job.wait(5) and job.result == "done"
+    assert scheduler.stats()["estimates"]["worldgen_text2scene"]["runs"] == 1
+
+def test_deadline_rejects_once_measured():
+    scheduler = JobScheduler(limits={"worldgen": 1})
+    scheduler.cost_model.record("worldgen", ("worldgen_text2scene",), 30.0)
+    with pytest.raises(DeadlineError):
+        scheduler.submit("worldgen", lambda: None, cost_key=("worldgen_text2scene",), deadline=10)
+    gate = threading.Event()
+    job = scheduler.submit("worldgen", gate.set, cost_key=("worldgen_text2scene",), deadline=60)
+    assert job.wait(5) and gate.is_set()
+    assert scheduler.stats()["counters"]["deadline_rejected"] == 1
\ No newline at end of file
@@ -0,0 +1,536 @@
+"""
+Process pool of device-pinned model workers
+Each worker is a separate Python process pinned to one device (through
+CUDA_VISIBLE_DEVICES, so inside it the app's "cuda" is that GPU) that imports
+the app module and holds its own model replicas. The app process dispatches
+calls of the app's functions by name to the worker with the fewest calls in
+flight; streamed updates and results come back over a socket pair.
+
+Workers can be dedicated to one backend (group) and run by another Python
+interpreter, e.g. the conda env the backend was installed in, so HunyuanWorld
+(cu124) and WorldGen (cu128) run behind one app process. Calls and results
+carry file paths, not file contents: images and artifacts are handed over
+through the artifact store on the shared filesystem.
+
+Workers send a heartbeat every few seconds. A worker whose process exited or
+that stopped sending heartbeats is killed and started again with the same
+initializers (e.g. initialize_hunyuan); its calls in flight are retried once
+on another worker.
+    
+    WORLD3D_DEVICES=cuda:0,cuda:1,cuda:2,cuda:3 python app.py
+    WORLD3D_DEVICES=auto python app.py                             # every visible GPU
+    WORLD3D_FAKE_MODELS=1 WORLD3D_DEVICES=cpu,cpu,cpu python app.py  # CPU test with fake devices
+    
+    # One backend per conda env (see run_unified.sh)
+    export WORLD3D_HUNYUAN_PYTHON=/opt/conda/envs/hunyuan_env/bin/python
+    export WORLD3D_WORLDGEN_PYTHON=/opt/conda/envs/worldgen_env/bin/python
+    python app.py
+"""
+
+import argparse
+import functools
+import importlib
+import inspect
+import itertools
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from multiprocessing.connection import Connection
+
+class WorkerError(Exception):
+    """A call failed in a worker, or its worker died and the call could not be retried"""
+
+BACKENDS = ("hunyuan", "worldgen")
+
+def parse_devices(value):
+    """Device list from a WORLD3D_DEVICES value; "auto" is every visible CUDA device"""
+    value = (value or "").strip()
+    if value == "auto":
+        try:
+            import torch
+        except ImportError:
+            return []
+        return [f"cuda:{i}" for i in range(torch.cuda.device_count())]
+    return [device.strip() for device in value.split(",") if device.strip()]
+
+def specs_from_env(backends=BACKENDS):
+    """[(device, group, python)] of the workers configured in the environment
+    
+    WORLD3D_DEVICES alone gives workers shared by every backend (group None).
+    WORLD3D_<BACKEND>_PYTHON and WORLD3D_<BACKEND>_DEVICES give a backend its
+    own workers, on its own devices or those of WORLD3D_DEVICES; with only an
+    interpreter, one worker sees the devices visible to the app ("default").
+    """
+    if os.environ.get("WORLD3D_WORKER"):
+        return []  # no nested pools
+    shared = parse_devices(os.environ.get("WORLD3D_DEVICES"))
+    split = {
+        backend: (os.environ.get(f"WORLD3D_{backend.upper()}_PYTHON"), os.environ.get(f"WORLD3D_{backend.upper()}_DEVICES"))
+        for backend in backends
+    }
+    if not any(python or devices for python, devices in split.values()):
+        return [(device, None, None) for device in shared]
+    
+    specs = []
+    for backend, (python, devices) in split.items():
+        devices = parse_devices(devices) or shared or (["default"] if python else [])
+        specs += [(device, backend, python or None) for device in devices]
+    return specs
+
+def device_env(device, python=None, env=None):
+    """Environment of a worker pinned to device ("cuda:N", "cpu" or "default") run by python"""
+    env = dict(os.environ if env is None else env)
+    if python:
+        # Activate the interpreter's env (e.g. a conda env) instead of the app's
+        prefix = os.path.dirname(os.path.dirname(os.path.abspath(python)))
+        app_prefix = env.get("CONDA_PREFIX")
+        env["CONDA_PREFIX"] = prefix
+        env["PATH"] = os.path.join(prefix, "bin") + os.pathsep + env.get("PATH", "")
+        if app_prefix and app_prefix != prefix and env.get("LD_LIBRARY_PATH"):
+            env["LD_LIBRARY_PATH"] = os.pathsep.join(
+                p for p in env["LD_LIBRARY_PATH"].split(os.pathsep) if not p.startswith(app_prefix)
+            )
+    if device.startswith("cuda"):
+        index = int(device.partition(":")[2] or 0)
+        # Indices are relative to the devices visible to the app process
+        visible = [d for d in env.get("CUDA_VISIBLE_DEVICES", "").split(",") if d]
+        env["CUDA_VISIBLE_DEVICES"] = visible[index] if visible else str(index)
+    elif device != "default":
+        env["CUDA_VISIBLE_DEVICES"] = ""
+    env["WORLD3D_WORKER"] = device  # marks the worker, which runs its models itself
+    return env
+
+class _Call:
+    """A call in flight: its updates and final result arrive on a queue"""
+    
+    _ids = itertools.count(1)
+    
+    def __init__(self, name, args, group=None):
+        self.id = next(self._ids)
+        self.name = name
+        self.args = args
+        self.group = group
+        self.attempts = 0
+        self.worker = None
+        self.messages = queue.Queue()
+
+class _Worker:
+    """Bookkeeping for one worker process"""
+    
+    def __init__(self, index, device, group=None, python=None):
+        self.index = index
+        self.device = device
+        self.group = group  # backend served, None for every backend
+        self.python = python or sys.executable
+        self.process = None
+        self.connection = None
+        self.send_lock = threading.Lock()
+        self.calls = {}  # call id -> _Call
+        self.ready = False
+        self.started_at = 0.0
+        self.last_heartbeat = 0.0
+        self.restarts = 0
+        self.completed = 0
+        self.failed = 0
+    
+    def serves(self, group):
+        return group is None or self.group in (None, group)
+
+class WorkerPool:
+    """One worker process per device, least-loaded dispatch and restarts
+    
+    workers are device names or (device, group, python) tuples; encode(arg),
+    when given, turns each call argument into something cheap to send (e.g.
+    an image object into the path of a file).
+    """
+    
+    def __init__(self, module, workers, heartbeat_interval=2.0, heartbeat_timeout=30.0,
+                 start_timeout=600.0, restart_delay=5.0, retries=1, encode=None):
+        if not workers:
+            raise ValueError("a worker pool needs at least one worker")
+        self.module = module
+        self.encode = encode
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.start_timeout = start_timeout
+        self.restart_delay = restart_delay
+        self.retries = retries
+        self.initializers = []  # (app function, group) every worker of the group runs before taking calls
+        self.counters = {"calls": 0, "retried": 0, "failed": 0, "restarts": 0}
+        self.workers = [
+            _Worker(i, spec) if isinstance(spec, str) else _Worker(i, *spec)
+            for i, spec in enumerate(workers)
+        ]
+        self._cond = threading.Condition()
+        self._closed = False
+        
+        for worker in self.workers:
+            self._start(worker)
+        threading.Thread(target=self._monitor, name="worker-pool-monitor", daemon=True).start()
+    
+    @classmethod
+    def from_env(cls, module, encode=None):
+        """Pool of the workers in the environment (see specs_from_env), or None without any"""
+        specs = specs_from_env()
+        if not specs:
+            return None
+        return cls(
+            module,
+            specs,
+            heartbeat_timeout=float(os.environ.get("WORLD3D_WORKER_HEARTBEAT_TIMEOUT", "30")),
+            encode=encode
+        )
+    
+    def serves(self, group):
+        """Whether any worker runs calls of group (a backend)"""
+        return any(w.serves(group) for w in self.workers)
+    
+    def replicas(self, group):
+        """Number of workers that run calls of group"""
+        return sum(w.serves(group) for w in self.workers)
+    
+    # Dispatch
+    
+    def remote(self, fn, group=None):
+        """Wrap an app function so calls run on a worker of group; generator functions keep streaming
+        
+        fn is returned unchanged when no worker serves group.
+        """
+        if not self.serves(group):
+            return fn
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def streaming(*args):
+                yield from self.stream(fn.__name__, *args, group=group)
+            return streaming
+        
+        @functools.wraps(fn)
+        def blocking(*args):
+            return self.call(fn.__name__, *args, group=group)
+        return blocking
+    
+    def call(self, name, *args, group=None):
+        """Run module.name(*args) on the least loaded worker of group and return its (final) result"""
+        result = None
+        for result in self.stream(name, *args, group=group):
+            pass
+        return result
+    
+    def stream(self, name, *args, group=None):
+        """Like call(), but yields each update of a streaming function, then the result"""
+        if self.encode is not None:
+            args = tuple(self.encode(arg) for arg in args)
+        call = _Call(name, args, group)
+        with self._cond:
+            self.counters["calls"] += 1
+        self._dispatch(call)
+        try:
+            while True:
+                kind, value = call.messages.get()
+                if kind == "error":
+                    raise WorkerError(value)
+                yield value
+                if kind == "done":
+                    return
+        finally:
+            with self._cond:
+                if call.worker is not None:
+                    call.worker.calls.pop(call.id, None)
+    
+    def broadcast(self, name, group=None, strict=False):
+        """Run module.name() on every worker of group, now and after each restart; returns their outputs
+        
+        With strict=True a worker that raised makes this raise WorkerError.
+        """
+        with self._cond:
+            if (name, group) not in self.initializers:
+                self.initializers.append((name, group))
+            workers = [w for w in self.workers if w.serves(group)]
+        calls = []
+        for worker in workers:
+            call = _Call(name, (), group)
+            self._dispatch(call, worker)
+            calls.append((worker, call))
+        
+        lines, failed = [], False
+        for worker, call in calls:
+            kind, value = call.messages.get()
+            while kind == "update":
+                kind, value = call.messages.get()
+            with self._cond:
+                worker.calls.pop(call.id, None)
+            failed = failed or kind == "error"
+            lines.append(f"[worker {worker.index}, {worker.group or 'all'} on {worker.device}] {value}")
+        if strict and failed:
+            raise WorkerError("\n".join(lines))
+        return "\n".join(lines)
+    
+    def gather(self, name, timeout=5.0):
+        """Run module.name() once on every ready worker; returns {worker index: output}
+        
+        Workers that fail or take longer than timeout are left out. Unlike
+        broadcast(), the call is not repeated after restarts.
+        """
+        with self._cond:
+            workers = [w for w in self.workers if w.ready]
+        calls = []
+        for worker in workers:
+            call = _Call(name, ())
+            self._dispatch(call, worker)
+            calls.append((worker, call))
+        
+        outputs = {}
+        deadline = time.time() + timeout
+        for worker, call in calls:
+            try:
+                kind, value = call.messages.get(timeout=max(deadline - time.time(), 0))
+                while kind == "update":
+                    kind, value = call.messages.get(timeout=max(deadline - time.time(), 0))
+            except queue.Empty:
+                kind = "timeout"
+            with self._cond:
+                worker.calls.pop(call.id, None)
+            if kind == "done":
+                outputs[worker.index] = value
+        return outputs
+    
+    def _pick(self, group):
+        """Least loaded ready worker of group; called with the lock held"""
+        ready = [w for w in self.workers if w.ready and w.serves(group)]
+        if not ready:
+            return None
+        return min(ready, key=lambda w: (len(w.calls), w.index))
+    
+    def _dispatch(self, call, worker=None):
+        """Send call to worker (any ready one by default), waiting for one to be up"""
+        with self._cond:
+            if worker is None:
+                while (worker := self._pick(call.group)) is None:
+                    if self._closed:
+                        raise WorkerError("worker pool is closed")
+                    self._cond.wait(1.0)
+            call.worker = worker
+            call.attempts += 1
+            worker.calls[call.id] = call
+        self._send(worker, ("call", call.id, call.name, call.args))
+    
+    def _send(self, worker, message):
+        try:
+            with worker.send_lock:
+                worker.connection.send(message)
+        except (OSError, ValueError):
+            # The monitor notices the dead worker and retries its calls
+            pass
+    
+    # Worker lifecycle
+    
+    def _start(self, worker):
+        """Spawn the worker process and the thread reading its messages"""
+        parent, child = socket.socketpair()
+        command = [
+            worker.python, os.path.abspath(__file__),
+            "--module", self.module,
+            "--device", worker.device,
+            "--fd", str(child.fileno()),
+            "--heartbeat", str(self.heartbeat_interval),
+        ]
+        with self._cond:
+            initializers = [name for name, group in self.initializers if worker.serves(group)]
+            command += ["--init", ",".join(initializers)]
+            env = device_env(worker.device, worker.python if worker.python != sys.executable else None)
+            worker.process = subprocess.Popen(command, env=env, pass_fds=[child.fileno()])
+            worker.connection = Connection(parent.detach())
+            worker.ready = False
+            worker.started_at = worker.last_heartbeat = time.time()
+        child.close()
+        threading.Thread(
+            target=self._reader,
+            args=(worker, worker.connection),
+            name=f"worker-{worker.index}-reader",
+            daemon=True
+        ).start()
+    
+    def _reader(self, worker, connection):
+        """Route messages from one worker process to the calls waiting on them"""
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                return  # the monitor restarts the worker
+            kind = message[0]
+            with self._cond:
+                if worker.connection is not connection:
+                    return  # an older process of a restarted worker
+                worker.last_heartbeat = time.time()
+                if kind == "ready":
+                    worker.ready = True
+                    self._cond.notify_all()
+                    continue
+                if kind == "heartbeat":
+                    continue
+                call = worker.calls.get(message[1])
+                if kind in ("done", "error"):
+                    worker.calls.pop(message[1], None)
+                    if kind == "done":
+                        worker.completed += 1
+                    else:
+                        worker.failed += 1
+                    self._cond.notify_all()
+            if call is not None:
+                call.messages.put((kind, message[2]))
+    
+    def _monitor(self):
+        """Restart workers whose process exited or stopped sending heartbeats"""
+        while not self._closed:
+            time.sleep(self.heartbeat_interval)
+            now = time.time()
+            for worker in self.workers:
+                exited = worker.process.poll() is not None
+                timeout = self.heartbeat_timeout if worker.ready else self.start_timeout
+                silent = now - worker.last_heartbeat > timeout
+                if (exited or silent) and now - worker.started_at > self.restart_delay and not self._closed:
+                    self._restart(worker, "exited" if exited else "stopped responding")
+    
+    def _restart(self, worker, reason):
+        print(f"Worker {worker.index} ({worker.group or 'all'} on {worker.device}, pid {worker.process.pid}) "
+              f"{reason}; restarting")
+        with self._cond:
+            worker.ready = False
+            orphans = list(worker.calls.values())
+            worker.calls.clear()
+            worker.restarts += 1
+            self.counters["restarts"] += 1
+            connection = worker.connection
+        worker.process.kill()
+        worker.process.wait()
+        connection.close()
+        self._start(worker)
+        
+        for call in orphans:
+            if call.attempts <= self.retries and all(call.name != name for name, _ in self.initializers):
+                with self._cond:
+                    self.counters["retried"] += 1
+                threading.Thread(target=self._retry, args=(call,), daemon=True).start()
+            else:
+                with self._cond:
+                    self.counters["failed"] += 1
+                call.messages.put(("error", f"worker on {worker.device} {reason} while running {call.name}"))
+    
+    def _retry(self, call):
+        try:
+            self._dispatch(call)
+        except WorkerError as e:
+            call.messages.put(("error", str(e)))
+    
+    def close(self):
+        """Stop every worker process"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for worker in self.workers:
+            self._send(worker, None)
+        for worker in self.workers:
+            try:
+                worker.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+    
+    def stats(self):
+        """Per-worker device, state, calls in flight and restarts plus global counters"""
+        now = time.time()
+        with self._cond:
+            return {
+                "workers": [
+                    {
+                        "device": w.device,
+                        "group": w.group,
+                        "python": w.python,
+                        "pid": w.process.pid,
+                        "ready": w.ready,
+                        "in_flight": len(w.calls),
+                        "completed": w.completed,
+                        "failed": w.failed,
+                        "restarts": w.restarts,
+                        "heartbeat_age": now - w.last_heartbeat,
+                    }
+                    for w in self.workers
+                ],
+                "counters": dict(self.counters),
+            }
+    
+    def report(self):
+        """One line per worker for the status panel"""
+        lines = []
+        for i, w in enumerate(self.stats()["workers"]):
+            state = "ready" if w["ready"] else "starting"
+            lines.append(
+                f"Worker {i} ({w['group'] or 'all'} on {w['device']}, pid {w['pid']}): {state}, {w['in_flight']} in flight, "
+                f"{w['completed']} done, {w['failed']} failed, {w['restarts']} restarts"
+            )
+        return "\n".join(lines)
+
+# Worker process side
+
+def _serve(module_name, connection, initializers, heartbeat_interval):
+    """Run calls from the app process, each in its own thread, until it goes away"""
+    send_lock = threading.Lock()
+    
+    def send(message):
+        with send_lock:
+            connection.send(message)
+    
+    def heartbeat():
+        while True:
+            time.sleep(heartbeat_interval)
+            try:
+                send(("heartbeat",))
+            except OSError:
+                return
+    
+    threading.Thread(target=heartbeat, daemon=True).start()
+    module = importlib.import_module(module_name)
+    for name in initializers:
+        print(getattr(module, name)())
+    send(("ready",))
+    
+    def run(call_id, name, args):
+        try:
+            result = getattr(module, name)(*args)
+            if inspect.isgenerator(result):
+                update = None
+                for update in result:
+                    send(("update", call_id, update))
+                result = update
+            send(("done", call_id, result))
+        except Exception as e:
+            send(("error", call_id, f"{e}\n{traceback.format_exc()}"))
+    
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):
+            return  # the app process exited
+        if message is None:
+            return
+        _, call_id, name, args = message
+        threading.Thread(target=run, args=(call_id, name, args), daemon=True).start()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", required=True, help="app module to import, e.g. app")
+    parser.add_argument("--device", required=True)
+    parser.add_argument("--fd", type=int, required=True, help="socket to the app process")
+    parser.add_argument("--init", default="", help="comma separated initializers to run first")
+    parser.add_argument("--heartbeat", type=float, default=2.0)
+    args = parser.parse_args()
+    
+    print(f"Worker for {args.device} starting (pid {os.getpid()})")
+    _serve(args.module, Connection(args.fd), [n for n in args.init.split(",") if n], args.heartbeat)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file